@@ -0,0 +1,70 @@
+'''
+Checks that steady-state playback does not allocate NumPy memory per block.
+
+Runs the PlaybackEngine block pipeline (read, volume, visualizer copy) over a
+generated file without opening an audio device.
+
+    python benchmarks/bench_alloc.py
+'''
+
+import os
+import tempfile
+import time
+import tracemalloc
+
+import soundfile as sf
+
+from common import make_tone
+from main import PlaybackEngine
+
+
+def count_block_allocations(path, warmup=10, blocks=500):
+    player = PlaybackEngine()
+    player.volume = 0.8
+    # a large block keeps one stray array well above interpreter noise in the peak
+    player.blocksize = 8192
+    with sf.SoundFile(path, 'r') as f:
+        player._allocate_buffers(f.channels)
+        for _ in range(warmup):
+            player._visual_copy(player._render_block(f))
+
+        # tracemalloc only keeps live blocks, so look at the peak: a single
+        # temporary block array would raise it by at least one block's size
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        for _ in range(blocks):
+            data = player._render_block(f)
+            player._visual_copy(data)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return peak - baseline, player._block.nbytes, elapsed / blocks
+
+
+def run(quick=False):
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for channels in (1, 2):
+            path = make_tone(os.path.join(folder, f"tone_{channels}ch.wav"), 120, channels)
+            growth, block_bytes, per_block = count_block_allocations(path)
+            results[f"{channels}ch"] = {
+                "peak_growth_bytes": growth,
+                "block_bytes": block_bytes,
+                "seconds_per_block": per_block,
+                "allocation_free": growth < block_bytes,
+            }
+    return results
+
+
+def main():
+    for name, result in run().items():
+        print(f"{name}: peak grew {result['peak_growth_bytes']} bytes "
+              f"(block is {result['block_bytes']} bytes), "
+              f"{result['seconds_per_block'] * 1e6:.1f} us/block")
+        assert result["allocation_free"], f"steady-state loop allocated in {name}"
+
+
+if __name__ == "__main__":
+    main()
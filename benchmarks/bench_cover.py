@@ -0,0 +1,97 @@
+'''
+Cover art: what a track switch costs with and without the thumbnail caches.
+
+A FLAC file with a large embedded JPEG is generated. Measures the worker's
+cold path (extract, decode at reduced size, write the thumbnail), decoding
+the full picture instead, the warm path (thumbnail from disk), the GUI
+thread's lookup on a memory hit, and that the pixmap cache stays inside
+its byte budget.
+
+    python benchmarks/bench_cover.py
+'''
+
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+import soundfile as sf
+
+from common import qt_app, timed
+from main import CoverArt
+
+
+def noise_jpeg(edge):
+    from PyQt5.QtCore import QBuffer, QByteArray, QIODevice
+    from PyQt5.QtGui import QImage
+
+    pixels = np.random.default_rng(0).integers(0, 1 << 24, (edge, edge), dtype=np.uint32) | 0xff000000
+    image = QImage(pixels.data, edge, edge, edge * 4, QImage.Format_RGB32)
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "JPG", 90)
+    return bytes(data)
+
+
+def flac_with_picture(path, picture):
+    sf.write(path, np.zeros((44100, 2), 'float32'), 44100, format='FLAC')
+    with open(path, 'rb') as f:
+        raw = f.read()
+    # STREAMINFO comes first; the PICTURE block goes right after it
+    header, length = raw[4:8], int.from_bytes(raw[5:8], 'big')
+    mime = b'image/jpeg'
+    body = (struct.pack('>II', 3, len(mime)) + mime + struct.pack('>IIIIII', 0, 0, 0, 24, 0, len(picture))
+            + picture)
+    streaminfo = bytes([header[0] & 0x7f]) + header[1:] + raw[8:8 + length]
+    block = bytes([6 | (header[0] & 0x80)]) + len(body).to_bytes(3, 'big') + body
+    with open(path, 'wb') as f:
+        f.write(b'fLaC' + streaminfo + block + raw[8 + length:])
+    return path
+
+
+def run(quick=False):
+    app = qt_app()
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtGui import QImage, QPixmap
+
+    edge = 1500 if quick else 3000
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        picture = noise_jpeg(edge)
+        path = flac_with_picture(os.path.join(folder, "track.flac"), picture)
+        results["picture_bytes"] = len(picture)
+        covers = CoverArt(folder=os.path.join(folder, "covers"))
+
+        def cold():
+            for name in os.listdir(covers.folder) if os.path.isdir(covers.folder) else ():
+                os.remove(os.path.join(covers.folder, name))
+            covers._find(path)
+
+        def full_decode():
+            QImage.fromData(picture).scaled(CoverArt.SIZE, CoverArt.SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+        results["worker_cold"] = timed(cold, repeat=3)
+        results["full_decode_and_scale"] = timed(full_decode, repeat=3)
+        results["worker_thumbnail_from_disk"] = timed(lambda: covers._find(path))
+
+        # memory hit: all the GUI thread does when switching back to a track
+        key, image = covers._find(path)
+        covers._on_loaded(path, key, image, CoverArt._stamp(path))
+        results["gui_memory_hit"] = timed(lambda: [covers.request(path) for _ in range(1000)])
+        results["gui_memory_hit"] = {k: v / 1000 for k, v in results["gui_memory_hit"].items()}
+
+        # the byte budget holds however many albums go by
+        budget = CoverArt(max_bytes=4 << 20, folder=covers.folder)
+        thumbnail = image.convertToFormat(QImage.Format_RGB32)
+        for i in range(500):
+            budget.pixmaps.put(f"album{i}", QPixmap.fromImage(thumbnail), thumbnail.sizeInBytes())
+        results["lru"] = {"max_bytes": budget.pixmaps.max_bytes, "bytes": budget.pixmaps.bytes,
+                          "entries": len(budget.pixmaps)}
+    app.processEvents()
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
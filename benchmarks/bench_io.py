@@ -0,0 +1,202 @@
+'''
+Playback reads on a slow disk while a library scan runs, with and without ReadAhead.
+
+The disk is simulated, not measured: one head, a seek cost whenever a read
+does not continue where the last one stopped, a bandwidth limit and a page
+cache that keeps everything once read (in 128 KB pages, about what the
+kernel's own read-ahead fetches). A decoder reads a 24-bit/192 kHz stereo
+file a block at a time, on the clock, with an output buffer of BUFFER
+seconds, while scanner threads read the head and tail of other files the
+way the tag reader does.
+
+"plain" is the decoder reading on its own; "read_ahead" adds a ReadAhead
+for the playing file and makes the scanners go through an IOGate. Reports
+underruns (blocks not read by the time the output needed them), the
+longest decoder read, disk seeks and the scanners' files per second.
+"next_track" times reading the first second and the first WARM seconds of
+the following file, cold and after ReadAhead.warm(), and counts the reads
+that still went to the disk after warming (0 when the whole span was warmed).
+
+    python benchmarks/bench_io.py [--quick]
+'''
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import soundfile as sf
+
+from common import make_tone
+from main import IOGate, ReadAhead
+
+PAGE = 128 << 10
+RATE = 192000 * 2 * 3          # bytes per second of the playing file
+BLOCK = 1024                    # frames per decoder read
+BUFFER = 0.05                   # seconds of audio the output holds
+WARM = 10.0                     # seconds of the next track ReadAhead.warm() reads
+
+
+class SlowDisk:
+    def __init__(self, seek=0.012, bandwidth=40e6):
+        self.seek = seek
+        self.bandwidth = bandwidth
+        self.seeks = 0
+        self.misses = 0
+        self._cache = set()
+        self._head = None
+        self._lock = threading.Lock()
+
+    def read(self, path, offset, count):
+        pages = range(offset // PAGE, (offset + max(count, 1) - 1) // PAGE + 1)
+        missing = [page for page in pages if (path, page) not in self._cache]
+        if not missing:
+            return
+        with self._lock:
+            self.misses += 1
+            cost = len(missing) * PAGE / self.bandwidth
+            if self._head != (path, missing[0]):
+                cost += self.seek
+                self.seeks += 1
+            time.sleep(cost)
+            self._head = (path, missing[-1] + 1)
+            self._cache.update((path, page) for page in missing)
+
+
+class SlowFile:
+    """Just enough of a binary file object for ReadAhead, reading through a SlowDisk."""
+
+    def __init__(self, disk, path):
+        self.disk = disk
+        self.path = path
+        self.size = os.path.getsize(path)
+        self.offset = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def seek(self, offset):
+        self.offset = offset
+
+    def read(self, count):
+        count = max(0, min(count, self.size - self.offset))
+        if count:
+            self.disk.read(self.path, self.offset, count)
+        self.offset += count
+        return bytes(count)
+
+    def readinto(self, buffer):
+        return len(self.read(len(buffer)))
+
+
+def sparse(path, size):
+    with open(path, 'wb') as f:
+        f.truncate(size)
+    return path
+
+
+def scan(disk, paths, gate, stop, counter):
+    for path in paths:
+        if stop.is_set():
+            return
+        if gate is not None:
+            gate.wait()
+        f = SlowFile(disk, path)
+        f.read(64 << 10)              # header and tags
+        f.seek(f.size - 128)
+        f.read(128)                   # ID3v1 / APE footer
+        counter.append(path)
+
+
+def play(disk, path, seconds, gate, scanners):
+    reader = None
+    if gate is not None:
+        reader = ReadAhead(path, opener=lambda p, mode: SlowFile(disk, p))
+        gate.register(reader)
+    stop, scanned = threading.Event(), []
+    threads = [threading.Thread(target=scan, args=(disk, paths, gate, stop, scanned), daemon=True)
+               for paths in scanners]
+    for thread in threads:
+        thread.start()
+
+    f = SlowFile(disk, path)
+    block_bytes, block_time = BLOCK * RATE // 192000, BLOCK / 192000
+    underruns, longest = 0, 0.0
+    start = time.monotonic()
+    for i in range(int(seconds / block_time)):
+        needed = start + BUFFER + i * block_time     # when the output plays this block
+        delay = needed - BUFFER - time.monotonic()   # keep at most BUFFER decoded ahead
+        if delay > 0:
+            time.sleep(delay)
+        t = time.monotonic()
+        f.read(block_bytes)
+        done = time.monotonic()
+        longest = max(longest, done - t)
+        underruns += done > needed
+        if reader is not None:
+            reader.advance(f.offset / f.size)
+    elapsed = time.monotonic() - start
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+    if reader is not None:
+        reader.close()
+        gate.unregister(reader)
+    return {
+        "underruns": underruns,
+        "blocks": int(seconds / block_time),
+        "longest_read": longest,
+        "disk_seeks": disk.seeks,
+        "scanned_per_second": len(scanned) / elapsed,
+        "read_ahead_reads": reader.reads if reader else 0,
+        "scan_waited": gate.waited if gate else 0.0,
+    }
+
+
+def opening(disk, path, seconds):
+    """Seconds to read the first seconds of a sound file a block at a time."""
+    info = sf.info(path)
+    f = SlowFile(disk, path)
+    block_bytes = BLOCK * f.size // info.frames
+    start = time.monotonic()
+    for _ in range(int(seconds * info.samplerate) // BLOCK):
+        f.read(block_bytes)
+    return time.monotonic() - start
+
+
+def run(quick=False):
+    seconds = 4 if quick else 15
+    with tempfile.TemporaryDirectory() as folder:
+        playing = sparse(os.path.join(folder, "playing.wav"), int(RATE * (seconds + 5)))
+        library = [sparse(os.path.join(folder, f"scan{i}.flac"), 30 << 20) for i in range(4000)]
+        scanners = [library[i::4] for i in range(4)]
+        results = {"seconds": seconds}
+        for name, gate in (("plain", None), ("read_ahead", IOGate())):
+            results[name] = play(SlowDisk(), playing, seconds, gate, scanners)
+
+        following = make_tone(os.path.join(folder, "next.wav"), WARM + 5, fs=48000)
+        results["next_track"] = {}
+        for seconds in (1, WARM):
+            cold, warm = SlowDisk(), SlowDisk()
+            ReadAhead._warm(following, WARM, lambda p, mode: SlowFile(warm, p))
+            warm.misses = 0
+            results["next_track"][f"{seconds:g}s"] = {
+                "cold": opening(cold, following, seconds),
+                "warmed": opening(warm, following, seconds),
+                "warmed_disk_reads": warm.misses,
+            }
+    return results
+
+
+def main():
+    print(json.dumps(run(quick="--quick" in sys.argv), indent=2))
+
+
+if __name__ == "__main__":
+    main()
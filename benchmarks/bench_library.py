@@ -0,0 +1,281 @@
+'''
+Library and song list operations versus library size.
+
+Measures the folder scan (FolderWatch.scan), search filtering
+(filter_song_list), playlist resync after a reorder (on_song_list_reordered),
+M3U loading (load_playlist_file), the background tag loader (how soon the
+rows on screen get their info while the rest of the library is still queued,
+and how long a scroll step takes on the GUI thread meanwhile), applying a
+few new files in a watched folder versus reloading it, and re-sorting and
+grouping a tagged library (the first sort also works out collation ranks),
+dragging, removing and undoing one selected song versus thousands (and
+that removing the playing song goes on with the one after it, first song
+included), and importing a large folder dropped from a file manager.
+
+    python benchmarks/bench_library.py
+'''
+
+import json
+import os
+import tempfile
+import time
+
+from PyQt5.QtCore import QItemSelection, QItemSelectionModel, QModelIndex, Qt
+
+from common import qt_app, timed
+from main import FolderWatch, MusicPlayer, PlaylistControl, TrackInfoLoader
+
+
+def scan_rate(count):
+    with tempfile.TemporaryDirectory() as folder:
+        for i in range(count):
+            ext = ('.mp3', '.flac', '.txt', '.jpg')[i % 4]
+            open(os.path.join(folder, f"Artist {i % 97} - Track {i}{ext}"), 'w').close()
+        start = time.perf_counter()
+        found = FolderWatch(folder).scan()
+        elapsed = time.perf_counter() - start
+    return {"entries": count, "audio_files": len(found), "seconds": elapsed,
+            "entries_per_second": count / elapsed}
+
+
+def fake_paths(count):
+    return [f"/music/Artist {i % 97}/Artist {i % 97} - Track {i}.flac" for i in range(count)]
+
+
+def library_ops(player, count):
+    paths = fake_paths(count)
+    player.set_song_files(paths)
+    player.audio_player.engine.filename = paths[count // 2]
+    player.playlist.go_to_song(count // 2)
+    player.song_list.setCurrentIndex(player.song_model.index(count // 2))
+
+    results = {
+        "filter_song_list": timed(lambda: player.filter_song_list("track 4"), repeat=3),
+        "filter_clear": timed(lambda: player.filter_song_list(""), repeat=3),
+        "on_song_list_reordered": timed(player.on_song_list_reordered, repeat=3),
+    }
+    return results
+
+
+def m3u_load(player, count):
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "list.m3u")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("#EXTM3U\n")
+            f.write("\n".join(fake_paths(count)) + "\n")
+        return timed(lambda: player.load_playlist_file(path), repeat=1)
+
+
+def track_info(app, player, count, read_seconds=0.001):
+    def reader(song):
+        time.sleep(read_seconds)  # stands in for a header read from disk
+        return {"title": song, "duration": 180.0}
+
+    player.track_info.close()
+    player.track_info = TrackInfoLoader(on_ready=player.track_info_ready.emit, reader=reader)
+    player.resize(500, 700)
+    player.show()
+    player.set_song_files(fake_paths(count))
+    app.processEvents()
+
+    # jump to the middle, far from anything the loader reached in list order
+    bar = player.song_list.verticalScrollBar()
+    start = time.perf_counter()
+    bar.setValue(bar.maximum() // 2)
+    player.prioritize_visible_rows()
+    first, last = player.visible_rows()
+    visible = [player.song_list.model().index(row) for row in range(first, last + 1)]
+    while not all(player.info_for_index(index) is not None for index in visible):
+        player.apply_track_info()   # rather than waiting out track_info_timer
+        app.processEvents()
+        time.sleep(0.0005)
+    visible_ready = time.perf_counter() - start
+
+    # scroll a page at a time while the backlog loads
+    steps = []
+    for _ in range(50):
+        t0 = time.perf_counter()
+        bar.setValue(bar.value() + bar.pageStep())
+        player.song_list.viewport().repaint()
+        app.processEvents()
+        steps.append(time.perf_counter() - t0)
+        time.sleep(0.01)
+    steps.sort()
+    player.apply_track_info()
+    result = {
+        "songs": count,
+        "visible_rows": len(visible),
+        "visible_ready_seconds": visible_ready,
+        "loaded_meanwhile": sum(player.tracks.info(row) is not None for row in player.playlist.song_list.rows),
+        "scroll_step_median": steps[len(steps) // 2],
+        "scroll_step_max": steps[-1],
+    }
+    player.track_info.close()
+    player.hide()
+    return result
+
+
+def folder_refresh(player, count, new=5):
+    with tempfile.TemporaryDirectory() as folder:
+        for i in range(count):
+            open(os.path.join(folder, f"Artist {i % 97} - Track {i:06d}.flac"), 'w').close()
+        player.watch_folder(folder)
+
+        def add_files():
+            for i in range(new):
+                open(os.path.join(folder, f"Artist 0 - Track {count + i:06d}.flac"), 'w').close()
+
+        start = time.perf_counter()
+        player.watch_folder(folder)
+        full = time.perf_counter() - start
+        add_files()
+        start = time.perf_counter()
+        player.apply_folder_changes()
+        incremental = time.perf_counter() - start
+        start = time.perf_counter()
+        player.apply_folder_changes(force=False)   # what a poll costs when nothing changed
+        idle_poll = time.perf_counter() - start
+        player.unwatch_folder()
+    return {"files": count, "new_files": new, "full_reload_seconds": full,
+            "incremental_seconds": incremental, "idle_poll_seconds": idle_poll,
+            "songs": player.song_model.rowCount()}
+
+
+def painted(app, player, action):
+    """action, followed by the layout and paint of the song list it causes."""
+    def run():
+        action()
+        app.processEvents()
+        player.song_list.viewport().repaint()
+    return run
+
+
+def drop_import(app, player, count, per_folder=100):
+    """Files and folders dropped from a file manager: how long the drop blocks, when the
+    first songs show, and the longest the GUI thread is busy with one batch."""
+    player.set_song_files([])
+    with tempfile.TemporaryDirectory() as folder:
+        for i in range(count):
+            sub = os.path.join(folder, f"Artist {i // per_folder % 37}", f"Album {i // per_folder}")
+            os.makedirs(sub, exist_ok=True)
+            with open(os.path.join(sub, f"{i % per_folder:02d} Track.wav"), 'wb') as f:
+                f.write(b'RIFF\x24\x00\x00\x00WAVEfmt ')
+        start = time.perf_counter()
+        player.import_files([folder])
+        accepted = time.perf_counter() - start
+        first_rows, busiest = None, 0.0
+        while player.imports:
+            tick = time.perf_counter()
+            app.processEvents()
+            busiest = max(busiest, time.perf_counter() - tick)
+            if first_rows is None and player.song_model.rowCount():
+                first_rows = time.perf_counter() - start
+            time.sleep(0.001)
+        total = time.perf_counter() - start
+    player.track_info.clear()
+    return {"files": count, "accepted_seconds": accepted, "first_rows_seconds": first_rows,
+            "total_seconds": total, "longest_gui_step_seconds": busiest,
+            "songs": len(player.playlist.song_list)}
+
+
+def select_rows(model, view, start, count, step):
+    # a block is one range, as a shift-click makes it; the QItemSelection is
+    # dropped on return since its ranges hold persistent indexes of their own
+    selection = QItemSelection()
+    if step == 1:
+        selection.select(model.index(start), model.index(start + count - 1))
+    else:
+        for row in range(start, start + count * step, step):
+            selection.select(model.index(row), model.index(row))
+    view.selectionModel().select(selection, QItemSelectionModel.ClearAndSelect)
+
+
+def batch_edits(app, player, count, many=5000):
+    """Drag, undo and remove of one selected song versus a block of many and many scattered ones."""
+    player.set_song_files(fake_paths(count))
+    player.track_info.clear()
+    model, view = player.song_model, player.song_list
+    results = {"songs": count}
+    for name, selected, step in (("one", 1, 1), ("block", many, 1), ("scattered", many, count // many)):
+        select_rows(model, view, min(1000, count - selected * step), selected, step)
+        drag = painted(app, player, lambda: model.dropMimeData(
+            model.mimeData(view.selectedIndexes()), Qt.MoveAction, count // 2, 0, QModelIndex()))
+        case = {"drag": timed(drag, repeat=1)}
+        case["undo"] = timed(painted(app, player, model.history.undo), repeat=1)
+        case["redo"] = timed(painted(app, player, model.history.redo), repeat=1)
+        case["selection_kept"] = len(player.selected_positions()) == selected
+        case["remove"] = timed(painted(app, player, player.remove_selected_song), repeat=1)
+        commands = [model.history.command(i) for i in range(model.history.count())]
+        case["history_bytes"] = sum(c.positions.nbytes + len(getattr(c, 'songs', ())) * 4 for c in commands)
+        case["undo_remove"] = timed(painted(app, player, model.history.undo), repeat=1)
+        results[name] = case
+    results["next_after_removing_playing"] = removing_playing()
+    return results
+
+
+def removing_playing(count=4):
+    """For each play-order position, whether next_song() after removing the playing song gives
+    the song that followed it, in order and shuffled (the first song is the case to watch)."""
+    results = {}
+    for shuffle in (False, True):
+        ok = True
+        for playing in range(count - 1):
+            playlist = PlaylistControl()
+            playlist.set_playlist(list(range(count)))
+            playlist.set_shuffle(shuffle)
+            queue = playlist.queue()
+            playlist.go_to_song(queue[playing])
+            playlist.remove_many([queue[playing]])
+            ok &= playlist.next_song() == queue[playing + 1]
+        results["shuffled" if shuffle else "in_order"] = ok
+    return results
+
+
+def sorting(app, player, count):
+    paths = fake_paths(count)
+    player.set_song_files(paths)
+    player.track_info.clear()   # the paths are fake and the tags are set below
+    for i, row in enumerate(player.playlist.song_list.rows):
+        player.tracks.set_info(row, {"title": f"Track {i}", "artist": f"Artist {i % 97}",
+                                     "album": f"Album {i // 12}", "duration": 60.0 + i * 7 % 400,
+                                     "added": 1e9 + i * 13 % 9999})
+    player.playlist.go_to_song(count // 3)
+    playing = player.playlist.current_song()
+
+    shown = lambda action: painted(app, player, action)
+    results = {"songs": count}
+    start = time.perf_counter()
+    shown(lambda: player.sort_songs("Artist"))()
+    results["first_sort_seconds"] = time.perf_counter() - start
+    for name in ("Artist", "Album", "Duration", "Date added", "File name"):
+        results[name] = timed(shown(lambda: player.sort_songs(name)), repeat=3)
+    results["group_album"] = timed(shown(lambda: player.group_songs("Album")), repeat=3)
+    results["filter_while_grouped"] = timed(shown(lambda: player.filter_song_list("artist 4")), repeat=3)
+    player.filter_song_list("")
+    player.group_songs("None")
+    app.processEvents()
+    results["current_song_kept"] = player.playlist.current_song() == playing
+    return results
+
+
+def run(quick=False):
+    app = qt_app()
+    player = MusicPlayer()
+    sizes = (1000, 10000) if quick else (1000, 10000, 100000)
+    results = {"scan": [], "song_list": {}, "m3u_load": {}}
+    for count in sizes:
+        results["scan"].append(scan_rate(count))
+        results["song_list"][count] = library_ops(player, count)
+    for count in ((10000,) if quick else (10000, 100000)):
+        results["m3u_load"][count] = m3u_load(player, count)
+    results["track_info"] = track_info(app, player, 10000 if quick else 100000)
+    results["folder_refresh"] = folder_refresh(player, 2000 if quick else 20000)
+    results["sorting"] = sorting(app, player, 20000 if quick else 200000)
+    results["drop_import"] = drop_import(app, player, 5000 if quick else 50000)
+    results["batch_edits"] = batch_edits(app, player, 20000 if quick else 200000, 500 if quick else 5000)
+    app.processEvents()
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,59 @@
+'''
+Full PlaybackEngine pipeline throughput per output backend.
+
+Runs PlaybackEngine.run over a generated file into the unpaced null sink
+and into a WAV file sink, as fast as possible, to compare backend overhead.
+The passthrough cases feed the 16-bit file to the sink as int16, untouched
+at full volume and dithered at 80%.
+
+    python benchmarks/bench_pipeline.py
+'''
+
+import json
+import os
+import tempfile
+import time
+
+from common import make_tone
+from main import PlaybackEngine, NullOutput, FileOutput
+
+
+def render(path, blocksize, output, passthrough=False, volume=0.8):
+    engine = PlaybackEngine(output=output)
+    engine.blocksize = blocksize
+    engine.volume = volume
+    engine.passthrough = passthrough
+    engine.load(path)
+    start = time.perf_counter()
+    engine.run()
+    elapsed = time.perf_counter() - start
+    output.close()
+    frames = engine.total_frames
+    return {
+        "blocksize": blocksize,
+        "frames": frames,
+        "seconds": elapsed,
+        "frames_per_second": frames / elapsed,
+        "realtime_factor": frames / engine.fs / elapsed,
+        "decode_mean": engine.stats.decode.snapshot()["mean"],
+        "write_mean": engine.stats.write.snapshot()["mean"],
+    }
+
+
+def run(quick=False):
+    seconds = 60 if quick else 600
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        path = make_tone(os.path.join(folder, "tone.wav"), seconds)
+        for blocksize in (256, 1024, 4096):
+            results[f"null_{blocksize}"] = render(path, blocksize, NullOutput(realtime=False))
+            results[f"file_{blocksize}"] = render(
+                path, blocksize, FileOutput(os.path.join(folder, "out.wav"))
+            )
+        results["passthrough_1024"] = render(path, 1024, NullOutput(realtime=False), True, 1.0)
+        results["dither_1024"] = render(path, 1024, NullOutput(realtime=False), True, 0.8)
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
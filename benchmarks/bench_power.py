@@ -0,0 +1,91 @@
+'''
+Wake-ups per second of the GUI thread in each power state.
+
+Counts the timer events and queued signal deliveries the event loop handles
+while a track plays (into the null output) or sits paused, with the window
+visible and minimized. What is left when idle is Qt's own cursor blink in
+the focused search bar.
+
+    python benchmarks/bench_power.py
+'''
+
+import json
+import os
+import tempfile
+import time
+
+os.environ.setdefault("PULSEPY_OUTPUT", "null")
+
+from common import qt_app, make_tone
+from main import MusicPlayer
+
+
+def wakeups(app, seconds):
+    from PyQt5.QtCore import QObject, QEvent
+
+    class Counter(QObject):
+        def __init__(self):
+            super().__init__()
+            self.timers = 0
+            self.signals = 0
+
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Timer:
+                self.timers += 1
+            elif event.type() == QEvent.MetaCall:
+                self.signals += 1
+            return False
+
+    counter = Counter()
+    app.installEventFilter(counter)
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        app.processEvents()
+        time.sleep(0.002)
+    app.removeEventFilter(counter)
+    return {"timers_per_second": counter.timers / seconds,
+            "signals_per_second": counter.signals / seconds,
+            "wakeups_per_second": (counter.timers + counter.signals) / seconds}
+
+
+def run(quick=False):
+    app = qt_app()
+    seconds = 1.0 if quick else 3.0
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        # a title too long for the label keeps the marquee busy
+        path = make_tone(os.path.join(folder, "A Rather Long Artist Name - "
+                                              "An Even Longer Track Title (Extended Remix).wav"), 60)
+        player = MusicPlayer()
+        player.show()
+        player.set_song_files([path])
+        player.handle_song_selection(player.song_model.index(0))
+
+        def settle(seconds=1.0):
+            end = time.monotonic() + seconds
+            while time.monotonic() < end:
+                app.processEvents()
+
+        settle()
+        results["playing"] = wakeups(app, seconds)
+        player.showMinimized()
+        settle()
+        results["playing_minimized"] = wakeups(app, seconds)
+        player.showNormal()
+        player.play_pause()
+        settle(4.0)  # the visualizer fade-out takes a few seconds
+        results["paused"] = wakeups(app, seconds)
+        player.showMinimized()
+        settle()
+        results["paused_minimized"] = wakeups(app, seconds)
+
+        player.audio_player.song_finished.disconnect()  # don't move on to the next song
+        player.audio_player.stop()
+        player.audio_player.wait()
+        player.close()
+        app.processEvents()
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,100 @@
+'''
+Memory per track of the song list's data, and the store's lookups.
+
+Builds a synthetic library (1M tracks, 100k with --quick) twice: the way
+the song list used to keep it (a list of path strings for the playlist, a
+title -> path dict and a song -> info dict of tags) and as a TrackStore
+with a TrackList of its rows. Reports traced bytes per track for paths
+alone and with tags loaded, then times find(), match() and sorting on the
+store.
+
+    python benchmarks/bench_store.py [--quick]
+'''
+
+import gc
+import json
+import sys
+import tracemalloc
+
+import numpy as np
+
+from common import timed
+from main import TrackList, TrackStore, song_title
+
+
+def library(count, per_album=12, albums_per_artist=8):
+    """Paths and read_track_info()-like dicts; each call makes fresh strings, like reading files."""
+    paths, infos = [], []
+    for i in range(count):
+        album, track = divmod(i, per_album)
+        artist = album // albums_per_artist
+        paths.append(f"/home/user/Music/Artist {artist}/Album {album}/{track + 1:02d} - Song {i}.flac")
+        infos.append({"title": f"Song {i}", "artist": f"Artist {artist}", "album": f"Album {album}",
+                      "duration": 120.0 + i % 300})
+    return paths, infos
+
+
+def traced(build):
+    """(object, bytes still allocated after build())"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return obj, size
+
+
+def old_layout(count, tags):
+    paths, infos = library(count)
+    playlist = paths
+    loaded_files = {song_title(path): path for path in paths}
+    info = dict(zip(paths, infos)) if tags else {}
+    return playlist, loaded_files, info
+
+
+def store_layout(count, tags):
+    paths, infos = library(count)
+    store = TrackStore()
+    rows = store.extend(paths)
+    if tags:
+        for row, info in zip(rows, infos):
+            store.set_info(row, info)
+    store.find(paths[0])   # builds the hash index, which is part of the cost
+    return store, TrackList(store, rows)
+
+
+def run(quick=False):
+    count = 100_000 if quick else 1_000_000
+    results = {"tracks": count}
+    for tags in (False, True):
+        name = "with_tags" if tags else "paths"
+        old, old_bytes = traced(lambda: old_layout(count, tags))
+        del old
+        (store, tracks), store_bytes = traced(lambda: store_layout(count, tags))
+        results[name] = {
+            "old_bytes_per_track": old_bytes / count,
+            "store_bytes_per_track": store_bytes / count,
+            "ratio": old_bytes / store_bytes,
+        }
+
+    paths, _ = library(count)
+    probe = paths[::max(1, count // 1000)]
+    results["find"] = {k: v / len(probe) for k, v in timed(lambda: [store.find(p) for p in probe]).items()}
+    results["extend_existing"] = timed(lambda: store.extend(paths), repeat=1)
+    results["match_first"] = timed(lambda: store.match("song 12345"), repeat=1)
+    results["match"] = timed(lambda: store.match("song 12345"))
+    results["match_tag"] = timed(lambda: store.match("artist 42"))
+    rows = np.frombuffer(tracks.rows, np.int32)
+    results["order_duration"] = timed(lambda: store.order(rows, ('duration',)))
+    results["order_artist"] = timed(lambda: store.order(rows, ('artist', 'album', 'track', 'name')))
+    return results
+
+
+def main():
+    print(json.dumps(run(quick="--quick" in sys.argv), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+'''
+CPU cost of the WSOLA time-stretch per playback speed.
+
+Feeds a stereo tone with some noise through TimeStretch in 1024-frame
+blocks, the way PlaybackEngine does, and reports CPU seconds per second of
+audio played. realtime_factor is how many times faster than playback the
+stretch runs on one core.
+
+    python benchmarks/bench_stretch.py
+'''
+
+import json
+import time
+
+import numpy as np
+
+from main import TimeStretch
+
+SPEEDS = (0.5, 0.75, 1.25, 1.5, 2.0, 3.0)
+
+
+def stretch(signal, speed, blocksize=1024):
+    ts = TimeStretch(signal.shape[1], speed)
+    produced = 0
+    start = time.process_time()
+    for i in range(0, len(signal), blocksize):
+        produced += len(ts.process(signal[i:i + blocksize]))
+    produced += len(ts.flush())
+    return time.process_time() - start, produced
+
+
+def run(quick=False):
+    fs = 44100
+    seconds = 10 if quick else 60
+    t = np.arange(seconds * fs) / fs
+    rng = np.random.default_rng(0)
+    tone = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.05 * rng.standard_normal(len(t))
+    signal = np.repeat(tone[:, None], 2, axis=1).astype('float32')
+
+    results = {}
+    for speed in SPEEDS:
+        cpu, produced = stretch(signal, speed)
+        played = produced / fs
+        results[f"{speed:g}x"] = {
+            "cpu_seconds": cpu,
+            "played_seconds": played,
+            "cpu_per_second": cpu / played,
+            "realtime_factor": played / cpu,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
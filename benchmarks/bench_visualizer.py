@@ -0,0 +1,73 @@
+'''
+Visualizer cost per frame: amplitude processing and painting for the bars,
+the spectrogram (FFT column on the analyzer thread, column write and ring
+blit on the GUI thread) and the oscilloscope.
+
+    python benchmarks/bench_visualizer.py
+'''
+
+import json
+
+import numpy as np
+
+from common import qt_app, timed
+from main import Visualizer, SpectrumAnalyzer
+
+
+def run(quick=False):
+    app = qt_app()
+    from PyQt5.QtGui import QPixmap
+
+    frames = 100 if quick else 1000
+    vis = Visualizer()
+    vis.timer.stop()  # frames are driven by hand
+    vis.resize(600, 100)
+    chunk = (np.random.default_rng(0).standard_normal((1024, 2)) * 0.3).astype('float32')
+    vis.update_visualization(chunk)
+
+    def process():
+        for _ in range(frames):
+            vis.process_amplitude()
+
+    pixmap = QPixmap(vis.size())
+
+    def paint():
+        for _ in range(frames):
+            vis.render(pixmap)
+
+    results = {
+        "process_amplitude": timed(process),
+        "paint": timed(paint),
+    }
+
+    analyzer = SpectrumAnalyzer(rows=vis.height())
+    analyzer.submit(chunk)
+    analyzer.close()  # no worker needed, columns are computed inline here
+    frame = analyzer._history * analyzer._window
+
+    def spectrogram_column():
+        for _ in range(frames):
+            analyzer.compute(frame)
+
+    vis.set_mode('spectrogram')
+    column = analyzer.compute(frame)
+
+    def spectrogram_write():
+        for _ in range(frames):
+            vis.analyzer._column = column
+            vis._spectrogram_tick()
+
+    results["spectrogram_column_worker"] = timed(spectrogram_column)
+    results["spectrogram_write"] = timed(spectrogram_write)
+    results["spectrogram_paint"] = timed(paint)
+    vis.set_mode('scope')
+    results["scope_paint"] = timed(paint)
+    for result in results.values():
+        for key in list(result):
+            result[key] /= frames  # seconds per frame
+    app.processEvents()
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,45 @@
+'''
+Shared helpers for the benchmark scripts.
+
+Benchmarks run without audio hardware or a display: Qt uses the offscreen
+platform unless QT_QPA_PLATFORM is already set.
+'''
+
+import os
+import sys
+import time
+
+import numpy as np
+import soundfile as sf
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+_app = None
+
+
+def qt_app():
+    """Return the shared QApplication, creating it on first use."""
+    global _app
+    from PyQt5.QtWidgets import QApplication
+    _app = QApplication.instance() or QApplication([])
+    return _app
+
+
+def make_tone(path, seconds, channels=2, fs=44100):
+    t = np.arange(int(seconds * fs)) / fs
+    tone = (0.3 * np.sin(2 * np.pi * 440 * t)).astype('float32')
+    sf.write(path, np.repeat(tone[:, None], channels, axis=1), fs)
+    return path
+
+
+def timed(fn, repeat=5):
+    """Run fn repeat times and return min/median/max wall time in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return {"min": times[0], "median": times[len(times) // 2], "max": times[-1]}
@@ -0,0 +1,60 @@
+'''
+Runs every benchmark and writes the results as one JSON document.
+
+    python benchmarks/run.py [--quick] [--output results.json] [names...]
+
+Keep the JSON files from each run to track regressions over time.
+'''
+
+import argparse
+import datetime
+import importlib
+import json
+import platform
+import subprocess
+import sys
+
+import common
+
+BENCHMARKS = ["bench_alloc", "bench_pipeline", "bench_stretch", "bench_visualizer", "bench_library",
+              "bench_power", "bench_cover", "bench_store", "bench_io"]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=common.ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("names", nargs="*", help="benchmarks to run (default: all)")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes for a fast check")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    report = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "results": {},
+    }
+    for name in args.names or BENCHMARKS:
+        print(f"running {name}...", file=sys.stderr)
+        report["results"][name] = importlib.import_module(name).run(quick=args.quick)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,24 +5,35 @@ Completly different Music Player with a simplistic Design
 import os
 import sys
 import re
+import json
+import argparse
 import time
+import bisect
 import random
-from collections import deque
+import logging
+import tempfile
+import threading
+import multiprocessing
+import heapq
+import hashlib
+import itertools
+import struct
+import unicodedata
+from array import array
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 import numpy as np
-import sounddevice as sd
 import soundfile as sf
-from pydub import AudioSegment
+try:
+    import sounddevice as sd
+except (ImportError, OSError):  # no PortAudio, e.g. CI or headless nodes
+    sd = None
 
-from PyQt5.QtCore import (
-    Qt, QEvent, QObject, QPropertyAnimation, QRect, QTimer, QThread, pyqtSignal, QTime
-)
-from PyQt5.QtGui import QColor, QPainter, QBrush, QIcon
-from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QSlider, QLabel, QTimeEdit, QLineEdit, QListWidget, QListWidgetItem,
-    QFileDialog, QMessageBox, QStyleOptionSlider, QStyle, QMenu, QAction
-)
+log = logging.getLogger("pulsepy")
+
+# Everything up to the Qt imports below is plain Python, so the playback
+# engine can run headless (python main.py --headless playlist.m3u).
 
 
 class PlaylistControl:
@@ -31,7 +42,7 @@ class PlaylistControl:
     REPEAT_ONE = 2
 
     def __init__(self, song_list=None):
-        self.song_list = song_list or []
+        self.song_list = [] if song_list is None else song_list
         self.current_index = 0
         self.shuffle_mode = False
         self.repeat_mode = PlaylistControl.REPEAT_NONE
@@ -48,8 +59,8 @@ class PlaylistControl:
         self._reset_shuffle()
 
     def current_song(self):
-        if not self.song_list:
-            return None
+        if not self.song_list or self._position() < 0:
+            return None   # before the first song: the current one was removed, see reorder()
         if self.shuffle_mode:
             return self.song_list[self._shuffle_order[self._shuffle_pos]]
         return self.song_list[self.current_index]
@@ -58,7 +69,7 @@ class PlaylistControl:
         if not self.song_list:
             return None
 
-        if self.repeat_mode == PlaylistControl.REPEAT_ONE:
+        if self.repeat_mode == PlaylistControl.REPEAT_ONE and self._position() >= 0:
             # Stay on current song
             return self.current_song()
 
@@ -83,7 +94,7 @@ class PlaylistControl:
         if not self.song_list:
             return None
 
-        if self.repeat_mode == PlaylistControl.REPEAT_ONE:
+        if self.repeat_mode == PlaylistControl.REPEAT_ONE and self._position() >= 0:
             # Stay on current song
             return self.current_song()
 
@@ -122,6 +133,135 @@ class PlaylistControl:
         else:
             self.current_index = index 
 
+    def insert(self, index, song):
+        """Add a song without moving the current one; when shuffling it gets a random spot still to come."""
+        index = min(max(0, index), len(self.song_list))
+        had_songs = bool(self.song_list)
+        self.song_list.insert(index, song)
+        if had_songs and index <= self.current_index:
+            self.current_index += 1
+        if self.shuffle_mode:
+            self._shuffle_order = [i + 1 if i >= index else i for i in self._shuffle_order]
+            if not had_songs:
+                self._shuffle_order = [index]
+            else:
+                spot = random.randint(self._shuffle_pos + 1, len(self._shuffle_order))
+                self._shuffle_order.insert(spot, index)
+
+    def remove(self, index):
+        """Drop a song; see reorder() for the current song."""
+        self.remove_many([index])
+
+    def replace(self, index, song):
+        self.song_list[index] = song
+
+    def reorder(self, order):
+        """Rearrange the songs to [song_list[i] for i in order], dropping those left out.
+
+        The current song, the shuffle order and the shuffle position follow
+        their songs. A dropped current song hands over to the nearest kept
+        song before it, or to position -1 (before the first song) if there
+        is none, so next_song() goes on with the one after it. Songs not in
+        the shuffle order yet (just added) get random spots still to come.
+        Returns the new index of each old one, -1 if dropped.
+        """
+        order = np.asarray(order, np.int64)
+        moved = np.full(len(self.song_list), -1, np.int64)
+        moved[order] = np.arange(len(order))
+        take = getattr(self.song_list, 'take', None)
+        self.song_list = take(order) if take else [self.song_list[i] for i in order]
+        kept = np.flatnonzero(moved[:self.current_index + 1] >= 0)
+        self.current_index = int(moved[kept[-1]]) if len(kept) else -1
+        if self.shuffle_mode and self.song_list:
+            self._reorder_shuffle(moved)
+        elif self._shuffle_order:
+            self._shuffle_order, self._shuffle_pos = [], 0
+        return moved
+
+    def _reorder_shuffle(self, moved):
+        shuffle = moved[np.asarray(self._shuffle_order, np.int64)]
+        kept = shuffle >= 0
+        before = int(np.count_nonzero(kept[:max(self._shuffle_pos, 0)]))
+        on_current = 0 <= self._shuffle_pos < len(kept) and kept[self._shuffle_pos]
+        self._shuffle_pos = before if on_current else before - 1
+        shuffle = shuffle[kept]
+        present = np.zeros(len(self.song_list), bool)
+        present[shuffle] = True
+        added = np.flatnonzero(~present).tolist()
+        if added:
+            random.shuffle(added)
+            if len(shuffle):
+                spots = sorted(random.randint(self._shuffle_pos + 1, len(shuffle)) for _ in added)
+                shuffle = np.insert(shuffle, spots, added)
+            else:
+                shuffle, self._shuffle_pos = np.array(added), 0
+        self._shuffle_order = shuffle.tolist()
+
+    @staticmethod
+    def placement(count, positions, sources):
+        """An order for reorder() that puts the songs at sources at the given
+        (ascending) positions, and the rest in their order around them."""
+        order = np.empty(count, np.int64)
+        placed = np.zeros(count, bool)
+        placed[positions] = True
+        rest = np.ones(count, bool)
+        rest[sources] = False
+        order[positions] = sources
+        order[~placed] = np.flatnonzero(rest)
+        return order
+
+    def insert_many(self, positions, songs):
+        """Add songs so that they end up at the given (ascending) positions, in one reorder().
+
+        Returns the new index of each song that was there before.
+        """
+        count = len(self.song_list)
+        self.song_list.extend(songs)
+        total = len(self.song_list)
+        return self.reorder(self.placement(total, positions, np.arange(count, total)))[:count]
+
+    def remove_many(self, positions):
+        """Drop the songs at positions in one reorder(); see there for the current song."""
+        return self.reorder(np.delete(np.arange(len(self.song_list)), positions))
+
+    def move_many(self, positions, to):
+        """Move the songs at the given (ascending) positions, as one block, before the song now at to."""
+        positions = np.asarray(positions, np.int64)
+        order = np.delete(np.arange(len(self.song_list)), positions)
+        return self.reorder(np.insert(order, to - np.count_nonzero(positions < to), positions))
+
+    def queue(self):
+        """All songs in play order (the shuffle order when shuffling)."""
+        if self.shuffle_mode:
+            return [self.song_list[i] for i in self._shuffle_order]
+        return list(self.song_list)
+
+    def has_next(self):
+        """False when next_song() would only repeat the last song of a non-repeating playlist."""
+        if not self.song_list:
+            return False
+        if self.repeat_mode != PlaylistControl.REPEAT_NONE:
+            return True
+        return self._position() < len(self.song_list) - 1
+
+    def _position(self):
+        return self._shuffle_pos if self.shuffle_mode else self.current_index
+
+    def peek_next(self):
+        """The song next_song() will return, without changing anything.
+
+        None at the end of the playlist, and when shuffling wraps around:
+        the new shuffle order, and so the song, is only drawn then.
+        """
+        if not self.has_next():
+            return None
+        if self.repeat_mode == PlaylistControl.REPEAT_ONE and self._position() >= 0:
+            return self.current_song()
+        if self.shuffle_mode:
+            position = self._shuffle_pos + 1
+            return self.song_list[self._shuffle_order[position]] if position < len(self.song_list) else None
+        return self.song_list[(self.current_index + 1) % len(self.song_list)]
+
 
     def get_playlist(self):
         # Returns a Python list of all item texts in the QListWidget
@@ -129,43 +269,1016 @@ class PlaylistControl:
 
 
 
-class AudioPlayer(QThread):
-    chunk_signal = pyqtSignal(np.ndarray)
-    position_signal = pyqtSignal(int)
-    song_finished = pyqtSignal()
+def cache_dir():
+    """Where PulsePy keeps data between sessions ($PULSEPY_CACHE_DIR or ~/.cache/pulsepy)."""
+    return os.environ.get("PULSEPY_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "pulsepy")
+
+
+class LibraryCache:
+    """Per-track data kept between sessions (cue points, A-B loop, ...) in one JSON file.
+
+    Entries are keyed by absolute path and remember the file's size and
+    mtime; an entry whose file changed since is ignored.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(cache_dir(), "library.json")
+        self._entries = None
+
+    def _data(self):
+        if self._entries is None:
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    @staticmethod
+    def _stamp(path):
+        st = os.stat(path)
+        return [st.st_size, st.st_mtime_ns]
+
+    def get(self, path):
+        """The entry for path as a dict, empty if unknown or the file changed."""
+        entry = self._data().get(os.path.abspath(path))
+        try:
+            if entry is not None and entry.get("stamp") == self._stamp(getattr(path, 'path', path)):
+                return entry
+        except OSError:
+            pass
+        return {}
+
+    def update(self, path, **fields):
+        """Set fields on path's entry and save."""
+        entry = dict(self.get(path), **fields)
+        entry["stamp"] = self._stamp(getattr(path, 'path', path))
+        self._data()[os.path.abspath(path)] = entry
+        self.save()
+
+    def save(self):
+        # write a temp file and swap it in, so a crash never leaves half a file
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self._data(), f)
+        os.replace(tmp, self.path)
+
+
+def _advise(f, offset, length, advice):
+    """posix_fadvise() on an open file where the platform has it; only a hint, so failures are ignored."""
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        os.posix_fadvise(f.fileno(), offset, length, getattr(os, advice))
+    except (AttributeError, OSError, ValueError):
+        pass   # not a real file (or an old kernel)
+
+
+class ReadAhead:
+    """Keeps the file being played in the page cache ahead of the decoder.
+
+    libsndfile reads a few KB per block, and on a NAS or a busy spinning
+    disk each of those can turn into a seek. A thread here reads the file
+    sequentially in WINDOW sized reads, topping up to AHEAD bytes in front
+    of the decoder whenever less than half of that is left, so the
+    decoder's own reads find the data cached and the disk sees a few long
+    runs instead of a stream of small ones. The decoder's byte position is
+    estimated from its frame position (advance()), close enough for a
+    window of megabytes; a seek outside what is cached starts over there.
+
+    background_io holds other file reads back while a top-up is running.
+    warm() reads the first seconds of a song the same way, for the next track.
+    """
+    WINDOW = 1 << 20
+    AHEAD = 8 << 20
+
+    def __init__(self, path, opener=open):
+        self.path = path
+        self.opener = opener
+        self.size = os.path.getsize(path)
+        self.active = True      # False while paused: no reads are needed then
+        self.position = 0       # estimated byte offset of the decoder
+        self.bytes_read = 0
+        self.reads = 0
+        self._start = 0         # cached range [_start, _end) around the decoder
+        self._end = 0
+        self._filling = True
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="ReadAhead", daemon=True)
+        self._thread.start()
+
+    @property
+    def busy(self):
+        """A top-up is running; other reads would make the disk seek away from it."""
+        return self.active and self._filling
+
+    def advance(self, fraction):
+        """The decoder is fraction of the way through the file (by frames)."""
+        position = int(self.size * fraction)
+        if position == self.position:
+            return
+        with self._cond:
+            self.position = position
+            if not self._start <= position <= self._end:
+                self._start = self._end = position   # a seek: start over from there
+            if not self._filling and self._end < self.size and self._end - position < self.AHEAD // 2:
+                self._filling = True
+                self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._filling = False
+            self._cond.notify()
+
+    def _run(self):
+        try:
+            with self.opener(self.path, 'rb') as f:
+                _advise(f, 0, 0, 'POSIX_FADV_SEQUENTIAL')
+                buffer = bytearray(self.WINDOW)
+                while True:
+                    with self._cond:
+                        if self._end >= self.size or self._end - self.position >= self.AHEAD:
+                            self._filling = False
+                        while not (self._closed or self._filling):
+                            self._cond.wait()
+                        if self._closed:
+                            return
+                        offset = self._end
+                    _advise(f, offset, self.AHEAD, 'POSIX_FADV_WILLNEED')
+                    f.seek(offset)
+                    got = f.readinto(buffer)
+                    with self._cond:
+                        self.bytes_read += got
+                        self.reads += 1
+                        if self._end == offset:   # unless the decoder jumped meanwhile
+                            self._end = offset + got if got else self.size
+        except OSError as e:
+            log.info("read-ahead of %s stopped: %s", self.path, e)
+        finally:
+            self._filling = False
+
+    @classmethod
+    def warm(cls, song, seconds=10.0, opener=open):
+        """Read the first seconds of song into the page cache, on a thread of its own."""
+        threading.Thread(target=cls._warm, args=(song, seconds, opener), name="ReadAhead", daemon=True).start()
+
+    @classmethod
+    def _warm(cls, song, seconds, opener):
+        path = getattr(song, 'path', song)
+        try:
+            info = sf.info(path)
+            size = os.path.getsize(path)
+            start, end = (song.frame_range(info.samplerate, info.frames) if isinstance(song, CueTrack)
+                          else (0, info.frames))
+            frames = max(info.frames, 1)
+            first = size * start // frames
+            length = int(size * min(end - start, seconds * info.samplerate) / frames)
+            with opener(path, 'rb') as f:
+                # the header too, the decoder reads it on opening; one span when they meet
+                if first <= cls.WINDOW:
+                    spans = [(0, max(cls.WINDOW, first + length))]
+                else:
+                    spans = [(0, cls.WINDOW), (first, length)]
+                for offset, count in spans:
+                    _advise(f, offset, count, 'POSIX_FADV_WILLNEED')
+                    f.seek(offset)
+                    while count > 0 and f.read(cls.WINDOW):
+                        count -= cls.WINDOW
+        except (OSError, RuntimeError) as e:
+            log.debug("could not warm %s: %s", path, e)
+
+
+class IOGate:
+    """Paces background file reads (tags, covers, seek indexes, imports) while a track plays.
+
+    Background jobs call wait() before each file they read. With nothing
+    playing it returns at once; during playback the reads are spaced at
+    least interval seconds apart and held back entirely while the playing
+    file's ReadAhead is topping up, so the decoder never queues behind them.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.waited = 0.0       # seconds jobs spent in wait(), for benchmarks
+        self._readers = []
+        self._next = 0.0
+        self._cond = threading.Condition()
+
+    def register(self, reader):
+        with self._cond:
+            self._readers.append(reader)
+
+    def unregister(self, reader):
+        with self._cond:
+            self._readers.remove(reader)
+            self._cond.notify_all()
+
+    def wait(self):
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                playing = [reader for reader in self._readers if reader.active]
+                if not playing:
+                    break
+                now = time.monotonic()
+                if any(reader.busy for reader in playing):
+                    self._cond.wait(0.02)   # the read-ahead doesn't signal, look again shortly
+                elif now < self._next:
+                    self._cond.wait(self._next - now)
+                else:
+                    self._next = now + self.interval
+                    break
+        self.waited += time.monotonic() - start
+
+
+background_io = IOGate()
+
+
+class SeekIndex:
+    """Keeps decoder handles whose seek index has already been built.
+
+    libsndfile's MP3 and Ogg decoders index frames per open handle and scan
+    forward from the last indexed frame on a far seek, which costs ~40 ms per
+    20 minutes of VBR audio. A background thread indexes a second handle once
+    (seek to the end and back); the player switches to it on its next seek,
+    and returns it here afterwards so replays of the file start indexed.
+    """
+    SCANNED_FORMATS = ('MP3', 'OGG')
+    MAX_HANDLES = 4
+
+    _handles = OrderedDict()  # (path, size, mtime) -> idle indexed SoundFile
+    _building = set()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _key(path):
+        st = os.stat(path)
+        return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+    @classmethod
+    def needs_index(cls, f):
+        return f.format in cls.SCANNED_FORMATS
+
+    @classmethod
+    def acquire(cls, path):
+        """Take an indexed handle for path out of the cache, or None."""
+        with cls._lock:
+            return cls._handles.pop(cls._key(path), None)
+
+    @classmethod
+    def release(cls, path, f):
+        """Give an indexed handle back; the least recently used ones are closed."""
+        try:
+            key = cls._key(path)
+        except OSError:
+            f.close()   # the file went away while it played
+            return
+        with cls._lock:
+            old = cls._handles.pop(key, None)
+            cls._handles[key] = f
+            while len(cls._handles) > cls.MAX_HANDLES:
+                _, evicted = cls._handles.popitem(last=False)
+                evicted.close()
+        if old is not None:
+            old.close()
+
+    @classmethod
+    def build_async(cls, path):
+        key = cls._key(path)
+        with cls._lock:
+            if key in cls._handles or key in cls._building:
+                return
+            cls._building.add(key)
+        threading.Thread(target=cls._build, args=(path, key), daemon=True).start()
+
+    @classmethod
+    def _build(cls, path, key):
+        try:
+            background_io.wait()
+            f = sf.SoundFile(path, 'r')
+            f.seek(0, sf.SEEK_END)
+            f.seek(0)
+            cls.release(path, f)
+        except Exception as e:
+            log.warning("could not index %s: %s", path, e)
+        finally:
+            with cls._lock:
+                cls._building.discard(key)
+
+
+class Histogram:
+    """Counts values in fixed log-spaced buckets; add() does not allocate."""
+
+    def __init__(self, low=1e-5, high=1.0, buckets=16):
+        ratio = (high / low) ** (1 / (buckets - 2))
+        self.edges = [low * ratio ** i for i in range(buckets - 1)]
+        self.counts = [0] * buckets
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect.bisect(self.edges, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p):
+        """Upper edge of the bucket holding the p-th percentile (0-100)."""
+        if not self.count:
+            return 0.0
+        target = self.count * p / 100
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return self.edges[i] if i < len(self.edges) else self.max
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class PlaybackStats:
+    """Playback health counters shared by the audio thread and the UI.
+
+    Times are in seconds. Written by the audio thread only; readers take
+    snapshot(), which may be a block out of date but never blocks playback.
+    """
 
     def __init__(self):
-        super().__init__()
+        self.blocks = 0
+        self.underflows = 0          # output underflows reported by PortAudio
+        self.decode = Histogram()    # read + volume per block
+        self.write = Histogram()     # time blocked in stream.write
+        self.command = Histogram()   # transport command post-to-apply latency
+        self.seek = Histogram()
+        self.write_available = 0     # free frames in the output buffer before the last write
+        self.min_write_available = None
+        self.buffer_frames = 0       # frames per block, for reading the two above
+        self.sample_format = None    # what the output stream is fed, e.g. float32 or int16
+        self.chunks_emitted = 0
+        self.chunks_delivered = 0
+        self._last_log = time.monotonic()
+
+    def record_block(self, decode, write, underflowed, write_available):
+        self.blocks += 1
+        self.decode.add(decode)
+        self.write.add(write)
+        if underflowed:
+            self.underflows += 1
+        self.write_available = write_available
+        if self.min_write_available is None or write_available < self.min_write_available:
+            self.min_write_available = write_available
+
+    def chunk_delivered(self, chunk=None):
+        self.chunks_delivered += 1
+
+    def snapshot(self):
+        return {
+            "blocks": self.blocks,
+            "underflows": self.underflows,
+            "decode": self.decode.snapshot(),
+            "write": self.write.snapshot(),
+            "command": self.command.snapshot(),
+            "seek": self.seek.snapshot(),
+            "write_available": self.write_available,
+            "min_write_available": self.min_write_available,
+            "buffer_frames": self.buffer_frames,
+            "sample_format": self.sample_format,
+            "signal_backlog": self.chunks_emitted - self.chunks_delivered,
+        }
+
+    def maybe_log(self, interval):
+        """Emit one structured log line every interval seconds."""
+        now = time.monotonic()
+        if interval and now - self._last_log >= interval:
+            self._last_log = now
+            log.info("playback_stats %s", json.dumps(self.snapshot()))
+
+
+class OutputBackend:
+    """Destination for the blocks PlaybackEngine produces.
+
+    start() is called when a run begins and stop() when it ends; write()
+    blocks until the data is accepted and returns True on an underflow.
+    latency is a PortAudio hint ('low', 'high' or seconds); None is the default.
+    """
+    name = None
+
+    def start(self, samplerate, channels, dtype, blocksize, latency=None):
+        raise NotImplementedError
+
+    def write(self, data):
+        raise NotImplementedError
+
+    @property
+    def delay(self):
+        """Seconds of already written audio that has not been heard yet."""
+        return 0.0
+
+    def stop(self):
+        pass
+
+    def close(self):
+        """Release the backend for good (finishes files)."""
+        self.stop()
+
+    @property
+    def write_available(self):
+        """Frames that can be written without blocking."""
+        return 0
+
+
+class SoundDeviceOutput(OutputBackend):
+    """Plays through PortAudio. device may name a virtual device (loopback, null sink)."""
+    name = "sounddevice"
+
+    def __init__(self, device=None):
+        self.device = device
+        self.stream = None
+
+    def start(self, samplerate, channels, dtype, blocksize, latency=None):
+        if sd is None:
+            raise RuntimeError("sounddevice/PortAudio is not available; use the null or file output")
+        self.stream = sd.OutputStream(
+            samplerate=samplerate, channels=channels, dtype=dtype, blocksize=blocksize,
+            device=self.device, latency=latency
+        )
+        self.stream.start()
+
+    def write(self, data):
+        return self.stream.write(data)
+
+    def stop(self):
+        if self.stream:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+    @property
+    def write_available(self):
+        return self.stream.write_available if self.stream else 0
+
+    @property
+    def delay(self):
+        # PortAudio's output latency: time from write() until the DAC plays it
+        return self.stream.latency if self.stream else 0.0
+
+
+class NullOutput(OutputBackend):
+    """Discards audio, either paced like a sound card (realtime) or as fast as possible."""
+    name = "null"
+
+    def __init__(self, realtime=True):
+        self.realtime = realtime
+        self.samplerate = 44100
+        self.frames = 0
+        self._started = 0.0
+
+    def start(self, samplerate, channels, dtype, blocksize, latency=None):
+        self.samplerate = samplerate
+        self.frames = 0
+        self._started = time.perf_counter()
+
+    def write(self, data):
+        if self.realtime:
+            now = time.perf_counter()
+            if self._started + self.frames / self.samplerate < now:
+                # idle (paused, scrubbing): a sound card plays silence meanwhile,
+                # so start pacing afresh instead of bursting to catch up
+                self._started = now - self.frames / self.samplerate
+        self.frames += len(data)
+        if self.realtime:
+            delay = self._started + self.frames / self.samplerate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return False
+
+    @property
+    def write_available(self):
+        if not self.realtime:
+            return 1 << 30
+        ahead = self.frames - (time.perf_counter() - self._started) * self.samplerate
+        return max(0, int(-ahead))
+
+    @property
+    def delay(self):
+        if not self.realtime:
+            return 0.0
+        return max(0.0, self.frames / self.samplerate - (time.perf_counter() - self._started))
+
+
+class FileOutput(OutputBackend):
+    """Writes audio to a sound file (format from the extension: .wav, .flac, ...).
+
+    The file stays open across runs, so consecutive tracks are appended;
+    call close() to finish it.
+    """
+    name = "file"
+
+    def __init__(self, path, subtype=None):
+        self.path = path
+        self.subtype = subtype
+        self.file = None
+
+    def start(self, samplerate, channels, dtype, blocksize, latency=None):
+        if self.file is not None and (self.file.samplerate, self.file.channels) != (samplerate, channels):
+            raise ValueError(f"{self.path} is {self.file.samplerate} Hz/{self.file.channels} ch, "
+                             f"cannot append {samplerate} Hz/{channels} ch")
+        if self.file is None:
+            self.file = sf.SoundFile(self.path, 'w', samplerate, channels, subtype=self.subtype)
+
+    def write(self, data):
+        self.file.write(data)
+        return False
+
+    def stop(self):
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    @property
+    def write_available(self):
+        return 1 << 30
+
+
+OUTPUT_BACKENDS = {
+    backend.name: backend for backend in (SoundDeviceOutput, NullOutput, FileOutput)
+}
+
+
+def make_output(spec=None):
+    """Build an output backend from a spec string.
+
+      sounddevice[:DEVICE]   PortAudio, optionally a device name or index
+      null[:fast]            discard at wall-clock speed, or unpaced with :fast
+      file:PATH              write to a sound file
+    """
+    if spec is None:
+        spec = os.environ.get("PULSEPY_OUTPUT") or ("sounddevice" if sd is not None else "null")
+    name, _, arg = spec.partition(':')
+    if name not in OUTPUT_BACKENDS:
+        raise ValueError(f"unknown output '{name}', expected one of {', '.join(OUTPUT_BACKENDS)}")
+    if name == "sounddevice":
+        return SoundDeviceOutput(int(arg) if arg.isdigit() else (arg or None))
+    if name == "null":
+        return NullOutput(realtime=arg != "fast")
+    if not arg:
+        raise ValueError("file output needs a path, e.g. file:out.wav")
+    return FileOutput(arg)
+
+
+def output_devices():
+    """(index, name) of every PortAudio device that can play audio."""
+    if sd is None:
+        return []
+    return [
+        (index, device['name']) for index, device in enumerate(sd.query_devices())
+        if device['max_output_channels'] > 0
+    ]
+
+
+# name: (frames per block, PortAudio latency hint)
+LATENCY_PROFILES = {
+    'low': (256, 'low'),            # ~6 ms blocks, quickest response to commands
+    'balanced': (1024, None),
+    'power': (8192, 'high'),        # ~190 ms blocks, 5 wake-ups per second
+}
+
+
+class AdaptiveBuffer:
+    """Grows the output block after underruns and shrinks it once playback is stable.
+
+    factor multiplies the profile's block size. Growing reopens the stream
+    right away, since the glitch was audible anyway. Shrinking waits until a
+    reopen is not audible: a seek, a resume or the next track.
+    """
+
+    def __init__(self, max_factor=8, stable_seconds=60.0):
+        self.factor = 1
+        self.max_factor = max_factor
+        self.stable_seconds = stable_seconds
+        self._stable_since = time.monotonic()
+
+    def underflow(self):
+        """Record an underrun. Returns True if the block should grow now."""
+        self._stable_since = time.monotonic()
+        if self.factor < self.max_factor:
+            self.factor *= 2
+            return True
+        return False
+
+    def may_shrink(self):
+        """Returns True (and halves factor) after stable_seconds without underruns."""
+        if self.factor > 1 and time.monotonic() - self._stable_since >= self.stable_seconds:
+            self.factor //= 2
+            self._stable_since = time.monotonic()
+            return True
+        return False
+
+
+class TimeStretch:
+    """Streaming WSOLA time-stretch: plays at another speed without changing pitch.
+
+    Grains of `frame` samples are overlap-added under a Hann window every
+    frame // 2 output samples. Each grain starts about speed * hop source
+    samples after the previous one, nudged by up to `tolerance` samples to
+    where it best matches the natural continuation of the previous grain
+    (one np.correlate on a mono mix per hop), so waveforms join in phase.
+    """
+    MIN_SPEED = 0.5
+    MAX_SPEED = 3.0
+
+    def __init__(self, channels, speed=1.0, frame=1024, tolerance=256):
+        self.channels = channels
+        self.speed = speed
+        self.frame = frame
+        self.hop = frame // 2
+        self.tolerance = tolerance
+        # periodic Hann: copies half a frame apart sum to exactly 1
+        n = np.arange(frame)
+        self._window = (0.5 - 0.5 * np.cos(2 * np.pi * n / frame)).astype('float32')[:, None]
+        self._acc = np.zeros((frame, channels), dtype='float32')
+        self._grain = np.empty((frame, channels), dtype='float32')
+        self._in = np.zeros((4 * frame, channels), dtype='float32')
+        self._mono = np.zeros(4 * frame, dtype='float32')
+        self._out = np.empty((0, channels), dtype='float32')
+        self.reset()
+
+    def reset(self):
+        """Drop buffered audio, e.g. after a seek."""
+        self._in[:self.tolerance] = 0
+        self._mono[:self.tolerance] = 0
+        self._filled = self.tolerance   # silence in front, so the first search has room
+        self._pos = float(self.tolerance)  # nominal source start of the next grain
+        self._prev = None               # actual start of the previous grain
+        self._acc[:] = 0
+
+    def pending(self):
+        """Source frames taken in but not played out yet."""
+        return max(0, int(self._filled - self._pos))
+
+    def _reserve(self, n):
+        """Make room for n more input frames, dropping what no grain can reach."""
+        if self._filled + n <= len(self._in):
+            return
+        if self._prev is not None:
+            drop = min(self._prev, int(self._pos) - self.tolerance)
+            if drop > 0:
+                keep = self._filled - drop
+                self._in[:keep] = self._in[drop:self._filled]
+                self._mono[:keep] = self._mono[drop:self._filled]
+                self._filled = keep
+                self._pos -= drop
+                self._prev -= drop
+        if self._filled + n > len(self._in):
+            # only when blocks get bigger, e.g. the adaptive buffer grew
+            size = 2 * (self._filled + n) + 2 * self.frame
+            grown = np.zeros((size, self.channels), dtype='float32')
+            grown_mono = np.zeros(size, dtype='float32')
+            grown[:self._filled] = self._in[:self._filled]
+            grown_mono[:self._filled] = self._mono[:self._filled]
+            self._in, self._mono = grown, grown_mono
+
+    def process(self, block):
+        """Take a block of source audio, return the stretched audio ready so far.
+
+        The result is a view on an internal buffer, valid until the next call.
+        """
+        n = len(block)
+        self._reserve(n)
+        self._in[self._filled:self._filled + n] = block
+        np.mean(block, axis=1, out=self._mono[self._filled:self._filled + n])
+        self._filled += n
+
+        frame, hop, tolerance = self.frame, self.hop, self.tolerance
+        advance = self.speed * hop
+        most = int((self._filled - self._pos) / advance + 2) * hop
+        if len(self._out) < most:
+            self._out = np.empty((2 * most, self.channels), dtype='float32')
+
+        count = 0
+        while True:
+            p = int(self._pos)
+            if self._prev is None:
+                if p + frame + tolerance > self._filled:
+                    break
+                start = p
+            else:
+                natural = self._prev + hop
+                if max(p + tolerance, natural) + frame > self._filled:
+                    break
+                corr = np.correlate(self._mono[p - tolerance:p + tolerance + frame],
+                                    self._mono[natural:natural + frame], 'valid')
+                start = p - tolerance + int(np.argmax(corr))
+            np.multiply(self._in[start:start + frame], self._window, out=self._grain)
+            np.add(self._acc, self._grain, out=self._acc)
+            self._out[count:count + hop] = self._acc[:hop]
+            self._acc[:hop] = self._acc[hop:]
+            self._acc[hop:] = 0
+            count += hop
+            self._prev = start
+            self._pos += advance
+        return self._out[:count]
+
+    def flush(self):
+        """Play out what is still buffered at the end of the input."""
+        remaining = int(self.pending() / self.speed) + self.hop
+        tail = self.process(np.zeros((self.frame + 2 * self.tolerance, self.channels), dtype='float32'))
+        return tail[:remaining]
+
+
+class ScrubCache:
+    """Decoded audio in aligned windows, for scrubbing.
+
+    Dragging the slider asks for many grains close together; each window
+    is decoded with one seek and read and then kept (LRU), so most drag
+    events copy from memory instead of seeking the decoder.
+    """
+
+    def __init__(self, window=1 << 16, windows=8):
+        self.window = window        # frames per window, ~1.5 s at 44.1 kHz
+        self.max_windows = windows
+        self._windows = OrderedDict()  # window index -> float32 (window, channels)
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, f, index):
+        w = self._windows.get(index)
+        if w is not None:
+            self._windows.move_to_end(index)
+            self.hits += 1
+            return w
+        if len(self._windows) >= self.max_windows:
+            w = self._windows.popitem(last=False)[1]   # reuse the oldest buffer
+        else:
+            w = np.empty((self.window, f.channels), dtype='float32')
+        f.seek(index * self.window)
+        read = len(f.read(out=w))
+        w[read:] = 0
+        self._windows[index] = w
+        self.misses += 1
+        return w
+
+    def read(self, f, start, out):
+        """Fill out with the frames from start on, clamped to the file."""
+        frames = len(out)
+        start = min(max(0, start), max(0, f.frames - frames))
+        done = 0
+        while done < frames:
+            index, offset = divmod(start + done, self.window)
+            take = min(self.window - offset, frames - done)
+            out[done:done + take] = self._get(f, index)[offset:offset + take]
+            done += take
+        return out
+
+
+def spectrogram_colormap(size=256):
+    """ARGB32 lookup table from the visualizer background through purple and orange to white."""
+    stops = np.array([
+        (0.00, 0x23, 0x27, 0x2f),
+        (0.35, 0x5a, 0x1e, 0x8c),
+        (0.65, 0xe0, 0x4a, 0x3c),
+        (0.85, 0xf5, 0xb0, 0x2e),
+        (1.00, 0xff, 0xff, 0xf0),
+    ])
+    x = np.linspace(0, 1, size)
+    r, g, b = (np.interp(x, stops[:, 0], stops[:, i]).astype(np.uint32) for i in (1, 2, 3))
+    return np.uint32(0xff000000) | (r << 16) | (g << 8) | b
+
+
+class SpectrumAnalyzer:
+    """Turns audio blocks into spectrogram columns on a worker thread.
+
+    submit() only copies a block into a window of recent mono samples; the
+    FFT, the log-frequency banding and the colormap lookup run on the worker.
+    take() returns the newest finished column (ARGB32, top row = highest
+    frequency) or None. Blocks arriving while the worker is busy are coalesced.
+    """
+
+    def __init__(self, rows=100, fft_size=2048, floor_db=-90.0):
+        self.rows = rows
+        self.fft_size = fft_size
+        self.floor_db = floor_db
+        self.colormap = spectrogram_colormap()
+        window = np.hanning(fft_size).astype('float32')
+        self._window = window * (2 / window.sum())   # a full-scale sine reads 0 dB
+        # first FFT bin of each row, log spaced; low rows may share a bin
+        self._starts = np.geomspace(1, fft_size // 2, rows, endpoint=False).astype(np.intp)
+        self._history = np.zeros(fft_size, dtype='float32')
+        self._frame = np.empty(fft_size, dtype='float32')
+        self._pending = False
+        self._column = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = None
+        self.columns = 0          # columns computed so far
+        self.compute_time = 0.0   # seconds spent on the last one
+
+    def submit(self, chunk):
+        n = min(len(chunk), self.fft_size)
+        if n == 0:
+            return
+        with self._cond:
+            h = self._history
+            h[:-n] = h[n:]
+            if chunk.ndim > 1:
+                np.mean(chunk[-n:], axis=1, out=h[-n:])
+            else:
+                h[-n:] = chunk[-n:]
+            self._pending = True
+            self._cond.notify()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="SpectrumAnalyzer", daemon=True)
+            self._thread.start()
+
+    def take(self):
+        with self._cond:
+            column, self._column = self._column, None
+        return column
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def compute(self, frame):
+        """One column for a windowed frame of fft_size samples."""
+        bands = np.maximum.reduceat(np.abs(np.fft.rfft(frame)), self._starts)
+        db = 20 * np.log10(bands + 1e-12)
+        level = np.clip(1 - db / self.floor_db, 0, 1)
+        return self.colormap[(level * (len(self.colormap) - 1)).astype(np.intp)][::-1]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                self._pending = False
+                np.multiply(self._history, self._window, out=self._frame)
+            t0 = time.perf_counter()
+            column = self.compute(self._frame)
+            self.compute_time = time.perf_counter() - t0
+            with self._cond:
+                self._column = column
+                self.columns += 1
+
+
+# libsndfile subtype: (stream sample format, size of one LSB in it) for passthrough.
+# 24-bit PCM is read left-justified into int32, so its LSB is 256.
+NATIVE_FORMATS = {
+    'PCM_16': ('int16', 1),
+    'PCM_24': ('int32', 1 << 8),
+    'PCM_32': ('int32', 1),
+}
+
+
+class PlaybackEngine:
+    """Decodes a file and writes it to an OutputBackend on its own thread.
+
+    Plain Python, no Qt. Listeners are registered with connect():
+      'chunk'    (ndarray)  block just written, for visualizers
+      'position' (int)      new frame after a seek; poll clock_frame() for progress
+      'finished' ()         run() ended (end of file or stop)
+      'track'    (CueTrack) playback ran on into the next track of the same file
+    Callbacks run on the playback thread and must return quickly.
+    """
+
+    def __init__(self, stats=None, output=None):
         self.file = None
         self.fs = None
         self.stop_flag = False
         self.pause_flag = False
         self.position = 0  # in frames
         self.blocksize = 1024
-        self.stream = None
+        self.latency = None     # PortAudio latency hint, see LATENCY_PROFILES
+        # bit-perfect mode: integer PCM files go to the output in their own format,
+        # untouched at 100% volume and requantized with TPDF dither otherwise
+        self.passthrough = False
+        self.speed = 1.0        # playback speed; anything else runs through TimeStretch
+        self._stretch = None
+        # scrubbing: grains around the slider handle, normal playback holds until a seek
+        self._scrubbing = False
+        self._scrub_to = None
+        self._scrub_cache = ScrubCache()
+        # A-B loop in source frames; the wrap happens inside _fill at the exact frame
+        self.loop = None
+        self.loop_wraps = 0
+        self._loop_audio = None   # (a, b, array) once the region is decoded into memory
+        self._read_frame = 0      # source frame the next read starts at
+        self.dtype = 'float32'  # sample format of the current stream
+        self._lsb = None        # LSB size in dtype when passing integers through
+        self._rng = np.random.default_rng()
+        self.adaptive = None    # AdaptiveBuffer, shared across tracks by the caller
+        self.output = output or make_output()
         self.volume = 1.0
+        self.visuals = True     # emit 'chunk'; off while the window is hidden, saves a wake-up per block
         self.filename = None
         self.channels = 2
-        self.file_obj = None  # soundfile.SoundFile object
-        self.seek_flag = False
-        self.seek_target = 0
         self.seconds_elapsed = 0
+        # (frame, monotonic time, frames per second) of what is audible, refreshed
+        # after every write; readers interpolate it instead of getting a signal per block
+        self._clock = (0, time.monotonic(), 0)
+        self._clock_floor = 0   # a seek target, the clock never shows audio from before it
         self.seconds_total = 1
 
+        # preallocated block buffers, (re)built in run() once channels are known
+        self._block = None
+        self._vis_ring = []
+        self._vis_index = 0
+
+        # transport commands from the GUI thread, applied at block boundaries
+        self._commands = deque()  # (command, value, time posted)
+        self._cond = threading.Condition()
+        self.command_latency = 0.0      # seconds from post to apply, last command
+        self.max_command_latency = 0.0
+
+        # current decoder handle; swapped for an indexed one on the first seek
+        self._file = None
+        self._indexed = False
+        self.seek_latency = 0.0         # seconds, last seek
+        self.max_seek_latency = 0.0
+        self.seeks_coalesced = 0
+
+        # health counters; pass a shared instance to keep them across tracks
+        self.stats = stats or PlaybackStats()
+        self.stats_log_interval = 10.0  # seconds between playback_stats log lines
+        self.index_seeks = True  # build a SeekIndex for compressed files (off for offline renders)
+        # ReadAhead for the playing file, which also paces background_io (off for offline renders)
+        self.read_ahead = True
+        self.warm_seconds = 20.0  # the next track's start is read in this long before the end
+        self._read_ahead = None
+        self._warmed = False
+
+        self._thread = None
+        self._listeners = {'chunk': [], 'position': [], 'finished': [], 'track': []}
+        # CUE tracks: position and seeks are relative to the track's first frame
+        self.track = None        # what load() was given, a path or a CueTrack
+        self._offset = 0         # first frame of the track in the file
+        self._end = None         # track length in frames when it stops before the end of the file
+        # the song after this one, set from the caller's thread (the engine never asks the
+        # playlist): a following CUE track is run on into gaplessly, another file warmed
+        self.upcoming = None
+
+    def connect(self, event, callback):
+        self._listeners[event].append(callback)
+
+    def _emit(self, event, *args):
+        for callback in self._listeners[event]:
+            callback(*args)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="PlaybackEngine", daemon=True)
+        self._thread.start()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def wait(self, timeout=None):
+        """Block until run() has finished. Returns False on timeout."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return not self.is_running()
 
     def load(self, filename):
+        """Open filename for playback. Returns False if it cannot be read."""
         try:
-            if self.isRunning():
+            if self.is_running():
                 self.stop()
                 self.wait()
-            self.filename = filename
-            self.file_obj = sf.SoundFile(filename, 'r')
-            self.fs = self.file_obj.samplerate
-            self.channels = self.file_obj.channels
+            with self._cond:
+                self._commands.clear()   # meant for the last track, or posted while nothing ran
+            self.track = filename
+            self.filename = getattr(filename, 'path', filename)
+            with sf.SoundFile(self.filename, 'r') as f:
+                self.fs = f.samplerate
+                self.channels = f.channels
+                self._set_track_range(f)
             self.position = 0
-            self.total_frames = len(self.file_obj) 
+            self._clock = (0, time.monotonic(), 0)
+            self._clock_floor = 0
+            self._scrub_cache = ScrubCache()
+            return True
         except:
             print("ERROR: File" + filename + "not found.")
+            return False
 
 
 
@@ -173,86 +1286,1993 @@ class AudioPlayer(QThread):
         self.stop_flag = False
         self.pause_flag = False
 
-        with sf.SoundFile(self.filename, 'r') as f:
-            self.total_frames = len(f)
+        f = SeekIndex.acquire(self.filename)
+        self._indexed = f is not None
+        if f is None:
+            f = sf.SoundFile(self.filename, 'r')
+            self._indexed = not SeekIndex.needs_index(f)
+            if not self._indexed and self.index_seeks:
+                SeekIndex.build_async(self.filename)
+        self._file = f
+        self._read_ahead = self._start_read_ahead()
+        self._warmed = False
+
+        try:
+            self._set_track_range(f)
+            file_frames = max(len(f), 1)
             self.fs = f.samplerate
             self.seconds_total = int(self.total_frames /self.fs)
             self.channels = f.channels
-            self.stream = sd.OutputStream(
-                samplerate=self.fs, channels=self.channels, dtype="float32", blocksize=self.blocksize
-            )
-            self.stream.start()
-            f.seek(self.position)
+            self.dtype, self._lsb = self._stream_format(f)
+            self._stretch = TimeStretch(self.channels, self.speed) if self.speed != 1.0 else None
+            if self.adaptive:
+                self.adaptive.may_shrink()
+            self._open_output()
+            self._read_frame = 0
+            if self.position or self._offset:
+                self._seek(self.position)
+            if self.loop is not None:
+                self._prefetch_loop(self.loop)
             try:
-                while not self.stop_flag:
-                    # ---- Handle seek even when paused ----
-                    if self.pause_flag:
-                        if self.seek_flag:
-                            f.seek(self.seek_target)
-                            self.position = self.seek_target
-                            self.seek_flag = False
-                            self.position_signal.emit(self.position)
-                        self.msleep(100)
+                while self._apply_commands():
+                    if self._scrub_to is not None:
+                        self._play_grain(self._scrub_to)
+                        self._scrub_to = None
+                        continue
+                    if self.pause_flag or self._scrubbing:
+                        # Sleep until the next command; no wake-ups while paused
+                        if self._read_ahead is not None:
+                            self._read_ahead.active = False
+                        with self._cond:
+                            while not self._commands:
+                                self._cond.wait()
+                        if self._read_ahead is not None:
+                            self._read_ahead.active = True
                         continue
 
-                    # ---- Handle seek during playback ----
-                    if self.seek_flag:
-                        f.seek(self.seek_target)
-                        self.position = self.seek_target
-                        self.seek_flag = False
-                        self.position_signal.emit(self.position)
-                    data = f.read(self.blocksize, dtype='float32')
+                    f = self._file
+                    t0 = time.perf_counter()
+                    data = self._render_block(f)
+                    end = len(data) == 0
+                    if self._stretch is not None:
+                        data = self._stretch.flush() if end else self._stretch.process(data)
+                        if len(data) == 0 and not end:
+                            continue  # the stretcher needs more input for a grain
                     if len(data) == 0:
                         break
-                    if data.ndim == 1:
-                        data = np.expand_dims(data, axis=1)
-                    data = data * self.volume
-                    self.stream.write(data)
-                    self.chunk_signal.emit(data.copy())
-                    self.position = f.tell()
+                    t1 = time.perf_counter()
+                    available = self.output.write_available
+                    underflowed = self.output.write(data)
+                    self.stats.record_block(t1 - t0, time.perf_counter() - t1, underflowed, available)
+                    if underflowed and self.adaptive and self.adaptive.underflow():
+                        self._reopen_output()
+                    if self.visuals and self._listeners['chunk']:
+                        self.stats.chunks_emitted += 1
+                        self._emit('chunk', self._visual_copy(data))
+                    self.position = self._read_frame
                     self.seconds_elapsed = self.position / self.fs
-                    self.position_signal.emit(self.position)
+                    if self._read_ahead is not None:
+                        self._read_ahead.advance((self._offset + self._read_frame) / file_frames)
+                        if not self._warmed and self.total_frames - self._read_frame < self.warm_seconds * self.fs:
+                            self._warm_next()
+                    # the clock runs in source frames: the stretcher's backlog and the
+                    # output delay are both behind what was read from the file
+                    rate = self.fs * self.speed
+                    behind = self._stretch.pending() if self._stretch is not None else 0
+                    audible = self.position - behind - self.output.delay * rate
+                    if self.loop is not None and self.position >= self.loop[0] > audible:
+                        audible += self.loop[1] - self.loop[0]   # still hearing the pass before the wrap
+                    self._clock = (max(audible, self._clock_floor), time.monotonic(), rate)
+                    self.stats.maybe_log(self.stats_log_interval)
+                    if end:
+                        break
 
             finally:
-                if self.stream:
-                    self.stream.stop()
-                    self.stream.close()
-                    self.stream = None
-                self.song_finished.emit()
+                self.output.stop()
+                self._freeze_clock()
+                self._emit('finished')
+        finally:
+            if self._read_ahead is not None:
+                self._read_ahead.close()
+                background_io.unregister(self._read_ahead)
+                self._read_ahead = None
+            if self._indexed and SeekIndex.needs_index(self._file):
+                # keep the indexed handle for the next play of this file
+                SeekIndex.release(self.filename, self._file)
+            else:
+                self._file.close()
+
 
 
+    def _stream_format(self, f):
+        if self.passthrough and self.speed == 1.0 and f.subtype in NATIVE_FORMATS:
+            return NATIVE_FORMATS[f.subtype]
+        return 'float32', None
+
+    def _set_track_range(self, f):
+        if isinstance(self.track, CueTrack):
+            self._offset, end = self.track.frame_range(f.samplerate, len(f))
+            self.total_frames = self._end = end - self._offset
+        else:
+            self._offset, self._end = 0, None
+            self.total_frames = len(f)
+
+    def _start_read_ahead(self):
+        if not self.read_ahead:
+            return None
+        try:
+            reader = ReadAhead(self.filename)
+        except OSError as e:
+            log.info("no read-ahead for %s: %s", self.filename, e)
+            return None
+        background_io.register(reader)
+        return reader
+
+    def _warm_next(self):
+        """Near the end of the track, get the start of the next file into the page cache."""
+        following = self.upcoming
+        if following is None:
+            return   # nothing next, or not known yet; looked at again next block
+        self._warmed = True
+        if not (isinstance(following, CueTrack) and following.follows(self.track)):
+            ReadAhead.warm(following)   # unless it continues this file, the read-ahead has that
+
+    def _next_track(self):
+        """At the end of a CUE track, run on into the next one if it follows in the file."""
+        following = self.upcoming
+        if not (isinstance(following, CueTrack) and following.follows(self.track)):
+            return False
+        # the decoder is already at the right frame, nothing is reopened or sought
+        self.track = following
+        self.upcoming = None    # until the caller, told by 'track', gives the one after
+        self._set_track_range(self._file)
+        self._read_frame = 0
+        self.loop = None
+        self._clock_floor = 0
+        self._warmed = False
+        self._emit('track', following)
+        return True
+
+    def _open_output(self):
+        blocksize = self.blocksize * (self.adaptive.factor if self.adaptive else 1)
+        self.output.start(self.fs, self.channels, self.dtype, blocksize, self.latency)
+        self._allocate_buffers(self.channels, blocksize)
+        self.stats.buffer_frames = blocksize
+        self.stats.sample_format = self.dtype
+
+    def _reopen_output(self):
+        self.output.stop()
+        self._open_output()
+
+    def _set_speed(self, speed):
+        if speed == 1.0 and self._stretch is not None:
+            # carry on from the file where the stretched audio got to
+            self.position -= self._stretch.pending()
+            self._seek(self.position)
+            self._stretch = None
+        elif speed != 1.0 and self._stretch is None:
+            self._stretch = TimeStretch(self.channels, speed)
+        elif self._stretch is not None:
+            self._stretch.speed = speed
+        self.speed = speed
+        # time-stretching needs float samples, passthrough can resume at 1.0
+        if self._stream_format(self._file) != (self.dtype, self._lsb):
+            self.dtype, self._lsb = self._stream_format(self._file)
+            self._reopen_output()
+
+    # --- Block buffers ---
+    # The hot loop reuses these arrays for every block so steady-state playback
+    # does not allocate NumPy memory (less GC churn and jitter on long sessions).
+    VIS_BUFFERS = 4  # chunks handed to the visualizer are recycled round-robin
+
+    def _allocate_buffers(self, channels, blocksize=None):
+        shape = (blocksize or self.blocksize, channels)
+        self._block = np.empty(shape, dtype=self.dtype)
+        # the visualizer always gets float32 in [-1, 1)
+        self._vis_ring = [np.empty(shape, dtype='float32') for _ in range(self.VIS_BUFFERS)]
+        self._vis_index = 0
+        self._grain = np.empty((self.SCRUB_GRAIN, channels), dtype='float32')
+        if self._lsb is not None:
+            # requantization scratch, float64 so 32-bit samples survive the round trip
+            self._work = np.empty(shape)
+            self._dither = (np.empty(shape), np.empty(shape))
+            self._int_scale = -1.0 / np.iinfo(self.dtype).min
+            self._grain_native = np.empty((self.SCRUB_GRAIN, channels), dtype=self.dtype)
+
+    def _render_block(self, f):
+        """Read the next block into the preallocated buffer and apply the volume.
+
+        Returns a view on the filled part of the buffer (empty at end of file).
+        Mono files are read as a (frames, 1) view, so no expand_dims is needed.
+        """
+        data = self._fill(f, self._block)
+        if self._lsb is None:
+            np.multiply(data, self.volume, out=data)
+        elif self.volume != 1.0:
+            self._requantize(data)
+        return data
+
+    def _fill(self, f, out):
+        """Read source frames into out, wrapping from the loop's B back to A.
+
+        Stops at the end of a CUE track unless the next one follows on.
+        Returns the filled view; it is short only at the end of the track.
+        """
+        if self.loop is None and self._end is None:
+            data = f.read(out=out)
+            self._read_frame += len(data)
+            return data
+        filled = 0
+        while filled < len(out):
+            frame = self._read_frame
+            take = len(out) - filled
+            a, b = self.loop or (None, None)
+            if b is not None and frame < b:
+                take = min(take, b - frame)  # stop at B when coming from before it
+            if self._end is not None:
+                take = min(take, self._end - frame)
+                if take <= 0:
+                    if self._next_track():
+                        continue
+                    break
+            cached = self._loop_audio
+            if b is not None and cached is not None and cached[:2] == (a, b) and a <= frame \
+                    and cached[2].dtype == out.dtype:
+                got = len(cached[2][frame - a:frame - a + take])
+                out[filled:filled + got] = cached[2][frame - a:frame - a + take]
+            else:
+                if f.tell() != frame + self._offset:
+                    self._seek(frame)
+                    f = self._file
+                got = len(f.read(out=out[filled:filled + take]))
+            filled += got
+            self._read_frame += got
+            if self._read_frame == b:
+                self._read_frame = a
+                self.loop_wraps += 1
+            elif got < take:
+                break   # end of file
+        return out[:filled]
+
+    # Loops up to this long are decoded into memory once, then replayed from
+    # there; longer ones wrap with a sample-accurate seek of the decoder
+    LOOP_CACHE_SECONDS = 30
+
+    def _prefetch_loop(self, loop):
+        a, b = loop
+        if self._loop_audio is not None and self._loop_audio[:2] == loop:
+            return
+        self._loop_audio = None
+        if (b - a) > self.LOOP_CACHE_SECONDS * self.fs:
+            return
+        threading.Thread(target=self._decode_loop, args=(a, b, self.dtype, self._offset), daemon=True).start()
+
+    def _decode_loop(self, a, b, dtype, offset):
+        # own handle, the playback thread keeps reading meanwhile
+        with sf.SoundFile(self.filename, 'r') as f:
+            f.seek(a + offset)
+            missing = a + offset - f.tell()
+            if missing > 0:
+                f.read(missing, dtype=dtype)
+            audio = f.read(b - a, dtype=dtype, always_2d=True)
+        if self.loop == (a, b):
+            self._loop_audio = (a, b, audio)
+
+    SCRUB_GRAIN = 2048  # frames, ~46 ms at 44.1 kHz
+    _scrub_window = np.hanning(SCRUB_GRAIN).astype('float32')[:, None]
+
+    def _play_grain(self, frame):
+        """Write one Hann-windowed grain centred on frame, decoded via the scrub cache."""
+        grain = self._scrub_cache.read(self._file, frame + self._offset - self.SCRUB_GRAIN // 2, self._grain)
+        np.multiply(grain, self._scrub_window, out=grain)
+        np.multiply(grain, self.volume, out=grain)
+        if self._lsb is not None:
+            np.multiply(grain, np.iinfo(self.dtype).max, out=grain)
+            np.copyto(self._grain_native, grain, casting='unsafe')
+            grain = self._grain_native
+        self.output.write(grain)
+        self._clock = (frame, time.monotonic(), 0)
+
+    def _requantize(self, data):
+        """Scale integer samples by the volume in place, with TPDF dither.
+
+        Two uniform randoms give triangular noise of +-1 LSB, which makes the
+        rounding error independent of the signal instead of audible distortion.
+        """
+        n = len(data)
+        work, a, b = self._work[:n], self._dither[0][:n], self._dither[1][:n]
+        np.multiply(data, self.volume / self._lsb, out=work)   # in LSB units
+        self._rng.random(out=a)
+        self._rng.random(out=b)
+        np.subtract(a, b, out=a)
+        np.add(work, a, out=work)
+        np.rint(work, out=work)
+        info = np.iinfo(data.dtype)
+        np.clip(work, info.min // self._lsb, info.max // self._lsb, out=work)
+        np.multiply(work, self._lsb, out=work)
+        np.copyto(data, work, casting='unsafe')
+
+    def _visual_copy(self, data):
+        """Copy a block into the next visualizer buffer.
+
+        The signal is delivered asynchronously, so the visualizer must not see
+        the block buffer that is overwritten by the next read.
+        """
+        buf = self._vis_ring[self._vis_index][:len(data)]
+        self._vis_index = (self._vis_index + 1) % len(self._vis_ring)
+        data = data[-len(buf):]  # stretched blocks can be longer, show the newest part
+        if self._lsb is None:
+            np.copyto(buf, data)
+        else:
+            np.multiply(data, self._int_scale, out=buf)
+        return buf
+
+    # --- Transport commands ---
+    # Called from the GUI thread. Commands are queued and applied by run() at
+    # the next block boundary, or right away when playback is paused.
+    def _post(self, command, value=None):
+        with self._cond:
+            self._commands.append((command, value, time.perf_counter()))
+            self._cond.notify()
+
+    def _apply_commands(self):
+        """Apply queued commands. Returns False once playback should stop."""
+        if not self._commands:
+            return not self.stop_flag
+        with self._cond:
+            commands = list(self._commands)
+            self._commands.clear()
+
+        # A burst of seeks (scrubbing, repeated clicks) only needs the last one
+        last_seek = max((i for i, c in enumerate(commands) if c[0] == 'seek'), default=-1)
+
+        for i, (command, value, posted) in enumerate(commands):
+            if command == 'stop':
+                self.stop_flag = True
+                self.pause_flag = False
+            elif command == 'pause':
+                self.pause_flag = True
+                self._freeze_clock()
+            elif command == 'resume':
+                self.pause_flag = False
+                if self.adaptive and self.adaptive.may_shrink():
+                    self._reopen_output()
+            elif command == 'volume':
+                self.volume = value
+            elif command == 'output':
+                if value is not self.output:
+                    self.output.close()
+                self.output = value
+                self._open_output()
+            elif command == 'loop':
+                self.loop = value
+                if value is not None:
+                    self._prefetch_loop(value)
+                    if value[0] <= self._read_frame and value[1] < self._read_frame:
+                        # B was set at the audible frame, decoding is already past it
+                        self._read_frame = value[0]
+                elif self._file.tell() != self._read_frame:
+                    # the loop played from memory, put the decoder back in step
+                    self._seek(self._read_frame)
+            elif command == 'scrub':
+                self._scrubbing = True
+                self._scrub_to = value
+            elif command == 'speed':
+                self._set_speed(value)
+            elif command == 'profile':
+                self.blocksize, self.latency = value
+                self._reopen_output()
+            elif command == 'seek':
+                if i != last_seek:
+                    self.seeks_coalesced += 1
+                    continue
+                if self.adaptive and self.adaptive.may_shrink():
+                    self._reopen_output()
+                self._seek(value)
+                self._scrubbing = False
+                self._scrub_to = None
+                if self._stretch is not None:
+                    self._stretch.reset()
+                self.position = value
+                self.seconds_elapsed = self.position / self.fs
+                self._clock_floor = value
+                self._clock = (value, time.monotonic(), 0)
+                self._emit('position', self.position)
+            self.command_latency = time.perf_counter() - posted
+            self.max_command_latency = max(self.max_command_latency, self.command_latency)
+            self.stats.command.add(self.command_latency)
+        return not self.stop_flag
+
+    def _seek(self, frame):
+        """Seek the decoder to exactly frame, switching to an indexed handle if one is ready."""
+        start = time.perf_counter()
+        if not self._indexed:
+            indexed = SeekIndex.acquire(self.filename)
+            if indexed is not None:
+                self._file.close()
+                self._file = indexed
+                self._indexed = True
+        f = self._file
+        f.seek(frame + self._offset)
+        # Some decoders land on a packet boundary before the target; read up to it
+        missing = frame + self._offset - f.tell()
+        while missing > 0:
+            read = len(f.read(out=self._block[:min(missing, len(self._block))]))
+            if read == 0:
+                break
+            missing -= read
+        self.seek_latency = time.perf_counter() - start
+        self.max_seek_latency = max(self.max_seek_latency, self.seek_latency)
+        self.stats.seek.add(self.seek_latency)
+        self._read_frame = frame
+
+    def clock_frame(self, now=None):
+        """Frame being heard now, interpolated from the clock published after each write."""
+        frame, stamp, rate = self._clock
+        if now is None:
+            now = time.monotonic()
+        frame += (now - stamp) * rate
+        loop = self.loop
+        if loop is None:
+            return int(min(frame, self.position))
+        if frame >= loop[1] > self.position:
+            frame -= loop[1] - loop[0]
+        return int(frame)
+
+    def _freeze_clock(self):
+        self._clock = (self.clock_frame(), time.monotonic(), 0)
 
     def stop(self):
-        self.stop_flag = True
-        self.pause_flag = False  # Also clear pause state
         # Do NOT close or abort the stream here!
         # Let the thread's run() handle it.
-
+        self._post('stop')
 
     def pause(self):
-        self.pause_flag = True
+        self._post('pause')
 
     def resume(self):
-        self.pause_flag = False
+        self._post('resume')
 
     def set_volume(self, value):
-        self.volume = value / 100.0
+        self._post('volume', value / 100.0)
 
     def seek(self, frame):
         """Request a seek to a specific frame in the file."""
-        self.seek_target = frame
-        self.seek_flag = True
+        self._post('seek', frame)
+
+    def set_output(self, output):
+        """Switch to another OutputBackend, at the next block if playing; the old one is closed."""
+        if self.is_running():
+            self._post('output', output)
+        else:
+            if output is not self.output:
+                self.output.close()
+            self.output = output
+
+    def set_loop(self, a=None, b=None):
+        """Repeat frames a to b seamlessly; no arguments turns the loop off."""
+        loop = (int(a), int(b)) if a is not None and b is not None and b > a else None
+        if self.is_running():
+            self._post('loop', loop)
+        else:
+            self.loop = loop
+
+    def scrub(self, frame):
+        """Play a short grain around frame. Playback holds until the next seek()."""
+        self._post('scrub', frame)
+
+    def set_speed(self, speed):
+        """Play at speed (0.5 to 3.0) with the pitch unchanged."""
+        speed = min(max(speed, TimeStretch.MIN_SPEED), TimeStretch.MAX_SPEED)
+        if self.is_running():
+            self._post('speed', speed)
+        else:
+            self.speed = speed
+
+    def set_latency_profile(self, name):
+        """Use one of LATENCY_PROFILES, at the next block if playing."""
+        if self.is_running():
+            self._post('profile', LATENCY_PROFILES[name])
+        else:
+            self.blocksize, self.latency = LATENCY_PROFILES[name]
+
+
+
+class RenderProgress:
+    """Progress of render_playlist. Decoding is the first half of fraction, mixing the second."""
+
+    def __init__(self, tracks_total, frames_total, samplerate):
+        self.stage = 'decode'
+        self.tracks_done = 0
+        self.tracks_total = tracks_total
+        self.frames_decoded = 0
+        self.frames_mixed = 0
+        self.frames_total = frames_total
+        self.samplerate = samplerate
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def fraction(self):
+        if not self.frames_total:
+            return 1.0
+        return (self.frames_decoded + self.frames_mixed) / (2 * self.frames_total)
+
+    @property
+    def realtime_factor(self):
+        """Seconds of the mix rendered per wall-clock second (projected until done)."""
+        elapsed = self.elapsed
+        if not elapsed:
+            return 0.0
+        return self.fraction * self.frames_total / self.samplerate / elapsed
+
+
+def _render_track(path, out_path, volume, blocksize):
+    """Worker: run one track through the live PlaybackEngine into a float WAV."""
+    output = FileOutput(out_path, subtype='FLOAT')
+    engine = PlaybackEngine(output=output)
+    engine.index_seeks = False
+    engine.read_ahead = False
+    engine.blocksize = blocksize
+    engine.volume = volume
+    if not engine.load(path):
+        raise OSError(f"cannot read {path}")
+    engine.run()
+    output.close()
+    return out_path
+
+
+def render_playlist(song_list, path, volume=1.0, gap=0.0, crossfade=0.0,
+                    blocksize=65536, jobs=None, progress=None):
+    """Render song_list into one sound file as fast as possible.
+
+    Tracks are decoded by the live pipeline (PlaybackEngine with a file
+    sink, so no clock) in parallel worker processes, then joined here in
+    large blocks with gap seconds of silence or crossfade seconds of
+    overlap between tracks. progress(RenderProgress) is called as work
+    completes. Mono tracks are upmixed; all tracks must share a sample rate.
+    """
+    infos = [sf.info(getattr(song, 'path', song)) for song in song_list]
+    if not infos:
+        raise ValueError("nothing to render")
+    lengths = []
+    for song, info in zip(song_list, infos):
+        start, end = song.frame_range(info.samplerate, info.frames) if isinstance(song, CueTrack) else (0, info.frames)
+        lengths.append(end - start)
+    samplerate = infos[0].samplerate
+    if any(info.samplerate != samplerate for info in infos):
+        raise ValueError("all tracks must have the same sample rate")
+    channels = max(info.channels for info in infos)
+    state = RenderProgress(len(infos), sum(lengths), samplerate)
+    report = progress or (lambda state: None)
+
+    with tempfile.TemporaryDirectory(prefix="pulsepy-render-") as tmp:
+        tmp_paths = [os.path.join(tmp, f"{i:05d}.wav") for i in range(len(infos))]
+        # spawn, not fork: a forked child of the GUI could inherit a lock held by one of its threads
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [
+                pool.submit(_render_track, song, tmp_path, volume, blocksize)
+                for song, tmp_path in zip(song_list, tmp_paths)
+            ]
+            for future, frames in zip(futures, lengths):
+                future.result()
+                state.tracks_done += 1
+                state.frames_decoded += frames
+                report(state)
+
+        state.stage = 'mix'
+        fade_frames = int(crossfade * samplerate)
+        gap_frames = int(gap * samplerate) if not fade_frames else 0
+
+        def upmix(block):
+            return block if block.shape[1] == channels else np.repeat(block, channels, axis=1)
+
+        with sf.SoundFile(path, 'w', samplerate, channels) as out:
+            tail = None  # end of the previous track, held back for the crossfade
+            for i, tmp_path in enumerate(tmp_paths):
+                with sf.SoundFile(tmp_path) as f:
+                    remaining = len(f)
+                    if tail is not None:
+                        overlap = min(len(tail), remaining)
+                        if overlap:
+                            ramp = np.linspace(0, 1, overlap, dtype='float32')[:, None]
+                            head = upmix(f.read(overlap, dtype='float32', always_2d=True))
+                            out.write(tail[:len(tail) - overlap])
+                            out.write(tail[len(tail) - overlap:] * (1 - ramp) + head * ramp)
+                            remaining -= overlap
+                        else:
+                            out.write(tail)
+                        state.frames_mixed += len(tail)
+                    if i and gap_frames:
+                        out.write(np.zeros((gap_frames, channels), dtype='float32'))
+
+                    keep = min(fade_frames, remaining) if i < len(tmp_paths) - 1 else 0
+                    while remaining > keep:
+                        block = f.read(min(blocksize, remaining - keep), dtype='float32', always_2d=True)
+                        out.write(upmix(block))
+                        remaining -= len(block)
+                        state.frames_mixed += len(block)
+                        report(state)
+                    tail = upmix(f.read(keep, dtype='float32', always_2d=True)) if keep else None
+            state.frames_mixed = state.frames_total
+            report(state)
+    return state
+
+
+def read_m3u(path):
+    """Return the file paths listed in an M3U playlist, with CUE sheets expanded."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return expand_cue_sheets([
+            line.strip() for line in f
+            if line.strip() and not line.startswith('#')
+        ])
+
+
+class CueTrack(str):
+    """One track of a CUE sheet: a range of a single audio file.
+
+    start and end are in CD frames (1/75 s, as in the sheet); end is None
+    for the last track of a file. The str value (audio path plus #number)
+    is unique per track, so playlists and the song list treat it like any
+    other song; .path is the file to open.
+    """
+
+    def __new__(cls, path, number, start, end=None, title=None, performer=None, sheet=None):
+        track = super().__new__(cls, f"{path}#{number:02d}")
+        track.path = path
+        track.number = number
+        track.start = start
+        track.end = end
+        track.title = title
+        track.performer = performer
+        track.sheet = sheet
+        return track
+
+    def __reduce__(self):
+        # rebuilt with the attributes, e.g. when sent to a render worker
+        return (CueTrack, (self.path, self.number, self.start, self.end,
+                           self.title, self.performer, self.sheet))
+
+    @property
+    def name(self):
+        if self.title:
+            return f"{self.number:02d}. {self.title}"
+        return f"{os.path.splitext(os.path.basename(self.path))[0]} #{self.number:02d}"
+
+    @property
+    def entry(self):
+        """What the sheet says about the track besides its file and number; an edit changes it."""
+        return self.start, self.end, self.title, self.performer
+
+    def frame_range(self, samplerate, frames):
+        """(first, end) sample frame of the track in a file of frames samples."""
+        start = self.start * samplerate // 75
+        end = self.end * samplerate // 75 if self.end is not None else frames
+        return start, min(end, frames)
+
+    def follows(self, other):
+        """True if this track starts exactly where other ends, in the same file."""
+        return isinstance(other, CueTrack) and other.path == self.path and other.end == self.start
+
+
+def song_title(song):
+    """Name a song is listed under: a CUE track's title, or the file name without extension."""
+    if isinstance(song, CueTrack):
+        return song.name
+    return os.path.splitext(os.path.basename(song))[0]
+
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.flac', '.ogg', '.aiff')
+
+
+def _cue_time(stamp):
+    minutes, seconds, frames = (int(part) for part in stamp.split(':'))
+    return (minutes * 60 + seconds) * 75 + frames
+
+
+def read_cue(path):
+    """Parse a CUE sheet into CueTracks.
+
+    A track runs from its INDEX 01 to the next track's INDEX 01 in the
+    same file, so the pregap plays at the end of the previous track and
+    the tracks add up to the whole file.
+    """
+    try:
+        with open(path, encoding='utf-8-sig') as f:
+            text = f.read()
+    except UnicodeDecodeError:
+        with open(path, encoding='latin-1') as f:
+            text = f.read()
+
+    folder = os.path.dirname(os.path.abspath(path))
+    entries = []
+    audio = album_performer = None
+    current = None
+    for line in text.splitlines():
+        match = re.match(r'\s*(\S+)\s*(.*?)\s*$', line)
+        if not match:
+            continue
+        keyword, rest = match.group(1).upper(), match.group(2)
+        quoted = re.match(r'"(.*)"', rest)
+        value = quoted.group(1) if quoted else rest
+        if keyword == 'FILE':
+            audio = os.path.join(folder, quoted.group(1) if quoted else rest.rsplit(None, 1)[0])
+            if not os.path.exists(audio):
+                # rips are often re-encoded without fixing the sheet (.wav -> .flac)
+                stem = os.path.splitext(audio)[0]
+                audio = next((stem + ext for ext in AUDIO_EXTENSIONS if os.path.exists(stem + ext)), audio)
+        elif keyword == 'TRACK':
+            number, kind = (rest.split() + [''])[:2]
+            current = None
+            if kind.upper() == 'AUDIO' and audio:
+                current = {'number': int(number), 'path': audio, 'title': None,
+                           'performer': album_performer, 'start': None}
+                entries.append(current)
+        elif keyword == 'TITLE' and current is not None:
+            current['title'] = value
+        elif keyword == 'PERFORMER':
+            if current is not None:
+                current['performer'] = value
+            else:
+                album_performer = value
+        elif keyword == 'INDEX' and current is not None:
+            number, stamp = rest.split()[:2]
+            if int(number) == 1:
+                current['start'] = _cue_time(stamp)
+
+    entries = [entry for entry in entries if entry['start'] is not None]
+    tracks = []
+    for entry, following in zip(entries, entries[1:] + [None]):
+        end = following['start'] if following and following['path'] == entry['path'] else None
+        tracks.append(CueTrack(entry['path'], entry['number'], entry['start'], end,
+                               entry['title'], entry['performer'], os.path.abspath(path)))
+    return tracks
+
+
+def expand_cue_sheets(paths, read=read_cue):
+    """Replace .cue sheets in paths by their tracks, dropping the audio files they cover."""
+    songs, covered = [], set()
+    for path in paths:
+        if not path.lower().endswith('.cue'):
+            songs.append(path)
+            continue
+        try:
+            tracks = read(path)
+        except (OSError, ValueError) as e:
+            log.warning("skipping cue sheet %s: %s", path, e)
+            continue
+        songs.extend(tracks)
+        covered.update(os.path.abspath(track.path) for track in tracks)
+    if not covered:
+        return songs
+    return [
+        song for song in songs
+        if isinstance(song, CueTrack) or os.path.abspath(song) not in covered
+    ]
+
+
+class FolderWatch:
+    """The songs of one music folder, kept current from directory diffs.
+
+    scan() lists the folder once. refresh() lists it again and compares the
+    entries with the last listing, and reports only what changed; nothing
+    else is touched. The listing needs no stat per file: names and inode
+    numbers come from the directory itself, and a rename keeps the inode.
+    refresh(force=False) returns None without listing while the folder's
+    mtime and its .cue sheets are unchanged, so polling costs a stat per
+    sheet and one more. .cue sheets are re-read only when their size or
+    mtime changed.
+    """
+
+    def __init__(self, folder):
+        self.folder = os.path.abspath(folder)
+        self.songs = []
+        self._mtime = None
+        self._entries = {}   # path -> inode
+        self._cues = {}      # sheet path -> ((size, mtime), tracks)
+
+    def _list(self):
+        self._mtime = os.stat(self.folder).st_mtime_ns
+        entries = {}
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                if entry.name.lower().endswith(AUDIO_EXTENSIONS + ('.cue',)) and entry.is_file():
+                    entries[os.path.join(self.folder, entry.name)] = entry.inode()
+        return entries
+
+    @staticmethod
+    def _cue_stamp(path):
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+
+    def _cues_changed(self):
+        # edited in place, a sheet doesn't change the folder's mtime
+        try:
+            return any(self._cue_stamp(path) != stamp for path, (stamp, _) in self._cues.items())
+        except OSError:
+            return True
+
+    def _read_cue(self, path):
+        stamp = self._cue_stamp(path)
+        cached = self._cues.get(path)
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, read_cue(path))
+            self._cues[path] = cached
+        return cached[1]
+
+    def _songs(self):
+        for sheet in [sheet for sheet in self._cues if sheet not in self._entries]:
+            del self._cues[sheet]   # deleted or renamed: one change, not one on every poll
+        return sorted(expand_cue_sheets(list(self._entries), read=self._read_cue))
+
+    def scan(self):
+        """List the folder and return its songs, sorted."""
+        self._entries = self._list()
+        self.songs = self._songs()
+        return self.songs
+
+    def refresh(self, force=True):
+        """(added, removed, renamed) since the last look, or None if nothing changed.
+
+        added and removed are lists of songs, renamed is a list of (old, new):
+        renamed files, and CUE tracks an edited sheet gave new times or titles.
+        """
+        try:
+            if not force and os.stat(self.folder).st_mtime_ns == self._mtime and not self._cues_changed():
+                return None
+            entries = self._list()
+        except OSError:
+            entries = {}   # the folder itself is gone
+        old_entries, self._entries = self._entries, entries
+        old_songs, self.songs = self.songs, self._songs()
+        old_set, new_set = set(old_songs), set(self.songs)
+        added = [song for song in self.songs if song not in old_set]
+        removed = [song for song in old_songs if song not in new_set]
+
+        renamed = []
+        gone = {old_entries[song]: song for song in removed
+                if not isinstance(song, CueTrack) and song in old_entries}
+        for song in list(added):
+            old = gone.pop(entries.get(song), None) if not isinstance(song, CueTrack) else None
+            if old is not None:
+                renamed.append((old, song))
+                added.remove(song)
+                removed.remove(old)
+        old_cues = {song: song for song in old_songs if isinstance(song, CueTrack)}
+        for song in self.songs:
+            old = old_cues.get(song) if isinstance(song, CueTrack) else None
+            if old is not None and old.entry != song.entry:
+                renamed.append((old, song))
+        if not (added or removed or renamed):
+            return None
+        return added, removed, renamed
+
+
+def probe_audio_header(path):
+    """True if the file starts the way a WAV, AIFF, FLAC, Ogg or MP3 file does."""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(12)
+    except OSError:
+        return False
+    if head.startswith(b'RIFF'):
+        return head[8:12] == b'WAVE'
+    if head.startswith(b'FORM'):
+        return head[8:12] in (b'AIFF', b'AIFC')
+    if head.startswith((b'fLaC', b'OggS', b'ID3')):
+        return True
+    return len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0   # MPEG frame sync
+
+
+class FileImport:
+    """Turns dropped files and folders into songs on a background thread.
+
+    Folders are walked in name order. Files are kept if their extension is
+    an audio one and probe() finds an audio header, .cue sheets are
+    expanded, and a file reached twice (through a symlink, or dropped along
+    with its folder) is kept once, by real path. The songs go to on_batch,
+    on the worker thread, in batches of batch_size, or whatever was found
+    within interval seconds, so the first ones show up right away; on_done
+    follows the last batch unless cancel() was called.
+    """
+
+    def __init__(self, paths, on_batch, on_done=None, batch_size=500, interval=0.1,
+                 probe=probe_audio_header):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.on_batch = on_batch
+        self.on_done = on_done
+        self.batch_size = batch_size
+        self.interval = interval
+        self.probe = probe
+        self.found = 0
+        self._cancelled = False
+        self._thread = threading.Thread(target=self._run, name="FileImport", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def cancel(self):
+        self._cancelled = True
+
+    def _chunks(self):
+        # the dropped files as one chunk, then each folder's files, depth first
+        files = [path for path in self.paths if not os.path.isdir(path)]
+        if files:
+            yield files
+        folders = [path for path in reversed(self.paths) if os.path.isdir(path)]
+        visited = set()   # real paths, so a symlink loop is walked once
+        while folders and not self._cancelled:
+            folder = folders.pop()
+            if os.path.realpath(folder) in visited:
+                continue
+            visited.add(os.path.realpath(folder))
+            try:
+                with os.scandir(folder) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError as e:
+                log.warning("skipping %s: %s", folder, e)
+                continue
+            folders.extend(entry.path for entry in reversed(entries)
+                           if entry.is_dir() and not entry.name.startswith('.'))
+            yield [entry.path for entry in entries if not entry.is_dir()]
+
+    def _run(self):
+        seen, batch = set(), []
+        flushed = time.monotonic()
+        for chunk in self._chunks():
+            chunk = [path for path in chunk if path.lower().endswith(AUDIO_EXTENSIONS + ('.cue',))]
+            for song in expand_cue_sheets(chunk):
+                if self._cancelled:
+                    return
+                path = getattr(song, 'path', song)
+                key = (os.path.realpath(path), getattr(song, 'number', None))
+                if key in seen:
+                    continue
+                if not isinstance(song, CueTrack):
+                    background_io.wait()
+                    if not self.probe(path):
+                        continue
+                seen.add(key)
+                batch.append(song)
+                if len(batch) >= self.batch_size or time.monotonic() - flushed >= self.interval:
+                    self._flush(batch)
+                    batch, flushed = [], time.monotonic()
+            if batch and time.monotonic() - flushed >= self.interval:
+                # also between folders, when a batch started but the rest held no songs
+                self._flush(batch)
+                batch, flushed = [], time.monotonic()
+        if batch and not self._cancelled:
+            self._flush(batch)
+        if self.on_done is not None and not self._cancelled:
+            self.on_done()
+
+    def _flush(self, batch):
+        self.found += len(batch)
+        self.on_batch(batch)
+
+
+def read_track_info(song):
+    """Tags and duration of a song (path or CueTrack) as a dict, empty if unreadable.
+
+    Only the header is read: {'duration': seconds, 'title': ..., 'artist': ...,
+    'album': ..., 'track': number, 'added': mtime}, tags missing from the file
+    are left out.
+    """
+    path = getattr(song, 'path', song)
+    try:
+        with sf.SoundFile(path, 'r') as f:
+            tags = f.copy_metadata()
+            frames, samplerate = f.frames, f.samplerate
+        added = os.stat(path).st_mtime
+    except (OSError, RuntimeError, sf.LibsndfileError):
+        return {}
+    info = {key: tags[key] for key in ('title', 'artist', 'album') if tags.get(key)}
+    number = re.match(r'\s*(\d+)', tags.get('tracknumber', ''))   # "3" or "3/12"
+    if number:
+        info['track'] = int(number.group(1))
+    info['added'] = added
+    if isinstance(song, CueTrack):
+        # the file's tags describe the whole album, the sheet names the track
+        info.pop('title', None)
+        info['track'] = song.number
+        if song.title:
+            info['title'] = song.title
+        if song.performer:
+            info['artist'] = song.performer
+        start, end = song.frame_range(samplerate, frames)
+        frames = end - start
+    info['duration'] = frames / samplerate
+    return info
+
+
+class TrackInfoLoader:
+    """Reads tags and durations on a small pool of worker threads.
+
+    Songs are queued by priority class: VISIBLE rows first, then their
+    NEIGHBOURS, then the REST of the library. prioritize() is called again
+    whenever the view scrolls; entries from an older call fall back to REST,
+    so a fast scroll never leaves stale work ahead of what is on screen.
+    Each job is one header read, so a visible row waits at most for the jobs
+    already running.
+
+    Results are collected until take(); on_ready is called, on a worker
+    thread, only for the first result after a take(), so the receiver wakes
+    up once per batch. The loader itself only remembers the hashes of the
+    songs it read, the receiver keeps the info (a TrackStore in the GUI).
+    """
+    VISIBLE, NEIGHBOURS, REST = 0, 1, 2
+
+    def __init__(self, on_ready=None, workers=4, reader=read_track_info):
+        self.on_ready = on_ready
+        self.workers = workers
+        self.reader = reader
+        self._done = set()         # hash(song) of songs read; a collision only leaves a song untagged
+        self._heap = []            # (class, -generation, seq, song)
+        self._loading = set()
+        self._batch = []
+        self._generation = 0
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._closed = False
+
+    def add(self, songs):
+        """Queue songs at REST priority; ones already loaded are skipped."""
+        with self._cond:
+            for song in songs:
+                if hash(song) not in self._done:
+                    self._heap.append((self.REST, 0, next(self._seq), song))
+            heapq.heapify(self._heap)
+            self._cond.notify_all()
+        self._start()
+
+    def forget(self, songs):
+        """Read songs again when they are next added, their files changed."""
+        with self._cond:
+            self._done.difference_update(map(hash, songs))
+
+    def clear(self):
+        """Drop everything queued (the library changed); loaded info is kept."""
+        with self._cond:
+            self._heap.clear()
+
+    def prioritize(self, visible, neighbours=()):
+        with self._cond:
+            self._generation += 1
+            for cls, songs in ((self.VISIBLE, visible), (self.NEIGHBOURS, neighbours)):
+                for song in songs:
+                    if hash(song) not in self._done and song not in self._loading:
+                        heapq.heappush(self._heap, (cls, -self._generation, next(self._seq), song))
+            self._cond.notify_all()
+        self._start()
+
+    def take(self):
+        """The (song, info) pairs finished since the last call."""
+        with self._cond:
+            batch, self._batch = self._batch, []
+        return batch
+
+    def pending(self):
+        with self._cond:
+            return len(self._heap) + len(self._loading)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _start(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run, name="TrackInfoLoader", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _next(self):
+        # called with the lock held; None once closed
+        while True:
+            while not self._heap and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return None
+            cls, generation, _, song = heapq.heappop(self._heap)
+            if hash(song) in self._done or song in self._loading:
+                continue
+            if cls != self.REST and -generation != self._generation:
+                # queued for a view that has scrolled away since
+                heapq.heappush(self._heap, (self.REST, 0, next(self._seq), song))
+                continue
+            self._loading.add(song)
+            return song
+
+    def _run(self):
+        while True:
+            with self._cond:
+                song = self._next()
+            if song is None:
+                return
+            background_io.wait()
+            info = self.reader(song)
+            with self._cond:
+                self._done.add(hash(song))
+                self._loading.discard(song)
+                self._batch.append((song, info))
+                notify = len(self._batch) == 1
+            if notify and self.on_ready is not None:
+                self.on_ready()
+
+
+_DIGITS = re.compile(r'\d+')
+
+
+def _collation_number(match):
+    # the digit count first, so "2" sorts before "10"
+    digits = match.group().lstrip('0') or '0'
+    return f"\0{len(digits):03d}{digits}"
+
+
+def collation_key(s):
+    """Sort key for names and tags: case and accents ignored, numbers by value ("2" before "10")."""
+    s = s.casefold()
+    if not s.isascii():
+        s = ''.join(c for c in unicodedata.normalize('NFKD', s) if not unicodedata.combining(c))
+    return _DIGITS.sub(_collation_number, s)
+
+
+def collation_rank(strings):
+    """int32 rank of each string by collation_key(); strings that collate equal share a rank."""
+    keys = [collation_key(s) for s in strings]
+    rank = [0] * len(keys)
+    r, previous = -1, None
+    for i in sorted(range(len(keys)), key=keys.__getitem__):
+        if keys[i] != previous:
+            r, previous = r + 1, keys[i]
+        rank[i] = r
+    return np.array(rank, np.int32)
+
+
+class StringTable:
+    """Interned strings: each distinct string is kept once and referred to by its code.
+
+    Code 0 is the empty string, which stands for "none".
+    """
+
+    def __init__(self):
+        self.strings = ['']
+        self._codes = {'': 0}
+
+    def code(self, s):
+        c = self._codes.get(s)
+        if c is None:
+            c = self._codes[s] = len(self.strings)
+            self.strings.append(s)
+        return c
+
+    def __getitem__(self, code):
+        return self.strings[code]
+
+    def __len__(self):
+        return len(self.strings)
+
+
+class TrackStore:
+    """The library's songs as columns instead of one Python string per song and view.
+
+    A path is split into its directory, interned in a table, and the file
+    name, kept as UTF-8 in one shared buffer; a row holds the directory code
+    and the offset where its name ends. Tags are codes into a shared string
+    table, durations a float32 column (NaN until known), track numbers come
+    from the tags or a leading number in the file name. CueTracks keep their
+    object in a side table, as they carry more than a path.
+
+    Sorting goes through collation ranks: an int32 per distinct name,
+    directory or tag, worked out when a sort asks for them (a tag's only over
+    the strings its column uses), so that a sort over several keys is one
+    np.lexsort of int columns. Grouping only needs equal values, so
+    group_key() gives the string codes themselves and ranks nothing.
+
+    Rows are never reused, so a row number names a song for the store's
+    lifetime. find() goes through a sorted column of hashes; rows added
+    since it was sorted are scanned directly until there are enough of them
+    to sort again. Not thread-safe: it belongs to the GUI thread.
+    """
+    TAGS = ('title', 'artist', 'album')
+    _UNSORTED = 4096   # rows find() scans linearly before the hash index is rebuilt
+
+    def __init__(self):
+        self.dirs = StringTable()
+        self.strings = StringTable()
+        self._names = bytearray()        # file names, each followed by '\n'
+        self._name_end = array('I')      # offset just past each row's name
+        self._dir = array('I')
+        self._hash = array('q')
+        self._duration = array('f')
+        self._track = array('H')
+        self._added = array('d')         # file mtime, NaN until known
+        self._tags = {key: array('I') for key in self.TAGS}
+        self._cues = {}                  # row -> CueTrack
+        self._index = (np.empty(0, np.int64), np.empty(0, np.int32))   # sorted hashes, their rows
+        self._indexed = 0                # rows covered by _index
+        self._search = None              # lowercased _names and where each row's name ends, for match()
+        self._tag_search = (0, None)     # the same over the tag strings, and how many it covers
+        self._name_rank = None
+        self._dir_rank = (0, None)
+        self._tag_rank = {}              # tag -> (_info_version, rank per string code)
+        self._info_version = 0
+
+    def __len__(self):
+        return len(self._dir)
+
+    # --- rows ---
+    def add(self, song):
+        """Row of song, appending it if it isn't stored yet."""
+        row = self.find(song)
+        if row < 0:
+            return self._append(song, hash(song))
+        if isinstance(song, CueTrack):
+            self._update_cue(row, song)
+        return row
+
+    def extend(self, songs):
+        """Rows of songs (an array('i')), appending the ones not stored yet."""
+        songs = list(songs)
+        self._reindex()
+        hashes = np.fromiter(map(hash, songs), np.int64, len(songs))
+        rows = array('i', self._lookup(songs, hashes))
+        new = {}   # songs appended by this call, for duplicates within songs
+        for i, row in enumerate(rows):
+            if row < 0:
+                song = songs[i]
+                row = new.get(song)
+                if row is None:
+                    row = new[song] = self._append(song, int(hashes[i]))
+                rows[i] = row
+            elif isinstance(songs[i], CueTrack):
+                self._update_cue(row, songs[i])
+        return rows
+
+    def _update_cue(self, row, song):
+        """Keep the latest CueTrack for row: an edited sheet gives equal tracks with new times or titles."""
+        if self._cues[row].entry == song.entry:
+            return
+        self._cues[row] = song
+        start, end = self._name_end[row - 1] if row else 0, self._name_end[row]
+        name = song_title(song).encode('utf-8', 'surrogateescape') + b'\n'
+        if self._names[start:end] != name:
+            self._names[start:end] = name
+            ends = np.frombuffer(self._name_end, np.uint32)
+            ends[row:] = ends[row:].astype(np.int64) + (len(name) - (end - start))
+            self._search = self._name_rank = None
+
+    def _append(self, song, h):
+        if isinstance(song, CueTrack):
+            self._cues[len(self)] = song
+            # the side table rebuilds the song, the name is only searched
+            folder, name = os.path.dirname(song.path) + os.sep, song_title(song)
+        else:
+            cut = max(song.rfind('/'), song.rfind(os.sep)) + 1
+            folder, name = song[:cut], song[cut:]
+        self._names += name.encode('utf-8', 'surrogateescape') + b'\n'
+        self._name_end.append(len(self._names))
+        self._dir.append(self.dirs.code(folder))
+        self._hash.append(h)
+        self._duration.append(float('nan'))
+        number = re.match(r'\s*(\d+)', name)
+        self._track.append(song.number if isinstance(song, CueTrack) else min(int(number.group(1)), 0xffff) if number else 0)
+        self._added.append(float('nan'))
+        for column in self._tags.values():
+            column.append(0)
+        self._search = self._name_rank = None
+        return len(self) - 1
+
+    def name(self, row):
+        start = self._name_end[row - 1] if row else 0
+        return self._names[start:self._name_end[row] - 1].decode('utf-8', 'surrogateescape')
+
+    def song(self, row):
+        cue = self._cues.get(row)
+        if cue is not None:
+            return cue
+        return self.dirs[self._dir[row]] + self.name(row)
+
+    def songs(self, rows):
+        return [self.song(row) for row in rows]
+
+    def find(self, song):
+        """Row of song, -1 if it isn't stored."""
+        if len(self) - self._indexed > self._UNSORTED:
+            self._reindex()
+        h = hash(song)
+        return self._lookup([song], np.array([h], np.int64))[0]
+
+    def _reindex(self):
+        if self._indexed == len(self):
+            return
+        hashes = np.frombuffer(self._hash, np.int64)
+        rows = np.argsort(hashes, kind='stable').astype(np.int32)
+        self._index = (hashes[rows], rows)
+        self._indexed = len(self)
+
+    def _lookup(self, songs, hashes):
+        sorted_hashes, sorted_rows = self._index
+        found = [-1] * len(songs)
+        positions = np.searchsorted(sorted_hashes, hashes)
+        hits = np.flatnonzero(positions < len(sorted_hashes))
+        hits = hits[sorted_hashes[positions[hits]] == hashes[hits]]
+        for i in hits.tolist():
+            # equal hashes sit together; compare the songs themselves
+            pos, h = int(positions[i]), hashes[i]
+            while pos < len(sorted_hashes) and sorted_hashes[pos] == h:
+                row = int(sorted_rows[pos])
+                if self.song(row) == songs[i]:
+                    found[i] = row
+                    break
+                pos += 1
+        if self._indexed < len(self):
+            tail = np.frombuffer(self._hash, np.int64)[self._indexed:]
+            for i, song in enumerate(songs):
+                if found[i] < 0:
+                    for row in (np.flatnonzero(tail == hashes[i]) + self._indexed).tolist():
+                        if self.song(row) == song:
+                            found[i] = row
+                            break
+        return found
+
+    # --- tags ---
+    def set_info(self, row, info):
+        """Store a read_track_info() result for row."""
+        for key, column in self._tags.items():
+            column[row] = self.strings.code(info.get(key) or '')
+        self._duration[row] = info.get('duration', float('nan'))
+        self._added[row] = info.get('added', float('nan'))
+        if info.get('track'):
+            self._track[row] = min(info['track'], 0xffff)
+        self._info_version += 1
+
+    def info(self, row):
+        """row's tags and duration like read_track_info(), None if not loaded yet."""
+        info = {key: self.strings[column[row]] for key, column in self._tags.items() if column[row]}
+        duration = self._duration[row]
+        if duration == duration:   # not NaN
+            info['duration'] = duration
+        if not info:
+            return None
+        if self._track[row]:
+            info['track'] = self._track[row]
+        return info
+
+    # --- searching and sorting ---
+    def match(self, text):
+        """Boolean array over all rows: text is in the file name or a tag, ignoring case."""
+        mask = np.zeros(len(self), bool)
+        text = text.lower().replace('\n', ' ')   # as in the entries, see _search_blob()
+        if not text:
+            mask[:] = True
+            return mask
+        needle = text.encode('utf-8', 'surrogateescape')
+        if self._search is None:
+            # a '\n' inside a name becomes a space; only the terminators stay
+            names = np.frombuffer(self._names, np.uint8).copy()
+            names[names == 10] = 32
+            names[np.frombuffer(self._name_end, np.uint32).astype(np.int64) - 1] = 10
+            self._search = self._search_blob(names.tobytes())
+        self._find_all(*self._search, needle, mask)
+        # each distinct tag is tested once, then spread to the rows using it
+        count, search = self._tag_search
+        if count != len(self.strings):
+            tags = "\n".join([tag.replace("\n", " ") for tag in self.strings.strings]) + "\n"
+            search = self._search_blob(tags.encode('utf-8', 'surrogateescape'))
+            self._tag_search = len(self.strings), search
+        hit = np.zeros(len(self.strings), bool)
+        self._find_all(*search, needle, hit)
+        hit[0] = False
+        for column in self._tags.values():
+            mask |= hit[np.frombuffer(column, np.uint32)]
+        return mask
+
+    @staticmethod
+    def _search_blob(blob):
+        # '\n'-terminated entries (with no '\n' inside), lowercased, with the offset just past each one
+        blob = blob.decode('utf-8', 'surrogateescape').lower().encode('utf-8', 'surrogateescape')
+        ends = np.flatnonzero(np.frombuffer(blob, np.uint8) == 10) + 1
+        return blob, array('q', ends.tolist())
+
+    @staticmethod
+    def _find_all(blob, ends, needle, mask):
+        pos = blob.find(needle)
+        while pos >= 0:
+            # a match never spans entries, the needle has no '\n'; go on from the next one
+            i = bisect.bisect_right(ends, pos)
+            mask[i] = True
+            pos = blob.find(needle, ends[i])
+
+    def sort_key(self, key):
+        """Per-row int or float values that sort like key.
+
+        key is 'name', 'folder', 'track', 'duration', 'added' or a tag.
+        """
+        if key == 'duration':
+            return np.array(self._duration, np.float32)
+        if key == 'added':
+            return np.array(self._added, np.float64)
+        if key == 'track':
+            return np.array(self._track, np.int32)
+        if key == 'name':
+            if self._name_rank is None:
+                self._name_rank = collation_rank(self.name(row) for row in range(len(self)))
+            return self._name_rank
+        if key == 'folder':
+            count, rank = self._dir_rank
+            if count != len(self.dirs):
+                rank = collation_rank(self.dirs.strings)
+                self._dir_rank = (len(self.dirs), rank)
+            return rank[np.frombuffer(self._dir, np.uint32)]
+        codes = np.frombuffer(self._tags[key], np.uint32)
+        version, rank = self._tag_rank.get(key, (None, None))
+        if version != self._info_version:
+            # the string table is shared by all tags; rank just the ones this column uses
+            used = np.unique(codes)
+            rank = np.zeros(len(self.strings), np.int32)
+            rank[used] = collation_rank([self.strings[code] for code in used.tolist()])
+            self._tag_rank[key] = (self._info_version, rank)
+        return rank[codes]
+
+    def group_key(self, key):
+        """Per-row values that are equal exactly where rows share key's value; like sort_key()
+        for grouping rows already sorted by it, without working out any collation."""
+        if key == 'folder':
+            return np.frombuffer(self._dir, np.uint32)
+        if key in self._tags:
+            return np.frombuffer(self._tags[key], np.uint32)
+        return self.sort_key(key)
+
+    def argsort(self, rows, keys):
+        """Indices that sort rows (any int sequence) by keys, the first one leading.
+
+        A key with a leading '-' sorts descending; ties keep their order and
+        unknown durations and dates go last.
+        """
+        rows = np.asarray(rows, np.int64)
+        columns = []
+        for key in reversed(keys):
+            column = self.sort_key(key.lstrip('-'))[rows]
+            columns.append(-column if key.startswith('-') else column)
+        return np.lexsort(columns) if columns else np.arange(len(rows))
+
+    def order(self, rows, keys):
+        """rows sorted by keys, see argsort()."""
+        return np.asarray(rows, np.int64)[self.argsort(rows, keys)]
+
+
+class TrackList:
+    """A list of songs held as TrackStore rows: what PlaylistControl.song_list needs of a list.
+
+    Items go in and come out as songs (path strings or CueTracks); only
+    the row numbers are kept.
+    """
+
+    def __init__(self, store, rows=()):
+        self.store = store
+        self.rows = array('i', rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.store.songs(self.rows[i])
+        return self.store.song(self.rows[i])
+
+    def __setitem__(self, i, song):
+        self.rows[i] = self.store.add(song)
+
+    def __iter__(self):
+        return map(self.store.song, self.rows)
+
+    def __contains__(self, song):
+        row = self.store.find(song)
+        return row >= 0 and row in self.rows
+
+    def index(self, song):
+        row = self.store.find(song)
+        if row >= 0:
+            try:
+                return self.rows.index(row)
+            except ValueError:
+                pass
+        raise ValueError(f"{song!r} is not in list")
+
+    def insert(self, i, song):
+        self.rows.insert(i, self.store.add(song))
+
+    def append(self, song):
+        self.rows.append(self.store.add(song))
+
+    def extend(self, songs):
+        if isinstance(songs, TrackList) and songs.store is self.store:
+            self.rows.extend(songs.rows)
+        else:
+            self.rows.extend(self.store.extend(songs))
+
+    def pop(self, i=-1):
+        return self.store.song(self.rows.pop(i))
+
+    def clear(self):
+        del self.rows[:]
+
+    def row_array(self):
+        """The rows as a NumPy array (a copy, so the list stays resizable)."""
+        return np.array(self.rows, np.int64)
+
+    def take(self, order):
+        """A new TrackList of the songs at the given indices."""
+        tracks = TrackList(self.store)
+        tracks.rows.frombytes(self.row_array()[order].astype(np.int32).tobytes())
+        return tracks
+
+
+class SizedLRU:
+    """Least recently used cache bounded by the total size of its values, not their count."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._items = OrderedDict()  # key -> (value, size)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        item = self._items.get(key)
+        if item is None:
+            return None
+        self._items.move_to_end(key)
+        return item[0]
+
+    def put(self, key, value, size):
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        self._items[key] = (value, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes and len(self._items) > 1:
+            _, (_, evicted) = self._items.popitem(last=False)
+            self.bytes -= evicted
+
+
+COVER_NAMES = ('cover', 'folder', 'front', 'album')
+COVER_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+def _flac_picture(f):
+    """The front cover (or else the first picture) in a FLAC file's metadata blocks."""
+    if f.read(4) != b'fLaC':
+        return None
+    found = None
+    last = False
+    while not last:
+        header = f.read(4)
+        if len(header) < 4:
+            break
+        last = bool(header[0] & 0x80)
+        kind = header[0] & 0x7f
+        length = int.from_bytes(header[1:], 'big')
+        if kind != 6:
+            f.seek(length, os.SEEK_CUR)
+            continue
+        block = f.read(length)
+        picture_type, mime_length = struct.unpack_from('>II', block)
+        pos = 8 + mime_length
+        desc_length, = struct.unpack_from('>I', block, pos)
+        pos += 4 + desc_length + 16   # skip width, height, depth, colours
+        data_length, = struct.unpack_from('>I', block, pos)
+        data = block[pos + 4:pos + 4 + data_length]
+        if picture_type == 3:
+            return data
+        found = found or data
+    return found
+
+
+def _id3_picture(f):
+    """The front cover (or else the first picture) in an ID3v2 tag at the start of the file."""
+    header = f.read(10)
+    if len(header) < 10 or header[:3] != b'ID3':
+        return None
+    version, flags = header[3], header[5]
+    size = sum((b & 0x7f) << (7 * (3 - i)) for i, b in enumerate(header[6:10]))
+    tag = f.read(size)
+    if flags & 0x80 and version < 4:
+        tag = tag.replace(b'\xff\x00', b'\xff')  # whole-tag unsynchronisation
+    id_size, header_size = (3, 6) if version == 2 else (4, 10)
+    found = None
+    pos = 0
+    while pos + header_size <= len(tag) and tag[pos] != 0:
+        frame_id = tag[pos:pos + id_size]
+        raw = tag[pos + id_size:pos + 2 * id_size] if version == 2 else tag[pos + 4:pos + 8]
+        if version == 4:
+            length = sum((b & 0x7f) << (7 * (3 - i)) for i, b in enumerate(raw))
+        else:
+            length = int.from_bytes(raw, 'big')
+        body = tag[pos + header_size:pos + header_size + length]
+        pos += header_size + length
+        if frame_id not in (b'APIC', b'PIC') or len(body) < 4:
+            continue
+        encoding = body[0]
+        if frame_id == b'PIC':
+            i = 4   # three letter image format
+        else:
+            i = body.index(b'\x00', 1) + 1   # MIME type
+        picture_type = body[i]
+        i += 1
+        # the description ends with a NUL of the text encoding's width
+        if encoding in (1, 2):
+            while i + 1 < len(body) and body[i:i + 2] != b'\x00\x00':
+                i += 2
+            i += 2
+        else:
+            i = body.index(b'\x00', i) + 1
+        if picture_type == 3:
+            return body[i:]
+        found = found or body[i:]
+    return found
+
+
+def read_embedded_picture(path):
+    """Bytes of the picture embedded in a FLAC or ID3-tagged file, None if there is none."""
+    try:
+        with open(path, 'rb') as f:
+            start = f.read(4)
+            f.seek(0)
+            if start == b'fLaC':
+                return _flac_picture(f)
+            if start[:3] == b'ID3':
+                return _id3_picture(f)
+    except (OSError, ValueError, IndexError, struct.error):
+        pass
+    return None
+
+
+def find_folder_image(folder):
+    """cover.jpg, folder.jpg, ... next to the audio files, or None."""
+    try:
+        names = {name.lower(): name for name in os.listdir(folder)}
+    except OSError:
+        return None
+    for base in COVER_NAMES:
+        for ext in COVER_EXTENSIONS:
+            name = names.get(base + ext)
+            if name:
+                return os.path.join(folder, name)
+    return None
+
+
+def picture_key(path):
+    """Cache key of the picture stored in path: changes whenever the file does."""
+    st = os.stat(path)
+    return hashlib.sha1(f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}".encode()).hexdigest()
+
+
+def setup_logging():
+    # e.g. PULSEPY_LOG_LEVEL=INFO for periodic playback_stats lines
+    logging.basicConfig(level=os.environ.get("PULSEPY_LOG_LEVEL", "WARNING"))
+
+
+class HeadlessPlayer:
+    """Plays a playlist with a bare PlaybackEngine, no Qt or display needed."""
+
+    def __init__(self, song_list, stats=None, output=None, latency_profile='balanced', adaptive=False,
+                 passthrough=False, volume=1.0, speed=1.0):
+        self.playlist = PlaylistControl(song_list)
+        self.stats = stats or PlaybackStats()
+        self.output = output or make_output()
+        self.latency_profile = latency_profile
+        self.adaptive = AdaptiveBuffer() if adaptive else None
+        self.passthrough = passthrough
+        self.volume = volume
+        self.speed = speed
+        self.engine = None
+        self.stopped = False
+
+    def play(self):
+        song = self.playlist.current_song()
+        while song is not None and not self.stopped:
+            self.engine = PlaybackEngine(self.stats, self.output)
+            self.engine.set_latency_profile(self.latency_profile)
+            self.engine.adaptive = self.adaptive
+            self.engine.passthrough = self.passthrough
+            self.engine.volume = self.volume
+            self.engine.set_speed(self.speed)
+            self.engine.upcoming = self.playlist.peek_next()
+            self.engine.connect('track', self._ran_on)
+            if self.engine.load(song):
+                print(f"Playing: {song_title(song)}", flush=True)
+                self.engine.start()
+                self.engine.wait()
+            if not self.playlist.has_next():
+                break
+            song = self.playlist.next_song()
+
+    def _ran_on(self, track):
+        # the engine went gaplessly into the next CUE track; only this thread
+        # touches the playlist here, the engine's own included
+        self.playlist.next_song()
+        self.engine.upcoming = self.playlist.peek_next()
+        print(f"Playing: {song_title(track)}", flush=True)
+
+    def stop(self):
+        self.stopped = True
+        if self.engine is not None:
+            self.engine.stop()
+            self.engine.wait()
+
+
+def headless_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="main.py --headless", description="Play an M3U playlist without the GUI."
+    )
+    parser.add_argument("playlist", help="M3U playlist to play")
+    parser.add_argument("--shuffle", action="store_true")
+    parser.add_argument("--repeat", choices=["none", "one", "all"], default="none")
+    parser.add_argument("--output", help="sounddevice[:DEVICE], null[:fast] or file:PATH "
+                                         "(default: $PULSEPY_OUTPUT or sounddevice)")
+    parser.add_argument("--latency", choices=list(LATENCY_PROFILES), default="balanced",
+                        help="block size/latency profile (power = large buffers, fewer wake-ups)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="grow the buffer after underruns, shrink it again when stable")
+    parser.add_argument("--bit-perfect", action="store_true",
+                        help="send 16/24/32-bit PCM files to the output in their native format")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="playback speed from 0.5 to 3.0, pitch is kept")
+    parser.add_argument("--render", metavar="FILE",
+                        help="render the playlist offline into FILE (.wav/.flac) instead of playing")
+    parser.add_argument("--volume", type=float, default=100, help="volume in percent")
+    parser.add_argument("--gap", type=float, default=0.0, help="seconds of silence between tracks")
+    parser.add_argument("--crossfade", type=float, default=0.0, help="seconds of crossfade between tracks")
+    parser.add_argument("--jobs", type=int, default=None, help="decoder processes (default: CPUs)")
+    args = parser.parse_args(argv)
+
+    if args.render:
+        last_shown = [0.0]
+
+        def show(state):
+            if state.elapsed - last_shown[0] >= 0.2 or state.fraction >= 1:
+                last_shown[0] = state.elapsed
+                print(f"\r{state.stage}: {state.fraction:6.1%}  {state.realtime_factor:7.1f}x realtime",
+                      end="", flush=True)
+        state = render_playlist(read_m3u(args.playlist), args.render, args.volume / 100,
+                                args.gap, args.crossfade, jobs=args.jobs, progress=show)
+        print(f"\nRendered {state.frames_total / state.samplerate:.0f} s in {state.elapsed:.1f} s")
+        return 0
+
+    output = make_output(args.output)
+    player = HeadlessPlayer(read_m3u(args.playlist), output=output,
+                            latency_profile=args.latency, adaptive=args.adaptive,
+                            passthrough=args.bit_perfect, volume=args.volume / 100, speed=args.speed)
+    player.playlist.repeat_mode = {
+        "none": PlaylistControl.REPEAT_NONE,
+        "one": PlaylistControl.REPEAT_ONE,
+        "all": PlaylistControl.REPEAT_ALL,
+    }[args.repeat]
+    player.playlist.set_shuffle(args.shuffle)
+    try:
+        player.play()
+    except KeyboardInterrupt:
+        player.stop()
+    finally:
+        output.close()
+    return 0
+
+
+if __name__ == "__main__" and "--headless" in sys.argv[1:]:
+    multiprocessing.freeze_support()
+    setup_logging()
+    sys.exit(headless_main([arg for arg in sys.argv[1:] if arg != "--headless"]))
+
+
+
+from pydub import AudioSegment
+
+from PyQt5.QtCore import (
+    Qt, QEvent, QObject, QPoint, QPropertyAnimation, QRect, QTimer, QThread, pyqtSignal, QTime,
+    QBuffer, QByteArray, QIODevice, QFileSystemWatcher, QItemSelection, QItemSelectionModel
+)
+from PyQt5.QtGui import QColor, QPainter, QBrush, QIcon, QImage, QImageReader, QPixmap
+from PyQt5.QtWidgets import (
+    QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
+    QPushButton, QSlider, QLabel, QTimeEdit, QLineEdit, QHeaderView,
+    QAbstractItemView, QFileDialog, QMessageBox, QStyleOptionSlider, QStyle, QMenu, QAction, QShortcut,
+    QProgressDialog, QToolTip
+)
+from PyQt5.QtGui import QKeySequence
+
+
+class AudioPlayer(QObject):
+    """Qt front end for PlaybackEngine used by MusicPlayer.
+
+    Engine events are re-emitted as signals, which Qt queues to the GUI
+    thread. Everything else (load, seek, filename, total_frames, ...) is
+    delegated to the engine.
+    """
+    chunk_signal = pyqtSignal(np.ndarray)
+    position_signal = pyqtSignal(int)
+    track_changed = pyqtSignal(object)
+    song_finished = pyqtSignal()
+
+    def __init__(self, stats=None, output=None):
+        super().__init__()
+        self.engine = PlaybackEngine(stats, output)
+        self.engine.connect('chunk', self.chunk_signal.emit)
+        self.engine.connect('position', self.position_signal.emit)
+        self.engine.connect('track', self.track_changed.emit)
+        self.engine.connect('finished', self.song_finished.emit)
+
+    def __getattr__(self, name):
+        if name == 'engine':
+            raise AttributeError(name)
+        return getattr(self.engine, name)
+
+    def isRunning(self):
+        return self.engine.is_running()
 
 
 
 import numpy as np
 import random
 from collections import deque
-from PyQt5.QtWidgets import QWidget
-from PyQt5.QtCore import QTimer, QRect, Qt
-from PyQt5.QtGui import QPainter, QColor, QBrush
+from PyQt5.QtWidgets import QWidget, QMenu
+from PyQt5.QtCore import QTimer, QRect, QPointF, Qt
+from PyQt5.QtGui import QPainter, QColor, QBrush, QImage, QPen, QPolygonF
+
+class CoverArt(QObject):
+    """Album art thumbnails.
+
+    Finding, extracting, decoding and downscaling a picture happen on worker
+    threads, and the result is stored once as a small JPEG in
+    cache_dir()/covers. The GUI thread only turns finished thumbnails into
+    QPixmaps, kept in a SizedLRU capped in bytes; tracks sharing a folder
+    image share one entry.
+    """
+    ready = pyqtSignal(object, object)     # song, QPixmap (None: no art)
+    _loaded = pyqtSignal(object, object, object, object)  # song, key, QImage, stamp, from a worker
+    _unchanged = pyqtSignal(object)   # song, from a worker: what request() returned still holds
+
+    SIZE = 200   # thumbnail edge, the label is 100 px and may be on a 2x screen
+
+    def __init__(self, max_bytes=32 << 20, folder=None, parent=None):
+        super().__init__(parent)
+        self.folder = folder or os.path.join(cache_dir(), "covers")
+        self.pixmaps = SizedLRU(max_bytes)
+        self._keys = {}        # song -> (picture key or None for no art, _stamp() it was found with)
+        self._pending = set()
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="CoverArt")
+        self._loaded.connect(self._on_loaded)
+        self._unchanged.connect(self._on_unchanged)
+
+    def request(self, song):
+        """The cover if it is in memory; otherwise None and ready is emitted later.
+
+        A remembered answer is returned at once and re-checked on a worker:
+        if the file or its folder changed since, ready brings the new one.
+        """
+        known = None
+        if song in self._keys:
+            key, known = self._keys[song]
+            pixmap = None if key is None else self.pixmaps.get(key)
+            if key is not None and pixmap is None:
+                known = None   # dropped from memory, load it again
+            else:
+                self._submit(song, known)
+                return pixmap
+        self._submit(song, known)
+        return None
+
+    def _submit(self, song, known):
+        if song not in self._pending:
+            self._pending.add(song)
+            self._pool.submit(self._load, song, known)
+
+    def has_no_art(self, song):
+        return song in self._keys and self._keys[song][0] is None
+
+    @staticmethod
+    def _stamp(path):
+        """Changes with the song file and with its folder (a cover.jpg added, removed or renamed)."""
+        try:
+            return os.stat(path).st_mtime_ns, os.stat(os.path.dirname(path) or '.').st_mtime_ns
+        except OSError:
+            return None
+
+    def _on_unchanged(self, song):
+        self._pending.discard(song)
+
+    def _on_loaded(self, song, key, image, stamp):
+        self._pending.discard(song)
+        if stamp is not None:
+            self._keys[song] = (key, stamp)   # a failed look isn't remembered, the next request retries
+        pixmap = None
+        if key is not None:
+            pixmap = self.pixmaps.get(key)
+            if pixmap is None:
+                pixmap = QPixmap.fromImage(image)
+                self.pixmaps.put(key, pixmap, image.sizeInBytes())
+        self.ready.emit(song, pixmap)
+
+    def _load(self, song, known=None):
+        # worker thread: QImage only, QPixmap belongs to the GUI thread
+        path = getattr(song, 'path', song)
+        try:
+            background_io.wait()
+            stamp = self._stamp(path)   # before looking, so a change during the look shows later
+            if stamp is not None and stamp == known:
+                self._unchanged.emit(song)
+                return
+            key, image = self._find(path)
+        except Exception as e:
+            log.warning("cover art for %s: %s", song, e)
+            key, image, stamp = None, None, None
+        self._loaded.emit(song, key, image, stamp)
+
+    def _find(self, path):
+        # a thumbnail made earlier wins, then the embedded picture, then a folder image
+        key = picture_key(path)
+        image = self._thumbnail(key)
+        if image is not None:
+            return key, image
+        data = read_embedded_picture(path)
+        if data is None:
+            folder_image = find_folder_image(os.path.dirname(path))
+            if folder_image is None:
+                return None, None
+            key = picture_key(folder_image)
+            image = self._thumbnail(key)
+            if image is not None:
+                return key, image
+            with open(folder_image, 'rb') as f:
+                data = f.read()
+        image = self._decode(data)
+        if image is None:
+            return None, None
+        self._save_thumbnail(key, image)
+        return key, image
+
+    def _thumbnail(self, key):
+        image = QImage(os.path.join(self.folder, key + ".jpg"))
+        return None if image.isNull() else image
+
+    def _decode(self, data):
+        buffer = QBuffer()
+        buffer.setData(QByteArray(data))
+        buffer.open(QIODevice.ReadOnly)
+        reader = QImageReader(buffer)
+        size = reader.size()
+        if size.isValid() and max(size.width(), size.height()) > self.SIZE:
+            # JPEG decodes straight to a fraction of the size, far cheaper than scaling afterwards
+            reader.setScaledSize(size.scaled(self.SIZE, self.SIZE, Qt.KeepAspectRatio))
+        image = reader.read()
+        if image.isNull():
+            return None
+        if max(image.width(), image.height()) > self.SIZE:
+            image = image.scaled(self.SIZE, self.SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        return image.convertToFormat(QImage.Format_RGB32)
+
+    def _save_thumbnail(self, key, image):
+        os.makedirs(self.folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.folder, suffix=".jpg")
+        os.close(fd)
+        if image.save(tmp, "JPG", 85):
+            os.replace(tmp, os.path.join(self.folder, key + ".jpg"))
+        else:
+            os.remove(tmp)
+
 
 class Visualizer(QWidget):
+    MODES = {'bars': "Bars", 'spectrogram': "Spectrogram", 'scope': "Oscilloscope"}
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setStyleSheet("background-color: #23272f; border-radius: 18px;")
@@ -298,24 +3318,67 @@ class Visualizer(QWidget):
         # Latest chunk buffer
         self.latest_chunk = None
 
-        # Timer drives both amplitude update and repaint
+        # spectrogram: the FFT runs in the analyzer's thread, the GUI only writes
+        # one finished column per frame into a ring image and blits it in two parts
+        self.mode = 'bars'
+        self.analyzer = None
+        self._spec = None          # QImage ring, width x height
+        self._spec_pixels = None   # uint32 view of its pixels
+        self._spec_x = 0           # next column to write, also the oldest one shown
+
+        # Timer drives both amplitude update and repaint; it only runs while playing
+        # or fading out, and not at all while the window can't be seen
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.on_timer)
-        self.timer.start(50)
+        self._running = False
+        self._suspended = False
 
     def update_visualization(self, chunk):
         """Store the latest chunk for processing in timer."""
         self.latest_chunk = chunk
-    
+        if self.analyzer is not None:
+            self.analyzer.submit(chunk)
+
+    def set_mode(self, mode):
+        self.mode = mode
+        if mode == 'spectrogram':
+            if self.analyzer is None:
+                self.analyzer = SpectrumAnalyzer(rows=self.height())
+        elif self.analyzer is not None:
+            self.analyzer.close()
+            self.analyzer = None
+        self._spec = None
+        self._fade_active = False
+        self._fully_faded = not self._running
+        self.update()
+
+    def contextMenuEvent(self, event):
+        menu = QMenu(self)
+        for mode, label in self.MODES.items():
+            action = menu.addAction(label)
+            action.setCheckable(True)
+            action.setChecked(mode == self.mode)
+            action.triggered.connect(lambda checked, m=mode: self.set_mode(m))
+        menu.exec_(event.globalPos())
+
     def pause(self):
         """Start modern, staggered fade-out animation."""
         self.latest_chunk = None
+        if self.mode != 'bars':
+            # the spectrogram keeps its history, the scope drops to a flat line
+            self._running = False
+            self.timer.stop()
+            self.update()
+            return
         self._stopping = True
         self._fade_active = True
         self._fade_tick = 0
         self._fade_alpha = [255] * self.num_bars
         self._fully_faded = False
-        if not self.timer.isActive():
+        self._running = False
+        if self._suspended:
+            self._finish_fade()
+        elif not self.timer.isActive():
             self.timer.start(50)
 
     def resume(self):
@@ -323,12 +3386,35 @@ class Visualizer(QWidget):
         self._fade_active = False
         self._fade_alpha = [255] * self.num_bars
         self._fully_faded = False
-        self.timer.start(50)
+        self._running = True
+        if not self._suspended:
+            self.timer.start(50)
+
+    def set_suspended(self, suspended):
+        """Stop the timer while the bars can't be seen, a pending fade-out just completes."""
+        self._suspended = suspended
+        if suspended:
+            self.timer.stop()
+            if self._fade_active:
+                self._finish_fade()
+        elif self._running and not self.timer.isActive():
+            self.timer.start(50)
+
+    def _finish_fade(self):
+        self.timer.stop()
+        self._stopping = False
+        self._fade_active = False
+        self._fully_faded = True  # Bars are now gone
+        self.update()  # Trigger a final repaint
 
 
 
     def on_timer(self):
-        if self._fade_active:
+        if self.mode == 'spectrogram':
+            self._spectrogram_tick()
+        elif self.mode == 'scope':
+            self.update()
+        elif self._fade_active:
             all_done = True
             for i in range(self.num_bars):
                 bar_fade_start = i * self._fade_stagger
@@ -341,11 +3427,7 @@ class Visualizer(QWidget):
             self._fade_tick += 1
             self.update()
             if all_done:
-                self.timer.stop()
-                self._stopping = False
-                self._fade_active = False
-                self._fully_faded = True  # Bars are now gone
-                self.update()  # Trigger a final repaint
+                self._finish_fade()
         else:
             self.process_amplitude()
             self.update()
@@ -399,13 +3481,71 @@ class Visualizer(QWidget):
                 smoothed = self.amplitude[i] + np.sign(delta) * self.max_delta
             self.amplitude[i] = smoothed
 
+    def _spectrogram_image(self):
+        w, h = max(1, self.width()), max(1, self.height())
+        if self._spec is None or self._spec.width() != w or self._spec.height() != h:
+            self._spec = QImage(w, h, QImage.Format_RGB32)
+            self._spec.fill(QColor(0x23, 0x27, 0x2f))
+            bits = self._spec.bits()
+            bits.setsize(self._spec.byteCount())
+            self._spec_pixels = np.frombuffer(bits, np.uint32).reshape(h, self._spec.bytesPerLine() // 4)
+            self._spec_x = 0
+        return self._spec
+
+    def _spectrogram_tick(self):
+        column = self.analyzer.take() if self.analyzer is not None else None
+        if column is None:
+            return
+        image = self._spectrogram_image()
+        if len(column) == image.height():
+            self._spec_pixels[:, self._spec_x] = column
+            self._spec_x = (self._spec_x + 1) % image.width()
+            self.update()
+
     def resizeEvent(self, event):
         self.max_height = self.height()
         x = np.linspace(0, np.pi, self.num_bars)
         self.cos_curve = 0.7 * (np.cos(x - np.pi/2) * 0.5 + 0.5) + 0.3
+        if self.analyzer is not None and self.analyzer.rows != self.height():
+            self.analyzer.close()
+            self.analyzer = SpectrumAnalyzer(rows=self.height())
         super().resizeEvent(event)
 
+    def paint_spectrogram(self, painter):
+        image = self._spectrogram_image()
+        # oldest column first: the part right of the write position, then the wrapped part
+        w, h, x = image.width(), image.height(), self._spec_x
+        painter.drawImage(0, 0, image, x, 0, w - x, h)
+        if x:
+            painter.drawImage(w - x, 0, image, 0, 0, x, h)
+
+    def paint_scope(self, painter):
+        w, h = self.width(), self.height()
+        chunk = self.latest_chunk
+        painter.setRenderHint(QPainter.Antialiasing)
+        # a 1 px pen stays on Qt's fast line path, wider ones stroke an outline (50x slower on noise)
+        painter.setPen(QPen(QColor.fromHsv(self.hue, 200, 255), 1))
+        if chunk is None or len(chunk) < 2:
+            painter.drawLine(0, h // 2, w, h // 2)
+            return
+        self.hue = (self.hue + 1) % 360
+        data = chunk[:, 0] if chunk.ndim > 1 else chunk
+        # start on a rising zero crossing so a steady tone stands still
+        crossings = np.flatnonzero((data[:-1] < 0) & (data[1:] >= 0))
+        start = crossings[0] if len(crossings) and crossings[0] < len(data) // 2 else 0
+        segment = data[start:start + len(data) // 2]
+        segment = segment[::max(1, len(segment) // max(w, 1))]
+        xs = np.linspace(0, w, len(segment))
+        ys = h / 2 - np.clip(segment, -1, 1) * (h / 2 - 2)
+        painter.drawPolyline(QPolygonF([QPointF(x, y) for x, y in zip(xs.tolist(), ys.tolist())]))
+
     def paintEvent(self, event):
+        if self.mode == 'spectrogram':
+            self.paint_spectrogram(QPainter(self))
+            return
+        if self.mode == 'scope':
+            self.paint_scope(QPainter(self))
+            return
         if self._fully_faded:
             # Fill with transparent or background color, no bars
             painter = QPainter(self)
@@ -438,6 +3578,8 @@ class Visualizer(QWidget):
 
 
 class MusicPlayer(QMainWindow):
+    track_info_ready = pyqtSignal()  # from TrackInfoLoader's workers, queued to the GUI thread
+    import_batch_ready = pyqtSignal(object, list)   # (FileImport, songs) from its thread, likewise
     def __init__(self):
         super().__init__()
         self.setWindowTitle("PulsePy Musicplayer")
@@ -477,28 +3619,58 @@ class MusicPlayer(QMainWindow):
         self._slider_seeking = False
         self._slider_value = 0
 
-        self.audio_player = AudioPlayer()
-        self.audio_player.position_signal.connect(self.update_slider_position)
-        self.audio_player.song_finished.connect(self.song_finished)
-
-        # stores all audio file in { "Edsheeran - XYZ", "/home/lunar/Music/Edsheeran - XYZ"}
-        self.loaded_files = {}
-        self.playlist = PlaylistControl()
+        # playback health counters, kept across tracks (F12 shows them)
+        self.playback_stats = PlaybackStats()
+        self.stats_window = None
+
+        # shared by every AudioPlayer; PULSEPY_OUTPUT selects null/file output
+        self.output = make_output()
+        self.latency_profile = 'balanced'
+        self.adaptive_buffer = None  # AdaptiveBuffer when adaptive mode is on
+        self.passthrough = False     # bit-perfect output, from the next track on
+        self.speed = 1.0             # kept across tracks, for podcasts and audiobooks
+        self.audio_player = AudioPlayer(self.playback_stats, self.output)
+
+        # every song the list has shown, with its tags; the playlist (and so the song list) holds its rows
+        self.tracks = TrackStore()
+        self.playlist = PlaylistControl(TrackList(self.tracks))
+        self.sort_order = None   # a SongListModel.SORT_ORDERS name, once the user picked one
+        # tags and durations for the song list, visible rows first
+        self.track_info = TrackInfoLoader(on_ready=self.track_info_ready.emit)
+        self.covers = CoverArt(parent=self)
+        self.covers.ready.connect(self.on_cover_ready)
+        # the open folder is watched (inotify on Linux) and only its changes are applied;
+        # if the watch can't be set up, its mtime is polled instead
+        self.folder_watch = None
+        self.fs_watcher = QFileSystemWatcher(self)
+        self.folder_timer = QTimer(self)
+        self.folder_timer.setSingleShot(True)
+        self.folder_timer.setInterval(300)   # copies and moves arrive as bursts of events
+        self.folder_timer.timeout.connect(self.apply_folder_changes)
+        self.fs_watcher.directoryChanged.connect(self.folder_timer.start)
+        self.folder_poll_timer = QTimer(self)
+        self.folder_poll_timer.setInterval(5000)
+        self.folder_poll_timer.timeout.connect(lambda: self.apply_folder_changes(force=False))
         self.is_playing = False
         self.no_slider_update = False
         self.repeat_all = False
         self.timeedit_update = [True, True]
         self.tmp_qtime = QTime(0,0,0,0)
         self.current_folder = ""
+        self.imports = {}   # running FileImport -> where its next batch goes (a position, or the last song added)
 
         self.init_ui()
     
-    # every 500ms
+    # when the song list changes, coalesced by placeholder_timer
     def update(self):
-        if len(self.song_list) > 1:
-            self.search_bar.setPlaceholderText(f"Search songs ({len(self.song_list)})...")
+        if len(self.playlist.song_list) > 1:
+            text = f"Search songs ({len(self.playlist.song_list)})..."
         else:
-            self.search_bar.setPlaceholderText(f"Search songs...")
+            text = "Search songs..."
+        if self.imports:
+            text += " adding more"
+        if text != self.search_bar.placeholderText():
+            self.search_bar.setPlaceholderText(text)
 
 
 
@@ -507,31 +3679,9 @@ class MusicPlayer(QMainWindow):
         seconds = int(seconds)
         return f"{seconds // 60:02d}:{seconds % 60:02d}"
 
-    def get_audio_files(self, folder):
-        audio_extensions = ('.mp3', '.wav', '.flac', '.ogg', '.aiff')
-        return [
-            os.path.abspath(os.path.join(folder, f))
-            for f in os.listdir(folder)
-            if f.lower().endswith(audio_extensions)
-        ]
-
     def filter_song_list(self, text):
-        # Step 1: Remember the currently selected item (by reference or text)
-        current_item = self.song_list.currentItem()
-        current_text = current_item.text() if current_item else None
-
-        # Step 2: Filter items (hide those that don't match)
-        for i in range(self.song_list.count()):
-            item = self.song_list.item(i)
-            item.setHidden(text.lower() not in item.text().lower())
-
-        # Step 3: After filtering, if the previously selected item is still visible, re-select it
-        if current_text:
-            for i in range(self.song_list.count()):
-                item = self.song_list.item(i)
-                if not item.isHidden() and item.text() == current_text:
-                    self.song_list.setCurrentItem(item)
-                    break
+        # matched on the store (file names and tags); the selection stays if it is still shown
+        self.song_model.set_filter(text)
     
     # Helper to create QTime safely (max 23 hours)
     def safe_qtime(self, seconds):
@@ -549,8 +3699,16 @@ class MusicPlayer(QMainWindow):
 
         # --- Visualizer ---
         self.visualizer = Visualizer(self)
-        self.audio_player.chunk_signal.connect(self.visualizer.update_visualization)
-        main_layout.addWidget(self.visualizer)
+        self.connect_audio_player()
+        visual_layout = QHBoxLayout()
+        visual_layout.setSpacing(15)
+        self.cover_label = QLabel()
+        self.cover_label.setFixedSize(100, 100)
+        self.cover_label.setAlignment(Qt.AlignCenter)
+        self.cover_label.hide()   # until a song with art is loaded
+        visual_layout.addWidget(self.cover_label)
+        visual_layout.addWidget(self.visualizer)
+        main_layout.addLayout(visual_layout)
 
         self.song_label = CustomLabel("No song loaded")
         self.song_label.setAlignment(Qt.AlignCenter)
@@ -567,21 +3725,62 @@ class MusicPlayer(QMainWindow):
         song_playlist_layout = QHBoxLayout()
 
         # Song List (left)
-        self.song_list = QListWidget()
-        self.song_list.setItemDelegate(ElideDelegate(self.song_list))
-        self.song_list.setVerticalScrollMode(QListWidget.ScrollPerPixel)
+        # a one-column table rather than a list view: with fixed row heights
+        # its layout doesn't visit every row, which a QListView does on each
+        # change, calling back into the model per row
+        self.song_list = SongListView()
+        self.song_model = SongListModel(self.playlist, self)
+        self.song_list.setModel(self.song_model)
+        self.song_list.setItemDelegate(TrackDelegate(self.info_for_index, self.song_list))
+        self.song_list.horizontalHeader().hide()
+        self.song_list.horizontalHeader().setStretchLastSection(True)
+        self.song_list.verticalHeader().hide()
+        self.song_list.setShowGrid(False)
+        self.song_list.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.song_list.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
         self.song_list.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         self.song_list.setWordWrap(False)
         self.song_list.setMinimumHeight(120)
         self.song_list.setFixedWidth(400)
-        self.song_list.itemClicked.connect(self.handle_song_selection)
+        self.song_list.clicked.connect(self.handle_song_selection)
         self.song_list.setStyleSheet(Styles.song_list)
-        self.song_list.setDragDropMode(QListWidget.InternalMove)
+        self.song_list.ensurePolished()
+        # one line per row: the text plus the item padding and margin from Styles.song_list
+        self.song_list.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.song_list.verticalHeader().setDefaultSectionSize(self.song_list.fontMetrics().height() + 28)
+        self.song_list.setDragDropMode(QAbstractItemView.InternalMove)
+        self.song_list.setDragDropOverwriteMode(False)
         self.song_list.setDefaultDropAction(Qt.MoveAction)
-        self.song_list.setSelectionMode(QListWidget.SingleSelection)
-        self.song_list.model().rowsMoved.connect(self.on_song_list_reordered)
+        self.song_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.song_list.setContextMenuPolicy(Qt.CustomContextMenu)
         self.song_list.customContextMenuRequested.connect(self.show_song_list_context_menu)
+        self.song_list.filesDropped.connect(self.import_files)
+        self.import_batch_ready.connect(self.add_imported_songs)
+        self.kept_selection = None
+        self.song_model.relayoutStarting.connect(self.keep_selection)
+        self.song_model.relayoutFinished.connect(self.restore_selection)
+        self.song_model.relayoutFinished.connect(self.update_upcoming)
+
+        # results arrive in batches; one repaint of the visible rows per batch
+        self.track_info_timer = QTimer(self)
+        self.track_info_timer.setSingleShot(True)
+        self.track_info_timer.setInterval(50)
+        self.track_info_timer.timeout.connect(self.apply_track_info)
+        self.track_info_ready.connect(self.track_info_timer.start)
+        # a sort on tags is done again once they have all loaded (nothing queued for this long)
+        self.resort_timer = QTimer(self)
+        self.resort_timer.setSingleShot(True)
+        self.resort_timer.setInterval(500)
+        self.resort_timer.timeout.connect(self.resort_after_loading)
+        # the visible rows are re-sent to the loader once scrolling settles
+        self.visible_rows_timer = QTimer(self)
+        self.visible_rows_timer.setSingleShot(True)
+        self.visible_rows_timer.setInterval(30)
+        self.visible_rows_timer.timeout.connect(self.prioritize_visible_rows)
+        self.song_list.verticalScrollBar().valueChanged.connect(self.visible_rows_timer.start)
+        model = self.song_list.model()
+        for signal in (model.rowsInserted, model.modelReset, model.layoutChanged):
+            signal.connect(self.visible_rows_timer.start)
 
         song_playlist_layout.addWidget(self.song_list)
 
@@ -668,9 +3867,24 @@ class MusicPlayer(QMainWindow):
         
 
 
-        self.progress_timer = QTimer(self)
-        self.progress_timer.timeout.connect(self.update)
-        self.progress_timer.start(500)  # update twice a second
+        # the search placeholder shows the song count; refresh it once per batch of
+        # list changes instead of polling
+        self.placeholder_timer = QTimer(self)
+        self.placeholder_timer.setSingleShot(True)
+        self.placeholder_timer.timeout.connect(self.update)
+        model = self.song_list.model()
+        for signal in (model.rowsInserted, model.rowsRemoved, model.modelReset, model.layoutChanged):
+            signal.connect(self.placeholder_timer.start)
+        self.update()
+
+        # the only driver of slider/time display while playing; it interpolates
+        # the engine clock, so no per-block signal crosses from the audio thread
+        self.clock_timer = QTimer(self)
+        self.clock_timer.setInterval(50)
+        self.clock_timer.timeout.connect(self.on_clock_tick)
+        self._shown_times = None   # (current, total, edit flags) last written to the time edits
+        self._format_total = None  # total seconds the display format was chosen for
+        self._exposed = True       # False while the window is fully covered, see eventFilter
 
         # --- Controls Layout ---
         controls_layout = QHBoxLayout()
@@ -695,6 +3909,23 @@ class MusicPlayer(QMainWindow):
         self.playback_mode_btn.setStyleSheet(Styles.btn_style)
         controls_layout.addWidget(self.playback_mode_btn)
 
+        # --- Playback speed ---
+        self.speed_btn = QPushButton("1x")
+        self.speed_btn.setCursor(Qt.PointingHandCursor)
+        self.speed_btn.setToolTip("Playback Speed")
+        self.speed_btn.clicked.connect(self.show_speed_menu)
+        self.speed_btn.setStyleSheet(Styles.btn_style)
+        controls_layout.addWidget(self.speed_btn)
+
+        # --- Output device / latency profile ---
+        self.device_btn = QPushButton()
+        self.device_btn.setIcon(QIcon(os.path.join(os.path.dirname(os.path.abspath(__file__)), "icons", "device.svg")))
+        self.device_btn.setCursor(Qt.PointingHandCursor)
+        self.device_btn.setToolTip("Output Device & Latency")
+        self.device_btn.clicked.connect(self.show_device_menu)
+        self.device_btn.setStyleSheet(Styles.btn_style)
+        controls_layout.addWidget(self.device_btn)
+
         main_layout.addLayout(controls_layout)
 
         # --- Set main widget/layout ---
@@ -705,6 +3936,39 @@ class MusicPlayer(QMainWindow):
         self.playback_modes = ['Repeat Off', 'Repeat One', 'Repeat All', 'Shuffle']
         self.current_playback_mode = 0
 
+        # --- Debug overlay ---
+        self.stats_shortcut = QShortcut(QKeySequence(Qt.Key_F12), self)
+        self.stats_shortcut.activated.connect(self.toggle_stats_window)
+
+        # --- Song list edits: undo/redo anywhere in the window, Delete in the list ---
+        self.undo_shortcut = QShortcut(QKeySequence.Undo, self)
+        self.undo_shortcut.activated.connect(self.song_model.history.undo)
+        self.redo_shortcut = QShortcut(QKeySequence.Redo, self)
+        self.redo_shortcut.activated.connect(self.song_model.history.redo)
+        self.delete_shortcut = QShortcut(QKeySequence.Delete, self.song_list, context=Qt.WidgetShortcut)
+        self.delete_shortcut.activated.connect(self.remove_selected_song)
+
+        # --- A-B loop and cue points, kept per track in the library cache ---
+        # Ctrl+[ / Ctrl+] set A / B, Ctrl+\ toggles the loop,
+        # Alt+1..9 stores a cue at the playing position, Ctrl+1..9 jumps to it
+        self.library_cache = LibraryCache()
+        self.loop_points = [None, None]
+        self.loop_enabled = False
+        self.cues = {}
+        shortcuts = [
+            (Qt.CTRL + Qt.Key_BracketLeft, lambda: self.set_loop_point(0)),
+            (Qt.CTRL + Qt.Key_BracketRight, lambda: self.set_loop_point(1)),
+            (Qt.CTRL + Qt.Key_Backslash, self.toggle_loop),
+        ]
+        for digit in range(1, 10):
+            shortcuts.append((Qt.ALT + Qt.Key_0 + digit, lambda slot=str(digit): self.set_cue(slot)))
+            shortcuts.append((Qt.CTRL + Qt.Key_0 + digit, lambda slot=str(digit): self.jump_to_cue(slot)))
+        self.cue_shortcuts = []
+        for key, slot in shortcuts:
+            shortcut = QShortcut(QKeySequence(key), self)
+            shortcut.activated.connect(slot)
+            self.cue_shortcuts.append(shortcut)
+
     # --- Slider ---
     def format_time(seconds):
         hours = seconds // 3600
@@ -729,6 +3993,8 @@ class MusicPlayer(QMainWindow):
         total_seconds = int(total_frames / fs)
         remaining_seconds = max(0, total_seconds - current_seconds)
 
+        # audible scrubbing, the real seek happens on release
+        self.audio_player.scrub(target_frame)
 
         # Update QTimeEdit widgets
         self.current_time_edit.setTime(self.safe_qtime(current_seconds))
@@ -759,6 +4025,9 @@ class MusicPlayer(QMainWindow):
             target_frame = int((value / 1000) * self.audio_player.total_frames)
             self.audio_player.seek(target_frame)
 
+    def on_clock_tick(self):
+        self.update_slider_position(self.audio_player.clock_frame())
+
     def update_slider_position(self, frame_position):
         if self.no_slider_update:
             return
@@ -766,9 +4035,10 @@ class MusicPlayer(QMainWindow):
             # Update slider
             slider_value = int((frame_position / self.audio_player.total_frames) * 1000)
 
-            self.progress_slider.blockSignals(True)
-            self.progress_slider.setValue(slider_value)
-            self.progress_slider.blockSignals(False)
+            if slider_value != self.progress_slider.value():
+                self.progress_slider.blockSignals(True)
+                self.progress_slider.setValue(slider_value)
+                self.progress_slider.blockSignals(False)
 
             # Calculate current and total seconds
             fs = self.audio_player.fs
@@ -782,15 +4052,22 @@ class MusicPlayer(QMainWindow):
             # update timeedit
             if self.current_time_edit.hasFocus() and self.timeedit_update[0]: self.on_current_time_edit_started()
             if self.total_time_edit.hasFocus() and self.timeedit_update[1]: self.on_total_time_edit_started()
-            
-            # dynmaic minutes/hour display
+
+            # the clock ticks faster than the display changes, only redo it once a second
+            shown = (current_seconds, total_seconds, tuple(self.timeedit_update))
+            if shown == self._shown_times:
+                return
+            self._shown_times = shown
+
+            # dynmaic minutes/hour display, depends only on the track length
+            if total_seconds != self._format_total:
+                self._format_total = total_seconds
+                display_format = "hh:mm:ss" if total_seconds >= 3600 else "mm:ss"
+                self.current_time_edit.setDisplayFormat(display_format)
+                self.total_time_edit.setDisplayFormat(display_format)
             if self.timeedit_update[0]: 
-                if self.safe_qtime(total_seconds).hour() > 0: self.current_time_edit.setDisplayFormat("hh:mm:ss")
-                else: self.current_time_edit.setDisplayFormat("mm:ss")
                 self.current_time_edit.setTime(self.safe_qtime(current_seconds))
             if self.timeedit_update[1]: 
-                if self.safe_qtime(total_seconds).hour() > 0: self.total_time_edit.setDisplayFormat("hh:mm:ss")
-                else: self.total_time_edit.setDisplayFormat("mm:ss")
                 self.total_time_edit.setTime(self.safe_qtime(remaining_seconds))
 
 
@@ -869,18 +4146,122 @@ class MusicPlayer(QMainWindow):
             folder = QFileDialog.getExistingDirectory(self, "Select Music Folder", directory, options=options)
             if folder:
                 self.current_folder = folder
-                audio_files = sorted(self.get_audio_files(folder))
-                self.playlist = PlaylistControl(audio_files)
+                self.watch_folder(folder)
+
+    def set_song_files(self, audio_files):
+        """Replace the song list and playlist with audio_files."""
+        self.cancel_imports()
+        self.playlist = PlaylistControl(TrackList(self.tracks, self.tracks.extend(audio_files)))
+        self.song_model.set_playlist(self.playlist)
+        self.track_info.clear()
+        self.track_info.add(audio_files)
+
+    # --- Files dropped from a file manager ---
+    def import_files(self, paths, row=None):
+        """Add files and folders before the song list's row (default: at the end).
+
+        They are walked, filtered and probed on a FileImport thread; the
+        songs come in batches and are added as they arrive.
+        """
+        position = len(self.playlist.song_list) if row is None else self.song_model.insertion_point(row)
+        job = FileImport(paths, on_batch=lambda songs: self.import_batch_ready.emit(job, songs),
+                         on_done=lambda: self.import_batch_ready.emit(job, []))
+        self.imports[job] = position
+        job.start()
+        self.placeholder_timer.start()
+
+    def add_imported_songs(self, job, songs):
+        if job not in self.imports:
+            return   # cancelled, the song list was replaced meanwhile
+        if not songs:
+            del self.imports[job]   # done
+            self.placeholder_timer.start()
+            return
+        tracks = self.playlist.song_list
+        rows = np.frombuffer(self.tracks.extend(songs), np.int32)
+        new = ~np.isin(rows, tracks.row_array())   # songs already in the list are left where they are
+        if not new.any():
+            return
+        where = self.imports[job]
+        if not isinstance(where, int):
+            # after the previous batch, wherever it is now
+            where = tracks.index(where) + 1 if where in tracks else len(tracks)
+        added = TrackList(self.tracks, rows[new])
+        self.song_model.insert_songs(np.arange(where, where + len(added)), added, merge=job)
+        self.imports[job] = added[-1]
+        self.track_info.add(added)
+
+    def cancel_imports(self):
+        for job in self.imports:
+            job.cancel()
+        self.imports.clear()
+
+    # --- Folder watching ---
+    def watch_folder(self, folder):
+        """Show folder's songs and keep following its changes."""
+        self.unwatch_folder()
+        self.folder_watch = FolderWatch(folder)
+        self.set_song_files(self.folder_watch.scan())
+        if not self.fs_watcher.addPath(self.folder_watch.folder):
+            log.info("cannot watch %s, polling it instead", folder)
+            self.folder_poll_timer.start()
+
+    def unwatch_folder(self):
+        if self.fs_watcher.directories():
+            self.fs_watcher.removePaths(self.fs_watcher.directories())
+        self.folder_poll_timer.stop()
+        self.folder_watch = None
+
+    def apply_folder_changes(self, force=True):
+        """Apply what changed in the watched folder to the song list and playlist, in place."""
+        if self.folder_watch is None:
+            return
+        changes = self.folder_watch.refresh(force)
+        if changes is None:
+            return
+        added, removed, renamed = changes
+        playing = self.audio_player.engine.track or self.audio_player.engine.filename
+
+        for old, new in renamed:
+            if old in self.playlist.song_list:
+                self.song_model.replace(self.playlist.song_list.index(old), new)
+            if old == playing and isinstance(new, CueTrack):
+                self.song_label.setText(song_title(new))   # new times apply from the next play
+            elif old == playing:
+                # the open file handle keeps playing, only the name changed
+                self.audio_player.engine.track = self.audio_player.engine.filename = new
+                self.song_label.setText(song_title(new))
+
+        tracks = self.playlist.song_list
+        gone = sorted(tracks.index(song) for song in removed if song in tracks)
+        if gone:
+            self.song_model.remove(gone)
+
+        songs = self.playlist.song_list
+        if added:
+            if all(a <= b for a, b in zip(songs, songs[1:])):
+                # in folder order unless the list was rearranged, then at the end
+                added = sorted(added)
+                positions = [bisect.bisect(songs, song) + i for i, song in enumerate(added)]
+            else:
+                positions = range(len(songs), len(songs) + len(added))
+            self.song_model.insert(positions, added)
 
-                self.song_list.clear()
-                for file in audio_files:
-                    self.song_list.addItem(os.path.basename(os.path.splitext(file)[0]))
-                    self.loaded_files[os.path.basename(os.path.splitext(file)[0])] = file
+        self.track_info.forget([new for _, new in renamed])   # an edited CUE track's length changed
+        self.track_info.add(added + [new for _, new in renamed])
+        self.update_upcoming()   # replace() doesn't relayout
+
+    def song_row(self, song):
+        """Row of song in the song list, None if it isn't there or is filtered out."""
+        try:
+            return self.song_model.row(self.playlist.song_list.index(song))
+        except ValueError:
+            return None
 
-                # center elements
-                for i in range(self.song_list.count()):
-                    self.song_list.item(i).setTextAlignment(Qt.AlignCenter)
-                    self.song_list.item(i).setToolTip(self.song_list.item(i).text())
+    def select_song(self, song):
+        row = self.song_row(song)
+        if row is not None:
+            self.song_list.setCurrentIndex(self.song_model.index(row))
 
 
     def play_pause(self):
@@ -898,17 +4279,18 @@ class MusicPlayer(QMainWindow):
             self.is_playing = False
             self.play_pause_btn.setText("Play")
             self.visualizer.pause()
+        self.update_power_mode()
 
 
     # --- song_list = changed song via click ---
-    def handle_song_selection(self, item):
-        # Get the selected song's path
-        song_path = item.data(Qt.UserRole)
-        if not song_path:
-            # fallback for old items, try to construct path
-            song_path = os.path.join(self.current_folder, item.text())
-        # Update the playlist's song list and current index
-        index = self.song_list.row(item)
+    def handle_song_selection(self, index):
+        if QApplication.keyboardModifiers() & (Qt.ControlModifier | Qt.ShiftModifier):
+            return   # extending the selection, not picking a song
+        index = self.song_model.position(index.row())
+        if index is None:
+            return   # a group header
+        song_path = self.playlist.song_list[index]
+        # Update the playlist's current index
         
         self.is_playing = True
         self.play_pause_btn.setText("Pause")
@@ -918,9 +4300,6 @@ class MusicPlayer(QMainWindow):
         self.total_time_edit.setEnabled(True)
         self.current_time_edit.setEnabled(True)
 
-        song_path = os.path.basename(song_path)
-        if song_path[-4] == ".": song_path = song_path[:-4]
-        song_path =  self.loaded_files[song_path]
         self.load_new_song(song_path)
     
     # --- Playlist ---
@@ -938,6 +4317,7 @@ class MusicPlayer(QMainWindow):
         elif self.current_playback_mode == 3:
             self.playlist.repeat_mode = self.playlist.REPEAT_NONE
             self.playlist.set_shuffle(True)
+        self.update_upcoming()
 
     def save_playlist(self):
         dlg = QFileDialog(self, "Save Playlist")
@@ -954,10 +4334,14 @@ class MusicPlayer(QMainWindow):
         try:
             with open(path, 'w', encoding='utf-8') as f:
                 f.write("#EXTM3U\n")
-                for idx in range(self.song_list.count()):
-                    item = self.song_list.item(idx)
-                    filename = item.text()
-                    file_path = self.loaded_files[filename]
+                sheets = set()
+                for file_path in self.playlist.song_list:
+                    if isinstance(file_path, CueTrack):
+                        # the sheet stands for all its tracks
+                        if file_path.sheet in sheets:
+                            continue
+                        sheets.add(file_path.sheet)
+                        file_path = file_path.sheet
                     f.write(file_path + '\n')
             msg = QMessageBox(self)
             msg.setWindowTitle("Playlist Saved")
@@ -973,8 +4357,50 @@ class MusicPlayer(QMainWindow):
             msg.setStyleSheet(Styles.dialog_style)
             msg.exec_()
 
+    def export_mix(self):
+        """Render the playlist queue offline into one WAV/FLAC file."""
+        dlg = QFileDialog(self, "Export Mix")
+        dlg.setAcceptMode(QFileDialog.AcceptSave)
+        dlg.setNameFilter("FLAC (*.flac);;WAV (*.wav)")
+        dlg.setDefaultSuffix("flac")
+        dlg.setStyleSheet(Styles.dialog_style)
+        if dlg.exec_() != QFileDialog.Accepted:
+            return
+        path = dlg.selectedFiles()[0]
+
+        progress = QProgressDialog("Rendering...", "", 0, 1000, self)
+        progress.setWindowTitle("Export Mix")
+        progress.setCancelButton(None)
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setStyleSheet(Styles.dialog_style)
+        progress.show()
+
+        self.render_thread = RenderThread(self.playlist.queue(), path, self.audio_player.volume)
+
+        def update(fraction, realtime_factor):
+            progress.setValue(int(fraction * 1000))
+            progress.setLabelText(f"Rendering... {realtime_factor:.0f}x realtime")
+
+        def done(error):
+            progress.close()
+            msg = QMessageBox(self)
+            if error:
+                msg.setWindowTitle("Error")
+                msg.setIcon(QMessageBox.Critical)
+                msg.setText(f"Failed to export mix:\n{error}")
+            else:
+                msg.setWindowTitle("Mix Exported")
+                msg.setIcon(QMessageBox.Information)
+                msg.setText(f"Mix exported successfully!\n\n{path}")
+            msg.setStyleSheet(Styles.dialog_style)
+            msg.exec_()
+
+        self.render_thread.progress.connect(update)
+        self.render_thread.done.connect(done)
+        self.render_thread.start()
+
     def load_playlist(self):
-        from PyQt5.QtWidgets import QFileDialog, QListWidgetItem, QMessageBox
+        from PyQt5.QtWidgets import QFileDialog, QMessageBox
         import os
 
         dlg = QFileDialog(self, "Load Playlist")
@@ -986,27 +4412,7 @@ class MusicPlayer(QMainWindow):
         path = dlg.selectedFiles()[0]
 
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-
-            file_paths = [
-                line.strip() for line in lines
-                if line.strip() and not line.startswith('#')
-            ]
-
-            self.song_list.clear()
-            self.loaded_files.clear()
-            self.playlist.song_list.clear()
-
-            for file_path in file_paths:
-                filename = os.path.basename(file_path)
-                item = QListWidgetItem(filename)
-                item.setData(Qt.UserRole, file_path)
-                item.setText(os.path.splitext(item.text())[0])
-
-                self.song_list.addItem(item)
-                self.loaded_files[os.path.splitext(filename)[0]] = file_path
-                self.playlist.song_list.append(file_path)
+            self.load_playlist_file(path)
 
             msg = QMessageBox(self)
             msg.setWindowTitle("Playlist Loaded")
@@ -1022,6 +4428,17 @@ class MusicPlayer(QMainWindow):
             msg.setStyleSheet(Styles.dialog_style)
             msg.exec_()
 
+    def load_playlist_file(self, path):
+        """Replace the song list with the entries of an M3U file."""
+        file_paths = read_m3u(path)
+        self.unwatch_folder()
+
+        self.cancel_imports()
+        self.playlist.set_playlist(TrackList(self.tracks, self.tracks.extend(file_paths)))
+        self.song_model.set_playlist(self.playlist)
+        self.track_info.clear()
+        self.track_info.add(file_paths)
+
 
 
 
@@ -1039,14 +4456,11 @@ class MusicPlayer(QMainWindow):
     def load_new_song(self, next_song):
         if next_song is None:
             self.song_label.setText("No song loaded")
+            self.clock_timer.stop()
             if hasattr(self, 'audio_player'):
                 self.audio_player.stop()
                 return
-        items = self.song_list.findItems(os.path.basename(os.path.splitext(next_song)[0]), Qt.MatchExactly)
-        if items:
-            self.song_list.setCurrentItem(items[0])
-        else:
-            index = 0
+        self.select_song(next_song)
         # Stop and clean up the previous audio player if running
         if hasattr(self, 'audio_player'):
             if self.audio_player.isRunning():
@@ -1056,84 +4470,415 @@ class MusicPlayer(QMainWindow):
             self.audio_player.deleteLater()
 
         # Create a new audio player thread
-        self.audio_player = AudioPlayer()
-        self.audio_player.chunk_signal.connect(self.visualizer.update_visualization)
-        self.audio_player.position_signal.connect(self.update_slider_position)
-        self.audio_player.song_finished.connect(self.song_finished)        
+        self.audio_player = AudioPlayer(self.playback_stats, self.output)
+        self.audio_player.set_latency_profile(self.latency_profile)
+        self.audio_player.engine.adaptive = self.adaptive_buffer
+        self.audio_player.engine.passthrough = self.passthrough
+        self.audio_player.engine.visuals = self.window_active()
+        self.audio_player.set_speed(self.speed)
+        self.restore_track_data(next_song)
+        self.connect_audio_player()
         self.audio_player.load(next_song)
         
 
+        self.update_upcoming()
+        self._shown_times = None
+        self.update_slider_position(0)  # the length is known now, before the first block plays
         self.audio_player.start()
-        self.song_label.setText(os.path.basename(next_song))
+        self.song_label.setText(song_title(next_song) if isinstance(next_song, CueTrack) else os.path.basename(next_song))
+        self.show_cover(next_song)
+        if self.is_playing and not self.visualizer._running:
+            self.visualizer.resume()
+        self.update_power_mode()
+
+    # --- Power mode ---
+    # Nothing ticks that nobody can see: while the window is hidden, minimized or
+    # covered the clock, visualizer and marquee timers stop and the engine stops
+    # sending chunks; while paused only the visualizer's fade-out still runs.
+    def window_active(self):
+        return self.isVisible() and not self.isMinimized() and self._exposed
+
+    def update_power_mode(self):
+        active = self.window_active()
+        self.visualizer.set_suspended(not active)
+        self.song_label.set_marquee_paused(not (active and self.is_playing))
+        self.audio_player.engine.visuals = active
+        if active and self.is_playing:
+            if not self.clock_timer.isActive():
+                self.clock_timer.start()
+                self.on_clock_tick()  # catch up on what happened while hidden
+        else:
+            self.clock_timer.stop()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        window = self.windowHandle()
+        if window is not None and not getattr(self, '_watching_expose', False):
+            # occlusion is only reported to the QWindow, as expose events
+            window.installEventFilter(self)
+            self._watching_expose = True
+        self.update_power_mode()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.update_power_mode()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.WindowStateChange:
+            self.update_power_mode()
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Expose and obj is self.windowHandle():
+            exposed = obj.isExposed()
+            if exposed != self._exposed:
+                self._exposed = exposed
+                self.update_power_mode()
+        return super().eventFilter(obj, event)
+
+    # --- Track info ---
+    def song_for_index(self, index):
+        return self.song_model.song(index.row())
+
+    def info_for_index(self, index):
+        row = index.data(Qt.UserRole)
+        return None if row is None else self.tracks.info(row)
+
+    def visible_rows(self):
+        """(first, last) row shown in the song list, last < first if none."""
+        viewport = self.song_list.viewport()
+        first = self.song_list.indexAt(viewport.rect().topLeft())
+        if not first.isValid():
+            return 0, -1
+        last = self.song_list.indexAt(viewport.rect().bottomLeft())
+        return first.row(), last.row() if last.isValid() else self.song_model.rowCount() - 1
+
+    def prioritize_visible_rows(self):
+        first, last = self.visible_rows()
+        if last < first:
+            return
+        page = last - first + 1
+        count = self.song_model.rowCount()
+
+        def songs(rows):
+            return [song for song in map(self.song_model.song, rows) if song is not None]
+
+        # one page either side, nearest first
+        around = [row for d in range(1, page + 1) for row in (last + d, first - d) if 0 <= row < count]
+        self.track_info.prioritize(songs(range(first, last + 1)), songs(around))
+
+    def apply_track_info(self):
+        batch = self.track_info.take()
+        if not batch:
+            return
+        for song, info in batch:
+            row = self.tracks.find(song)
+            if row >= 0:
+                self.tracks.set_info(row, info)
+        if self.song_model.group in SongListModel.TAGS_GROUPS:
+            self.song_model.relayout()   # group headers follow the tags as they arrive
+        if self.song_model.sorted_by_info():
+            self.resort_timer.start()
+        first, last = self.visible_rows()
+        if last >= first:
+            # one notification for the visible rows; the rest paint with the new info when shown
+            model = self.song_list.model()
+            model.dataChanged.emit(model.index(first), model.index(last))
+        track = self.audio_player.engine.track
+        if track is not None and any(song == track for song, _ in batch):
+            self.song_label.setToolTip(self.track_tooltip(track))
+
+    def resort_after_loading(self):
+        if self.track_info.pending():
+            return   # the next batch starts the timer again
+        self.song_model.resort()
+
+    def track_tooltip(self, song):
+        row = self.tracks.find(song)
+        info = (self.tracks.info(row) if row >= 0 else None) or {}
+        lines = [info.get('title') or song_title(song)]
+        lines += [info[key] for key in ('artist', 'album') if info.get(key)]
+        return "\n".join(lines)
+
+    # --- Cover art ---
+    def show_cover(self, song):
+        pixmap = self.covers.request(song)
+        if pixmap is not None:
+            self.set_cover(pixmap)
+        elif self.covers.has_no_art(song):
+            self.cover_label.hide()
+        # else keep the old picture until on_cover_ready, rather than flashing it off and on
+        upcoming = self.playlist.peek_next()
+        if upcoming is not None:
+            self.covers.request(upcoming)  # ready before the track changes
+
+    def set_cover(self, pixmap):
+        ratio = self.devicePixelRatioF()
+        scaled = pixmap.scaled(self.cover_label.size() * ratio, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        scaled.setDevicePixelRatio(ratio)
+        self.cover_label.setPixmap(scaled)
+        self.cover_label.show()
+
+    def on_cover_ready(self, song, pixmap):
+        if song != (self.audio_player.engine.track or self.audio_player.engine.filename):
+            return  # a prefetch, or the user moved on
+        if pixmap is None:
+            self.cover_label.hide()
+        else:
+            self.set_cover(pixmap)
+
+    def connect_audio_player(self):
+        self.audio_player.chunk_signal.connect(self.on_chunk)
+        self.audio_player.position_signal.connect(self.update_slider_position)
+        self.audio_player.song_finished.connect(self.song_finished)
+        self.audio_player.track_changed.connect(self.on_track_changed)
+
+    def update_upcoming(self, *args):
+        """Tell the engine the song after this one; it never reads the playlist itself."""
+        self.audio_player.engine.upcoming = self.playlist.peek_next()
+
+    def on_track_changed(self, track):
+        """The engine ran on into the next track of a CUE sheet, follow it without reloading."""
+        self.playlist.next_song()
+        self.update_upcoming()
+        self.select_song(track)
+        self.song_label.setText(song_title(track))
+        self.show_cover(track)
+        self.restore_track_data(track)
+        self._shown_times = None
+
+    def on_chunk(self, chunk):
+        self.playback_stats.chunk_delivered()
+        self.visualizer.update_visualization(chunk)
+
+    # --- A-B loop / cue points ---
+    def set_loop_point(self, which):
+        if not self.progress_slider.isEnabled():
+            return
+        self.loop_points[which] = self.audio_player.clock_frame()
+        a, b = self.loop_points
+        if a is not None and b is not None and b > a:
+            self.loop_enabled = True
+            self.audio_player.set_loop(a, b)
+            self.show_hint(f"Loop {self.frame_label(a)} - {self.frame_label(b)}")
+        else:
+            self.show_hint(f"Loop {'AB'[which]} at {self.frame_label(self.loop_points[which])}")
+        self.save_track_data()
+
+    def toggle_loop(self):
+        a, b = self.loop_points
+        if a is None or b is None or b <= a:
+            return
+        self.loop_enabled = not self.loop_enabled
+        if self.loop_enabled:
+            self.audio_player.set_loop(a, b)
+            self.show_hint(f"Loop {self.frame_label(a)} - {self.frame_label(b)}")
+        else:
+            self.audio_player.set_loop()
+            self.show_hint("Loop off")
+
+    def set_cue(self, slot):
+        if not self.progress_slider.isEnabled():
+            return
+        frame = self.audio_player.clock_frame()
+        self.cues[slot] = {"name": f"Cue {slot}", "frame": frame}
+        self.save_track_data()
+        self.show_hint(f"Cue {slot} at {self.frame_label(frame)}")
+
+    def jump_to_cue(self, slot):
+        cue = self.cues.get(slot)
+        if cue is None or not self.progress_slider.isEnabled():
+            return
+        self.audio_player.seek(cue["frame"])
+        self.show_hint(f"{cue['name']} ({self.frame_label(cue['frame'])})")
+
+    def restore_track_data(self, path):
+        # the loop comes back disabled, Ctrl+\ turns it on
+        entry = self.library_cache.get(path)
+        self.cues = dict(entry.get("cues", {}))
+        self.loop_points = list(entry.get("loop") or [None, None])
+        self.loop_enabled = False
+
+    def save_track_data(self):
+        try:
+            self.library_cache.update(self.audio_player.track, cues=self.cues, loop=self.loop_points)
+        except OSError as e:
+            log.warning("could not save cue points: %s", e)
+
+    def frame_label(self, frame):
+        seconds = int(frame / self.audio_player.fs)
+        return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+    def show_hint(self, text):
+        QToolTip.showText(self.progress_slider.mapToGlobal(QPoint(0, -40)), text, self.progress_slider)
+
+    # --- Playback speed ---
+    SPEEDS = (0.5, 0.75, 1.0, 1.25, 1.5, 1.75, 2.0, 2.5, 3.0)
+
+    def show_speed_menu(self):
+        menu = QMenu(self)
+        for speed in self.SPEEDS:
+            action = menu.addAction(f"{speed:g}x")
+            action.setCheckable(True)
+            action.setChecked(speed == self.speed)
+            action.triggered.connect(lambda checked, speed=speed: self.set_speed(speed))
+        menu.exec_(self.speed_btn.mapToGlobal(self.speed_btn.rect().bottomLeft()))
+
+    def set_speed(self, speed):
+        self.speed = speed
+        self.speed_btn.setText(f"{speed:g}x")
+        self.audio_player.set_speed(speed)
+
+    # --- Output device / latency ---
+    def show_device_menu(self):
+        menu = QMenu(self)
+        current = self.output.device if isinstance(self.output, SoundDeviceOutput) else False
+
+        devices = output_devices()
+        for index, name in ([(None, "System Default")] + devices if devices else []):
+            action = menu.addAction(name)
+            action.setCheckable(True)
+            action.setChecked(current == index)
+            action.triggered.connect(lambda checked, index=index: self.set_output_device(index))
+        if not devices:
+            menu.addAction("No audio devices found").setEnabled(False)
+
+        menu.addSeparator()
+        profiles = {'low': "Low Latency", 'balanced': "Balanced", 'power': "Power Saving"}
+        for name, label in profiles.items():
+            action = menu.addAction(label)
+            action.setCheckable(True)
+            action.setChecked(self.latency_profile == name)
+            action.triggered.connect(lambda checked, name=name: self.set_latency_profile(name))
+        adaptive = menu.addAction("Adaptive Buffer")
+        adaptive.setCheckable(True)
+        adaptive.setChecked(self.adaptive_buffer is not None)
+        adaptive.triggered.connect(self.set_adaptive_buffer)
+        passthrough = menu.addAction("Bit-Perfect Output")
+        passthrough.setCheckable(True)
+        passthrough.setChecked(self.passthrough)
+        passthrough.setToolTip("Play 16/24-bit files unconverted; takes effect with the next track")
+        passthrough.triggered.connect(self.set_passthrough)
+
+        menu.exec_(self.device_btn.mapToGlobal(self.device_btn.rect().bottomLeft()))
+
+    def set_output_device(self, index):
+        self.output = SoundDeviceOutput(index)
+        self.audio_player.set_output(self.output)
+
+    def set_latency_profile(self, name):
+        self.latency_profile = name
+        self.audio_player.set_latency_profile(name)
+
+    def set_adaptive_buffer(self, enabled):
+        self.adaptive_buffer = AdaptiveBuffer() if enabled else None
+        self.audio_player.engine.adaptive = self.adaptive_buffer
+
+    def set_passthrough(self, enabled):
+        self.passthrough = enabled
+        self.audio_player.engine.passthrough = enabled
+
+    def toggle_stats_window(self):
+        if self.stats_window is None:
+            self.stats_window = StatsWindow(self.playback_stats.snapshot)
+        self.stats_window.setVisible(not self.stats_window.isVisible())
 
     # -- Drag & Drop, Playlist Order ---
+    def selected_positions(self):
+        """Playlist positions of the selected songs, ascending (group headers left out)."""
+        ranges = self.song_list.selectionModel().selection()
+        rows = [np.arange(r.top(), r.bottom() + 1) for r in ranges]
+        return self.song_model.positions(np.concatenate(rows) if rows else ())
+
+    def keep_selection(self):
+        # hold the selection as positions while the song list is laid out again,
+        # so the selection model doesn't track each selected row by itself
+        self.kept_selection = self.selected_positions()
+        if len(self.kept_selection):
+            self.song_list.selectionModel().clearSelection()
+
+    def restore_selection(self, moved):
+        positions, self.kept_selection = self.kept_selection, None
+        if positions is None or not len(positions):
+            return
+        if moved is not None:
+            positions = moved[positions]
+            positions = positions[positions >= 0]
+        rows = self.song_model.rows(positions)
+        if not len(rows):
+            return
+        # one range per run of adjacent rows
+        breaks = np.flatnonzero(np.diff(rows) != 1)
+        selection = QItemSelection()
+        for top, bottom in zip(rows[np.r_[0, breaks + 1]].tolist(), rows[np.r_[breaks, len(rows) - 1]].tolist()):
+            selection.select(self.song_model.index(top), self.song_model.index(bottom))
+        self.song_list.selectionModel().select(selection, QItemSelectionModel.Select)
+
     def move_selected_item_up(self):
-        current_row = self.song_list.currentRow()
-        if current_row > 0:
-            item = self.song_list.takeItem(current_row)
-            self.song_list.insertItem(current_row - 1, item)
-            self.song_list.setCurrentRow(current_row - 1)
+        positions = self.selected_positions()
+        if len(positions) and positions[0] > 0:
+            self.song_model.move_songs(positions, positions[0] - 1)
 
     def move_selected_item_down(self):
-        current_row = self.song_list.currentRow()
-        if current_row < self.song_list.count() - 1:
-            item = self.song_list.takeItem(current_row)
-            self.song_list.insertItem(current_row + 1, item)
-            self.song_list.setCurrentRow(current_row + 1)
+        positions = self.selected_positions()
+        if len(positions) and positions[-1] < len(self.playlist.song_list) - 1:
+            self.song_model.move_songs(positions, positions[-1] + 2)
 
-    def on_song_list_reordered(self, parent=None, start=None, end=None, destination=None, row=None):
-        
-        # set current selected file
+    def on_song_list_reordered(self, *args):
+        # the list is the playlist, only the selection may need to catch up with the playing song
         if self.audio_player.filename is None: return
-        current_filename = os.path.basename(os.path.splitext(self.audio_player.filename)[0])
+        self.select_song(self.audio_player.track or self.audio_player.filename)
 
-        matching_item = None
-        for i in range(self.song_list.count()):
-            item = self.song_list.item(i)
-            if item.text() == os.path.basename(os.path.splitext(current_filename)[0]):
-                matching_item = item
-                break
+    def sort_songs(self, name):
+        self.sort_order = name
+        self.song_model.sort_by(SongListModel.SORT_ORDERS[name])
 
-        # Select the matching item in the UI
-        if matching_item is not None:
-            self.song_list.setCurrentItem(matching_item)
-
-        # select matchin song if currently played was removed
-        if self.playlist.current_song() is not None and \
-            self.song_list.currentItem().text() != \
-            os.path.basename(os.path.splitext(self.playlist.current_song())[0]):
-            print(self.song_list.currentItem().text())
-            self.load_new_song(self.loaded_files[os.path.splitext(self.song_list.currentItem().text())[0]])
-            self.playlist.current_index = self.playlist.song_list.index(self.audio_player.filename)
-            self.playlist.go_to_song(self.playlist.current_index)
-
-        # update playlist
-        self.playlist.song_list.clear()
-        for idx in range(self.song_list.count()):
-            item = self.song_list.item(idx)
-            filename = item.text()
-            file_path = self.loaded_files[filename]
-            self.playlist.song_list.append(file_path)
+    def group_songs(self, name):
+        self.song_model.set_group(SongListModel.GROUPS[name])
+        if self.sort_order is not None:
+            self.sort_songs(self.sort_order)
 
     # --- Right CLick Menu ---
     def show_song_list_context_menu(self, position):
         menu = QMenu()
 
+        selected = len(self.selected_positions())
         add_action = QAction("Add Song", self.song_list)
-        remove_action = QAction("Remove Song", self.song_list)
+        remove_action = QAction("Remove Song" if selected == 1 else f"Remove {selected} Songs", self.song_list)
+        export_action = QAction("Export Mix...", self.song_list)
 
         add_action.triggered.connect(self.add_song_to_list)
         remove_action.triggered.connect(self.remove_selected_song)
+        export_action.triggered.connect(self.export_mix)
 
         menu.addAction(add_action)
         
         # Only enable remove if an item is selected
-        if self.song_list.currentItem():
+        if selected:
             menu.addAction(remove_action)
 
+        history = self.song_model.history
+        if history.count():
+            menu.addAction(history.createUndoAction(menu))
+            menu.addAction(history.createRedoAction(menu))
+
+        if self.playlist.song_list:
+            menu.addAction(export_action)
+
+            sort_menu = menu.addMenu("Sort by")
+            for name in SongListModel.SORT_ORDERS:
+                action = sort_menu.addAction(name)
+                action.setCheckable(True)
+                action.setChecked(name == self.sort_order)
+                action.triggered.connect(lambda checked, n=name: self.sort_songs(n))
+            group_menu = menu.addMenu("Group by")
+            for name, group in SongListModel.GROUPS.items():
+                action = group_menu.addAction(name)
+                action.setCheckable(True)
+                action.setChecked(group == self.song_model.group)
+                action.triggered.connect(lambda checked, n=name: self.group_songs(n))
+
         menu.exec_(self.song_list.viewport().mapToGlobal(position))
-        
-        self.on_song_list_reordered()
 
     def add_song_to_list(self):
         files, _ = QFileDialog.getOpenFileNames(
@@ -1142,36 +4887,26 @@ class MusicPlayer(QMainWindow):
             self.current_folder,
             "Audio Files (*.mp3 *.wav *.ogg *.flac);;All Files (*)"
         )
-        last_item = None
-        for file_path in files:
-            filename = os.path.basename(file_path)
-            item = QListWidgetItem(filename)
-            item.setData(Qt.UserRole, file_path)
-            item.setText(os.path.splitext(item.text())[0])
-            item.setTextAlignment(Qt.AlignCenter)
-            item.setToolTip(item.text())
-            self.song_list.addItem(item)
-            last_item = item
-            self.loaded_files[os.path.splitext(item.text())[0]] = file_path
-              # Keep reference to last added item
-        # No need to append to playlist here; do it in on_song_list_reordered
-        self.on_song_list_reordered()
+        if not files:
+            return
+        count = len(self.playlist.song_list)
+        self.song_model.insert_songs(np.arange(count, count + len(files)), files)
+        self.track_info.add(files)
 
 
     def remove_selected_song(self):
-        item = self.song_list.currentItem()
-        if item:
-            row = self.song_list.row(item)
-            removed_song_path = item.data(Qt.UserRole)
-            is_currently_playing = (
-                hasattr(self, "audio_player") and
-                getattr(self.audio_player, "filename", None) == removed_song_path
-            )
+        positions = self.selected_positions()
+        if not len(positions):
+            return
+        playing = self.audio_player.track or self.audio_player.filename   # a CueTrack is listed, not its file
+        removes_playing = (playing is not None and playing in self.playlist.song_list
+                           and self.playlist.song_list.index(playing) in positions)
 
-            self.loaded_files.pop(item.text())
-            self.song_list.takeItem(row)
+        self.song_model.remove_songs(positions)
+        if removes_playing and self.is_playing:
+            # go on with the song that followed it
+            self.load_new_song(self.playlist.next_song())
 
-        self.on_song_list_reordered()
 
 
 
@@ -1180,6 +4915,407 @@ class MusicPlayer(QMainWindow):
 
 
 
+from PyQt5.QtCore import QAbstractListModel, QMimeData, QModelIndex, Qt, pyqtSignal
+from PyQt5.QtWidgets import QUndoCommand, QUndoStack
+
+class SongListModel(QAbstractListModel):
+    """The song list's rows, read straight from the playlist's TrackList.
+
+    A row is a playlist position; rows the filter hides are left out and,
+    when grouping, a header row goes before each group. That array of
+    positions is all that is kept per row, so a new sort, filter or grouping
+    is one layout change. Edits go through the methods here, which update
+    PlaylistControl and the view together, so the list and the play order
+    never disagree.
+    """
+    HEADER_ROLE = Qt.UserRole + 1   # group title, on header rows only
+    MIME_TYPE = "application/x-pulsepy-rows"
+    # menu name -> TrackStore sort keys
+    SORT_ORDERS = {
+        "File name": ('folder', 'name'),
+        "Artist": ('artist', 'album', 'track', 'name'),
+        "Album": ('album', 'track', 'name'),
+        "Track number": ('track', 'name'),
+        "Duration": ('duration', 'name'),
+        "Date added": ('-added', 'name'),
+    }
+    GROUPS = {"None": None, "Album": 'album', "Folder": 'folder'}
+    TAGS_GROUPS = ('album',)   # groups that change as tags load
+    INFO_KEYS = TrackStore.TAGS + ('track', 'duration', 'added')   # sort keys that change as tags load
+
+    # around each relayout(), the second with its moved array: a selection
+    # model keeps one persistent index per selected row through a layout
+    # change, so a view with thousands selected carries them over itself
+    relayoutStarting = pyqtSignal()
+    relayoutFinished = pyqtSignal(object)
+
+    def __init__(self, playlist, parent=None):
+        super().__init__(parent)
+        self.playlist = playlist
+        self.filter_text = ""
+        self.group = None            # a TrackStore sort key ('album', 'folder') or None
+        self.sorted_by = None        # the last sort_by() keys, None once the songs were rearranged since
+        # position >= 0 for a song, -(position + 1) for the header of the group starting there
+        self._entries = np.empty(0, np.int64)
+        self._row_of = np.empty(0, np.int64)   # position -> row, -1 if hidden
+        self.history = QUndoStack(self)
+        self._layout()
+
+    # --- reading ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._entries)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._entries):
+            return None
+        entry = int(self._entries[index.row()])
+        if entry < 0:
+            if role in (Qt.DisplayRole, self.HEADER_ROLE):
+                return self.group_title(-entry - 1)
+            return None
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return song_title(self.playlist.song_list[entry])
+        if role == Qt.UserRole:
+            return self.playlist.song_list.rows[entry]
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemIsDropEnabled
+        if self._entries[index.row()] < 0:
+            return Qt.ItemIsEnabled
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsDragEnabled
+
+    def group_title(self, position):
+        store, row = self.playlist.song_list.store, self.playlist.song_list.rows[position]
+        if self.group == 'folder':
+            return os.path.basename(os.path.dirname(getattr(store.song(row), 'path', store.song(row)))) or "/"
+        info = store.info(row) or {}
+        return info.get(self.group) or f"Unknown {self.group}"
+
+    def position(self, row):
+        """Playlist position of a model row, None for headers and invalid rows."""
+        if not 0 <= row < len(self._entries) or self._entries[row] < 0:
+            return None
+        return int(self._entries[row])
+
+    def positions(self, rows):
+        """Playlist positions of model rows, ascending, without group headers."""
+        entries = self._entries[np.asarray(rows, np.int64)]
+        return np.unique(entries[entries >= 0])
+
+    def rows(self, positions):
+        """Model rows of playlist positions, ascending, without the hidden ones."""
+        rows = self._row_of[positions]
+        return np.sort(rows[rows >= 0])
+
+    def row(self, position):
+        """Model row of a playlist position, None if it is hidden."""
+        if not 0 <= position < len(self._row_of) or self._row_of[position] < 0:
+            return None
+        return int(self._row_of[position])
+
+    def insertion_point(self, row):
+        """Playlist position where songs dropped before row go."""
+        if row >= len(self._entries):
+            return len(self.playlist.song_list)
+        # before a header: before the first song of its group
+        entry = int(self._entries[row])
+        return entry if entry >= 0 else -entry - 1
+
+    def song(self, row):
+        position = self.position(row)
+        return None if position is None else self.playlist.song_list[position]
+
+    # --- layout ---
+    def _layout(self):
+        tracks = self.playlist.song_list
+        positions = np.arange(len(tracks))
+        if len(tracks) and (self.filter_text or self.group):
+            rows = tracks.row_array()
+            if self.filter_text:
+                positions = positions[tracks.store.match(self.filter_text)[rows]]
+            if self.group and len(positions):
+                keys = tracks.store.group_key(self.group)[rows[positions]]
+                starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+                positions = np.insert(positions, starts, -(positions[starts] + 1))
+        self._entries = positions
+        self._row_of = np.full(len(tracks), -1, np.int64)
+        songs = np.flatnonzero(positions >= 0)
+        self._row_of[positions[songs]] = songs
+
+    def relayout(self, moved=None):
+        """Rebuild the rows after the playlist changed, in one layout change.
+
+        moved gives the new position of each old one (-1: removed), None if
+        positions didn't change. Selection and the current row follow their
+        songs.
+        """
+        self.relayoutStarting.emit()
+        self.layoutAboutToBeChanged.emit()
+        old_entries = self._entries
+        old = self.persistentIndexList()
+        self._layout()
+        # selections keep one persistent index per selected row, so map them all at once
+        rows = np.array([index.row() for index in old], np.int64)
+        entries = np.full(len(rows), -1, np.int64)
+        known = rows < len(old_entries)
+        entries[known] = old_entries[rows[known]]
+        positions = entries.copy()
+        songs = entries >= 0
+        if moved is not None:
+            positions[songs] = moved[entries[songs]]
+        new_rows = np.full(len(rows), -1, np.int64)
+        shown = positions >= 0
+        new_rows[shown] = self._row_of[positions[shown]]
+        new = [self.index(row) if row >= 0 else QModelIndex() for row in new_rows.tolist()]
+        self.changePersistentIndexList(old, new)
+        self.layoutChanged.emit()
+        self.relayoutFinished.emit(moved)
+
+    def set_playlist(self, playlist):
+        self.history.clear()
+        self.sorted_by = None
+        self.beginResetModel()
+        self.playlist = playlist
+        self._layout()
+        self.endResetModel()
+
+    def set_filter(self, text):
+        self.filter_text = text
+        self.relayout()
+
+    def set_group(self, group):
+        """Group by a sort key; the songs are sorted by it (stable) so each group is one run."""
+        self.group = group
+        if group is None:
+            self.relayout()
+        else:
+            self.sort_by(())
+
+    def sort_by(self, keys):
+        """Sort the songs by TrackStore keys, inside their groups when grouping."""
+        tracks = self.playlist.song_list
+        keys = tuple(keys)
+        self.reorder(tracks.store.argsort(tracks.row_array(), self._grouped(keys)))
+        self.sorted_by = keys   # after reorder(), which forgets it
+
+    def _grouped(self, keys):
+        return keys if self.group is None else (self.group,) + keys
+
+    def sorted_by_info(self):
+        """True if the order comes from a sort on tags or durations, which loading tags can upset."""
+        return self.sorted_by is not None and any(
+            key.lstrip('-') in self.INFO_KEYS for key in self._grouped(self.sorted_by))
+
+    def resort(self):
+        """Sort again by the last sort_by() keys, unless the songs were rearranged since."""
+        if self.sorted_by is not None:
+            self.sort_by(self.sorted_by)
+
+    # --- editing ---
+    # insert_songs(), remove_songs() and move_songs() are the user's edits:
+    # each is one PlaylistControl update and one layout change, whatever the
+    # number of songs, and goes on the undo stack. The rest change the list
+    # underneath it (sorting, the watched folder), so the stack is cleared.
+    def reorder(self, order):
+        """Put the songs in the given order (old positions), see PlaylistControl.reorder()."""
+        self.history.clear()
+        self.sorted_by = None
+        self._reorder(order)
+
+    def _reorder(self, order):
+        self.relayout(self.playlist.reorder(order))
+
+    def insert(self, positions, songs):
+        """Add songs at the given (ascending) positions, not as an edit of the user's."""
+        self.history.clear()
+        self.sorted_by = None
+        self._insert(positions, songs)
+
+    def remove(self, positions):
+        self.history.clear()
+        self._remove(positions)
+
+    def replace(self, position, song):
+        self.playlist.replace(position, song)
+        row = self.row(position)
+        if row is not None:
+            self.dataChanged.emit(self.index(row), self.index(row))
+
+    def move(self, position, to):
+        """Move the song at position so that it lands before the one now at to."""
+        self.move_songs([position], to)
+
+    def insert_songs(self, positions, songs, merge=None):
+        """Add songs so that they end up at the given (ascending) positions.
+
+        Consecutive inserts with the same merge key (one file import) that
+        each go after the last are undone as one.
+        """
+        self.sorted_by = None
+        self.history.push(InsertSongs(self, positions, songs, merge))
+
+    def remove_songs(self, positions):
+        self.sorted_by = None   # a re-sort would clear the history this goes on
+        self.history.push(RemoveSongs(self, positions))
+
+    def move_songs(self, positions, to):
+        """Move the songs at positions, in their order, so that they land before the one now at to."""
+        self.sorted_by = None
+        self.history.push(MoveSongs(self, positions, to))
+
+    def _insert(self, positions, songs):
+        self.relayout(self.playlist.insert_many(positions, songs))
+
+    def _remove(self, positions):
+        self.relayout(self.playlist.remove_many(positions))
+
+    def _move(self, positions, to):
+        self.relayout(self.playlist.move_many(positions, to))
+
+    # --- drag and drop inside the list ---
+    def supportedDropActions(self):
+        return Qt.MoveAction
+
+    def mimeTypes(self):
+        return [self.MIME_TYPE]
+
+    def mimeData(self, indexes):
+        # only the positions; dropMimeData() moves the songs
+        data = QMimeData()
+        data.setData(self.MIME_TYPE, self.positions([index.row() for index in indexes]).tobytes())
+        return data
+
+    def dropMimeData(self, data, action, row, column, parent):
+        positions = np.frombuffer(bytes(data.data(self.MIME_TYPE)), np.int64)
+        if action != Qt.MoveAction or not len(positions):
+            return False
+        if row < 0:
+            row = parent.row() if parent.isValid() else len(self._entries)
+        self.move_songs(positions, self.insertion_point(row))
+        # the view then asks removeRows() to drop the dragged rows, which the default refuses
+        return True
+
+
+class SongEdit(QUndoCommand):
+    """An undoable edit of the song list, kept as the positions it touched (and the
+    songs it took out, as TrackStore rows) rather than as a copy of the list."""
+
+    def __init__(self, model, text):
+        super().__init__(text)
+        self.model = model
+
+    @staticmethod
+    def songs_text(verb, count):
+        return f"{verb} {count} song" + ("s" if count != 1 else "")
+
+
+class InsertSongs(SongEdit):
+    def __init__(self, model, positions, songs, merge=None):
+        tracks = model.playlist.song_list
+        if isinstance(tracks, TrackList) and not (isinstance(songs, TrackList) and songs.store is tracks.store):
+            songs = TrackList(tracks.store, tracks.store.extend(songs))
+        super().__init__(model, self.songs_text("Add", len(songs)))
+        self.positions = np.asarray(positions, np.int32)
+        self.songs = songs
+        self.merge = merge
+
+    def id(self):
+        return -1 if self.merge is None else 1
+
+    def mergeWith(self, other):
+        if other.merge is not self.merge or other.positions[0] <= self.positions[-1]:
+            return False
+        self.positions = np.concatenate((self.positions, other.positions))
+        self.songs.extend(other.songs)
+        self.setText(self.songs_text("Add", len(self.songs)))
+        return True
+
+    def redo(self):
+        self.model._insert(self.positions, self.songs)
+
+    def undo(self):
+        self.model._remove(self.positions)
+
+
+class RemoveSongs(SongEdit):
+    def __init__(self, model, positions):
+        super().__init__(model, self.songs_text("Remove", len(positions)))
+        self.positions = np.unique(positions).astype(np.int32)
+        tracks = model.playlist.song_list
+        self.songs = tracks.take(self.positions) if isinstance(tracks, TrackList) \
+            else [tracks[i] for i in self.positions]
+
+    def redo(self):
+        self.model._remove(self.positions)
+
+    def undo(self):
+        self.model._insert(self.positions, self.songs)
+
+
+class MoveSongs(SongEdit):
+    def __init__(self, model, positions, to):
+        super().__init__(model, self.songs_text("Move", len(positions)))
+        self.positions = np.unique(positions).astype(np.int32)
+        self.to = to
+
+    def redo(self):
+        self.model._move(self.positions, self.to)
+
+    def undo(self):
+        # the block landed where its first song now is; spread it back out
+        start = self.to - np.count_nonzero(self.positions < self.to)
+        count = len(self.model.playlist.song_list)
+        sources = np.arange(start, start + len(self.positions))
+        self.model._reorder(PlaylistControl.placement(count, self.positions, sources))
+
+
+from PyQt5.QtWidgets import QTableView
+
+class SongListView(QTableView):
+    """The song list's view: takes files and folders dropped from a file manager.
+
+    Those come out as filesDropped(paths, row), row being where they were
+    dropped (the row count past the last one); the receiver adds them.
+    Drags inside the list are left to the model.
+    """
+    filesDropped = pyqtSignal(list, int)
+
+    def _external(self, event):
+        return event.source() is not self and event.mimeData().hasUrls()
+
+    def dragEnterEvent(self, event):
+        if self._external(event):
+            # always a copy: a file manager told "moved" may delete the files
+            event.setDropAction(Qt.CopyAction)
+            event.accept()
+        else:
+            super().dragEnterEvent(event)
+
+    def dragMoveEvent(self, event):
+        if self._external(event):
+            event.setDropAction(Qt.CopyAction)
+            event.accept()
+        else:
+            super().dragMoveEvent(event)
+
+    def dropEvent(self, event):
+        if not self._external(event):
+            super().dropEvent(event)
+            return
+        paths = [url.toLocalFile() for url in event.mimeData().urls() if url.isLocalFile()]
+        index = self.indexAt(event.pos())
+        row = self.model().rowCount()
+        if index.isValid():
+            row = index.row() + (event.pos().y() > self.visualRect(index).center().y())
+        event.setDropAction(Qt.CopyAction)
+        event.accept()
+        if paths:
+            self.filesDropped.emit(paths, row)
+
 
 from PyQt5.QtWidgets import QStyledItemDelegate
 from PyQt5.QtCore import Qt
@@ -1190,6 +5326,61 @@ class ElideDelegate(QStyledItemDelegate):
         option.textElideMode = Qt.ElideRight
 
 
+class TrackDelegate(ElideDelegate):
+    """Song list rows: "Artist - Title" once the tags are loaded, and the duration on the right.
+
+    Group header rows just show the group's name.
+    """
+
+    def __init__(self, info, parent=None):
+        super().__init__(parent)
+        self._info = info  # model index -> track info dict, None until loaded
+
+    @staticmethod
+    def duration_text(seconds):
+        seconds = int(round(seconds))
+        if seconds >= 3600:
+            return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+        return f"{seconds // 60}:{seconds % 60:02d}"
+
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        info = self._info(index)
+        if not info:
+            return
+        if info.get('title'):
+            option.text = f"{info['artist']} - {info['title']}" if info.get('artist') else info['title']
+        if 'duration' in info:
+            # the text is centered, keep it clear of the duration on both sides
+            room = option.rect.width() - 2 * (option.fontMetrics.width(self.duration_text(info['duration'])) + 16)
+            option.text = option.fontMetrics.elidedText(option.text, Qt.ElideRight, max(room, 0))
+
+    def paint(self, painter, option, index):
+        title = index.data(SongListModel.HEADER_ROLE)
+        if title is not None:
+            # group header: the group's name on the left over a rule
+            painter.save()
+            font = painter.font()
+            font.setBold(True)
+            painter.setFont(font)
+            painter.setPen(QColor("#8fa3c8"))
+            rect = option.rect.adjusted(12, 0, -12, -1)
+            painter.drawText(rect, Qt.AlignLeft | Qt.AlignVCenter,
+                             painter.fontMetrics().elidedText(title, Qt.ElideRight, rect.width()))
+            painter.drawLine(rect.bottomLeft(), rect.bottomRight())
+            painter.restore()
+            return
+        super().paint(painter, option, index)
+        info = self._info(index)
+        if not info or 'duration' not in info:
+            return
+        painter.save()
+        painter.setPen(QColor("#ffffff" if option.state & QStyle.State_Selected else "#8fa3c8"))
+        painter.drawText(option.rect.adjusted(0, 0, -12, 0), Qt.AlignRight | Qt.AlignVCenter,
+                         self.duration_text(info['duration']))
+        painter.restore()
+
+
 # --- Progress Slider ---
 from PyQt5.QtWidgets import QSlider, QStyle
 from PyQt5.QtCore import pyqtSignal, Qt
@@ -1238,7 +5429,7 @@ class ClickableSlider(QSlider):
 
 from PyQt5.QtWidgets import QLabel
 from PyQt5.QtCore import QTimer, Qt
-from PyQt5.QtGui import QPainter
+from PyQt5.QtGui import QPainter, QPixmap
 
 # --- For song title ---
 class CustomLabel(QLabel):
@@ -1250,25 +5441,69 @@ class CustomLabel(QLabel):
         self._timer.timeout.connect(self._scrollText)
         self._speed = speed  # ms per step
         self._step = step    # pixels per step
+        self._gap = 40       # pixels between repetitions
+        self._text_width = 0
+        self._pixmap = None  # the text rendered once, scrolling just blits it
+        self._pixmap_key = None
+        self._paused = False
         self.setAlignment(Qt.AlignVCenter | Qt.AlignLeft)
         self.setTextInteractionFlags(Qt.NoTextInteraction)
 
     def setText(self, text):
         # Clean filename before displaying
-        self._text = self.clean_filename(text)
-        self._offset = 0
+        text = self.clean_filename(text)
+        if text != self._text:
+            self._text = text
+            self._offset = 0
+        self._text_width = self.fontMetrics().width(self._text)
+        self._pixmap = None
         self.update()
-        fm = self.fontMetrics()
-        text_width = fm.width(self._text)
-        label_width = self.width()
-        if text_width > label_width:
-            self._timer.start(self._speed)
+        self._update_timer()
+
+    def set_marquee_paused(self, paused):
+        """Hold the scrolling text where it is (window hidden or playback paused)."""
+        self._paused = paused
+        self._update_timer()
+
+    def _scrolling(self):
+        return self._text_width > self.width()
+
+    def _update_timer(self):
+        if self._scrolling() and not self._paused:
+            if not self._timer.isActive():
+                self._timer.start(self._speed)
         else:
             self._timer.stop()
 
+    def _text_pixmap(self):
+        key = (self._text, self.font().key(), self.palette().cacheKey(), self.height(), self.devicePixelRatioF())
+        if self._pixmap is None or key != self._pixmap_key:
+            ratio = self.devicePixelRatioF()
+            pixmap = QPixmap(int((self._text_width + 1) * ratio), int(self.height() * ratio))
+            pixmap.setDevicePixelRatio(ratio)
+            pixmap.fill(Qt.transparent)
+            painter = QPainter(pixmap)
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setFont(self.font())
+            painter.setPen(self.palette().color(self.foregroundRole()))
+            fm = self.fontMetrics()
+            painter.drawText(0, int((self.height() + fm.ascent() - fm.descent()) / 2), self._text)
+            painter.end()
+            self._pixmap = pixmap
+            self._pixmap_key = key
+        return self._pixmap
+
     def resizeEvent(self, event):
         super().resizeEvent(event)
-        self.setText(self._text)  # Re-check if scrolling is needed
+        self._pixmap = None
+        self._update_timer()  # Re-check if scrolling is needed
+        if not self._scrolling():
+            self._offset = 0
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() in (QEvent.FontChange, QEvent.StyleChange):
+            self.setText(self._text)  # the width depends on the font
 
     @staticmethod
     def clean_filename(text):
@@ -1280,38 +5515,28 @@ class CustomLabel(QLabel):
         return re.sub(r'\.(mp3|wav|flac|ogg|aac|m4a|wma|aiff|alac|opus)$', '', text, flags=re.IGNORECASE).strip()
 
     def _scrollText(self):
-        fm = self.fontMetrics()
-        text_width = fm.width(self._text)
-        label_width = self.width()
-        if text_width <= label_width:
+        if not self._scrolling():
             self._timer.stop()
             self._offset = 0
             self.update()
             return
         self._offset += self._step
-        if self._offset > text_width + 40:  # 40 pixels gap before repeating
+        if self._offset > self._text_width + self._gap:
             self._offset = 0
         self.update()
 
     def paintEvent(self, event):
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-        fm = self.fontMetrics()
-        text_width = fm.width(self._text)
-        label_width = self.width()
-        text_height = self.height()
-
-        if text_width <= label_width:
+        if not self._scrolling():
             # Center text if it fits
+            painter.setRenderHint(QPainter.Antialiasing)
             painter.drawText(self.rect(), self.alignment(), self._text)
         else:
-            # Draw scrolling text
+            # Scrolling text, plus a second copy for a seamless wrap
+            pixmap = self._text_pixmap()
             x = -self._offset
-            y = int((text_height + fm.ascent() - fm.descent()) / 2)
-            painter.drawText(x, y, self._text)
-            # Draw second copy for seamless scrolling
-            gap = 40  # pixels between repetitions
-            painter.drawText(x + text_width + gap, y, self._text)
+            painter.drawPixmap(x, 0, pixmap)
+            painter.drawPixmap(x + self._text_width + self._gap, 0, pixmap)
 
 
 
@@ -1349,6 +5574,76 @@ class AdvancedTimeEdit(QTimeEdit):
 
 
 
+from PyQt5.QtCore import QThread, pyqtSignal
+
+# --- Offline mix export ---
+class RenderThread(QThread):
+    progress = pyqtSignal(float, float)  # fraction done, realtime factor
+    done = pyqtSignal(str)               # error message, empty on success
+
+    def __init__(self, song_list, path, volume, parent=None):
+        super().__init__(parent)
+        self.song_list = song_list
+        self.path = path
+        self.volume = volume
+
+    def run(self):
+        try:
+            render_playlist(self.song_list, self.path, self.volume, progress=self._report)
+            self.done.emit("")
+        except Exception as e:
+            self.done.emit(str(e))
+
+    def _report(self, state):
+        self.progress.emit(state.fraction, state.realtime_factor)
+
+
+# --- Playback health debug window (F12) ---
+class StatsWindow(QWidget):
+    def __init__(self, snapshot, parent=None, interval=500):
+        super().__init__(parent)
+        self.setWindowTitle("PulsePy Playback Stats")
+        self.setStyleSheet(Styles.stats_window)
+        self._snapshot = snapshot  # callable returning PlaybackStats.snapshot()
+        self._label = QLabel()
+        self._label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        layout = QVBoxLayout()
+        layout.addWidget(self._label)
+        self.setLayout(layout)
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.refresh)
+        self._interval = interval
+
+    def showEvent(self, event):
+        self.refresh()
+        self._timer.start(self._interval)  # only tick while visible
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self._timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        stats = self._snapshot()
+        lines = [
+            f"blocks            {stats['blocks']}",
+            f"underflows        {stats['underflows']}",
+            f"buffer free       {stats['write_available']} (min {stats['min_write_available']}) "
+            f"of {stats['buffer_frames']}-frame blocks",
+            f"sample format     {stats['sample_format']}",
+            f"signal backlog    {stats['signal_backlog']}",
+        ]
+        for name in ("decode", "write", "command", "seek"):
+            h = stats[name]
+            lines.append(
+                f"{name:<17} n={h['count']} mean={h['mean'] * 1e3:.2f}ms "
+                f"p50<{h['p50'] * 1e3:.2f}ms p99<{h['p99'] * 1e3:.2f}ms max={h['max'] * 1e3:.2f}ms"
+            )
+        self._label.setText("\n".join(lines))
+
+
+
+
 class Styles():
     
     timeedit = """
@@ -1427,7 +5722,7 @@ QLabel:disabled {
     """)
 
     song_list = ("""
-        QListWidget {
+        QTableView {
             background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
                                     stop:0 #23272f, stop:1 #1e222a);
             color: #E6F0FF;
@@ -1437,21 +5732,21 @@ QLabel:disabled {
             outline: none;
             border: 2px solid #3551a3;
         }
-        QListWidget::item {
+        QTableView::item {
             background: transparent;
             border: none;
             padding: 10px 6px;
             margin: 4px 0;
             border-radius: 9px;
         }
-        QListWidget::item:selected {
+        QTableView::item:selected {
             background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
                                     stop:0 #426cf5, stop:1 #3EC6E0);
             color: #fff;
             font-weight: bold;
             border: none;
         }
-        QListWidget::item:hover {
+        QTableView::item:hover {
             background: rgba(90, 159, 255, 0.13);
             color: #3EC6E0;
         }
@@ -1533,6 +5828,17 @@ QPushButton:pressed {
     background: #23272f;
     color: #5A9FFF;
 }
+"""
+
+    stats_window = """
+QWidget {
+    background: #23272f;
+}
+QLabel {
+    color: #E6F0FF;
+    font-family: monospace;
+    font-size: 13px;
+}
 """
 
     progress_slider = ("""
@@ -1584,7 +5890,11 @@ QSlider::handle:horizontal:pressed {
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    setup_logging()
     app = QApplication(sys.argv)
     window = MusicPlayer()
     window.show()
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    window.output.close()
+    sys.exit(exit_code)